@@ -1,9 +1,27 @@
-import sys
-import os
-
-sys.path.append(os.path.dirname(os.path.dirname(__file__)))
-
-from app import app
-
-def handler(request):
-    return app(request.environ, lambda *args: None)
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+# Serverless defaults: each instance serves one request at a time and is frozen
+# in between, so background threads and the seat stream server can't run, and
+# only /tmp is writable
+os.environ.setdefault('SEAT_STREAM', '0')
+os.environ.setdefault('AUDIT_ASYNC', '0')
+os.environ.setdefault('WAITLIST_ASYNC', '0')
+os.environ.setdefault('JINJA_CACHE_DIR', '/tmp/jinja_cache')
+os.environ.setdefault('PAGE_CACHE_PATH', '/tmp/page_cache.db')
+os.environ.setdefault('LOGIN_ARCHIVE_DIR', '/tmp/login_archive')
+os.environ.setdefault('NOTIFY_OUTBOX_DIR', '/tmp/outbox')
+os.environ.setdefault('SESSION_STORE', 'cookie')  # /tmp isn't shared between instances
+
+from app import app, warm_up
+
+# The module stays loaded between invocations on a warm instance, so the engine
+# and its pooled connections are reused; warming up here moves the first
+# request's setup into instance start-up. WARM_UP=0 skips it.
+if os.environ.get('WARM_UP', '1') == '1':
+    warm_up()
+
+def handler(request):
+    return app(request.environ, lambda *args: None)
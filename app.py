@@ -1,22 +1,236 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+from flask import Flask, Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, abort, g
+from flask import before_render_template, template_rendered, has_request_context, stream_with_context
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
 from flask_sqlalchemy import SQLAlchemy
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import event as sa_event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import CallbackDict
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, date
+from datetime import datetime, date, timedelta, timezone
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict, namedtuple
+from functools import lru_cache, partial
+from itertools import islice
+from urllib.parse import parse_qs, urlencode, urlsplit
+from xml.sax.saxutils import escape as xml_escape
+import asyncio
+import atexit
+import base64
+import binascii
+import click
+import csv
+import gzip
+import hashlib
+import io
+import json
 import os
+import queue
+import random
+import re
+import secrets
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+import zipfile
+
+def database_url():
+    """DATABASE_URL from the environment (SQLite file by default)"""
+    url = os.environ.get('DATABASE_URL', 'sqlite:///college_events_new.db')  # New database name
+    # Hosting providers hand out postgres:// URLs, which SQLAlchemy no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+# sqlite3 cursors don't report how many rows a SELECT returned, so count them as they're fetched
+class RowCountingCursor(sqlite3.Cursor):
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            count_fetched_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = super().fetchmany(*args, **kwargs)
+        count_fetched_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        count_fetched_rows(len(rows))
+        return rows
+
+class RowCountingConnection(sqlite3.Connection):
+    def cursor(self, factory=RowCountingCursor):
+        return super().cursor(factory)
+
+def engine_options(url):
+    """Connection pool settings for the configured database"""
+    if url.startswith('sqlite') and (url in ('sqlite://', 'sqlite:///:memory:') or 'mode=memory' in url):
+        # Flask-SQLAlchemy shares one in-memory connection
+        return {'connect_args': {'factory': RowCountingConnection}}
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+    }
+    if url.startswith('sqlite'):
+        options['connect_args'] = {'factory': RowCountingConnection}
+    if not url.startswith('sqlite'):
+        options.update(pool_pre_ping=True, pool_recycle=int(os.environ.get('DB_POOL_RECYCLE', 1800)))
+    return options
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'college-event-management-secret-key-2025'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///college_events_new.db'  # New database name
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Applied to every new SQLite connection; SQLITE_TUNING=0 keeps SQLite's defaults
+app.config['SQLITE_PRAGMAS'] = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': -int(os.environ.get('SQLITE_CACHE_KB', 64000)),  # Negative means KiB
+} if os.environ.get('SQLITE_TUNING', '1') == '1' else {}
+app.config['STATS_CACHE_TTL'] = float(os.environ.get('STATS_CACHE_TTL', 5))  # Seconds
+# Werkzeug hash method, e.g. 'pbkdf2:sha256:600000' or 'scrypt:32768:8:1';
+# stored hashes made with other parameters are upgraded at the next login
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+app.config['PASSWORD_HASH_WORKERS'] = int(os.environ.get('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))
+# Login/logout records are queued and written in batches by a background thread
+app.config['AUDIT_ASYNC'] = os.environ.get('AUDIT_ASYNC', '1') == '1'
+app.config['AUDIT_QUEUE_SIZE'] = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+app.config['AUDIT_BATCH_SIZE'] = int(os.environ.get('AUDIT_BATCH_SIZE', 200))
+app.config['AUDIT_FLUSH_MS'] = int(os.environ.get('AUDIT_FLUSH_MS', 250))
+# Per-request latency, SQL and template timings served at /metrics (admin only
+# unless METRICS_INTERNAL=1, for deployments where the port isn't public)
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'
+app.config['METRICS_INTERNAL'] = os.environ.get('METRICS_INTERNAL', '0') == '1'
+app.config['SLOW_QUERY_MS'] = float(os.environ.get('SLOW_QUERY_MS', 200))
+# Rendered /, /events and /event/<id> for anonymous visitors: 'memory' (per
+# process), 'disk' (a SQLite file shared by every worker on the host) or 'off'
+app.config['PAGE_CACHE'] = os.environ.get('PAGE_CACHE', 'memory')
+app.config['PAGE_CACHE_MAX_BYTES'] = int(os.environ.get('PAGE_CACHE_MAX_MB', 64)) * 1024 * 1024
+app.config['PAGE_CACHE_TTL'] = float(os.environ.get('PAGE_CACHE_TTL', 60))  # Seconds
+app.config['PAGE_CACHE_PATH'] = os.environ.get('PAGE_CACHE_PATH', os.path.join(app.instance_path, 'page_cache.db'))
+# Freed seats go to waitlisted users from a background thread; WAITLIST_ASYNC=0
+# promotes inside the cancelling request instead
+app.config['WAITLIST_ASYNC'] = os.environ.get('WAITLIST_ASYNC', '1') == '1'
+app.config['WAITLIST_BATCH_SIZE'] = int(os.environ.get('WAITLIST_BATCH_SIZE', 500))
+app.config['WAITLIST_SWEEP_SECONDS'] = float(os.environ.get('WAITLIST_SWEEP_SECONDS', 30))
+# JSON API: responses at least this big are gzipped for clients that accept it;
+# since= sync tokens step back a few seconds to catch transactions still committing
+app.config['API_GZIP_MIN_BYTES'] = int(os.environ.get('API_GZIP_MIN_BYTES', 512))
+app.config['API_SYNC_OVERLAP_SECONDS'] = int(os.environ.get('API_SYNC_OVERLAP_SECONDS', 5))
+# Live seat counts as Server-Sent Events, served by an asyncio server on its own
+# port; off unless SEAT_STREAM=1, and only started by the process entry point
+# (seat_stream.start()). SEAT_STREAM_URL is the public base URL behind a proxy
+app.config['SEAT_STREAM'] = os.environ.get('SEAT_STREAM', '0') == '1'
+app.config['SEAT_STREAM_HOST'] = os.environ.get('SEAT_STREAM_HOST', '127.0.0.1')
+app.config['SEAT_STREAM_PORT'] = int(os.environ.get('SEAT_STREAM_PORT', 5001))
+app.config['SEAT_STREAM_URL'] = os.environ.get('SEAT_STREAM_URL', '')
+app.config['SEAT_STREAM_TICK_MS'] = int(os.environ.get('SEAT_STREAM_TICK_MS', 100))
+app.config['SEAT_STREAM_POLL_SECONDS'] = float(os.environ.get('SEAT_STREAM_POLL_SECONDS', 5))
+app.config['SEAT_STREAM_HEARTBEAT_SECONDS'] = float(os.environ.get('SEAT_STREAM_HEARTBEAT_SECONDS', 15))
+app.config['SEAT_STREAM_MAX_EVENTS'] = 50  # Per multiplexed connection
+# Raw login rows older than this many days are rolled up and archived by archive-logins
+app.config['LOGIN_RETENTION_DAYS'] = int(os.environ.get('LOGIN_RETENTION_DAYS', 90))
+app.config['LOGIN_ARCHIVE_DIR'] = os.environ.get('LOGIN_ARCHIVE_DIR', os.path.join(app.instance_path, 'login_archive'))
+# run-jobs queues an admin analytics refresh once they are older than this; 0 leaves it to refresh-analytics
+app.config['ANALYTICS_REFRESH_SECONDS'] = int(os.environ.get('ANALYTICS_REFRESH_SECONDS', 300))
+# Compiled templates are kept here and reused by later processes ('' to disable);
+# WARM_UP_PATHS are fetched once by warm_up() so the first real request is fast
+app.config['JINJA_CACHE_DIR'] = os.environ.get('JINJA_CACHE_DIR', os.path.join(app.instance_path, 'jinja_cache'))
+app.config['WARM_UP_PATHS'] = [p for p in os.environ.get('WARM_UP_PATHS', '/,/events,/api/v1/events').split(',') if p]
+# Sessions: 'sqlite' keeps them server-side in SESSION_STORE_PATH (the cookie holds
+# only an id), 'cookie' uses Flask's signed cookies. Auth checks read users through
+# a per-process cache, so role and is_active changes reach other workers within
+# PRINCIPAL_CACHE_TTL seconds
+app.config['SESSION_STORE'] = os.environ.get('SESSION_STORE', 'sqlite')
+app.config['SESSION_STORE_PATH'] = os.environ.get('SESSION_STORE_PATH', os.path.join(app.instance_path, 'sessions.db'))
+app.config['SESSION_SWEEP_SECONDS'] = float(os.environ.get('SESSION_SWEEP_SECONDS', 300))
+app.config['PRINCIPAL_CACHE_SIZE'] = int(os.environ.get('PRINCIPAL_CACHE_SIZE', 10000))
+app.config['PRINCIPAL_CACHE_TTL'] = float(os.environ.get('PRINCIPAL_CACHE_TTL', 30))
+# Venue scheduling: SCHEDULE_CONFLICTS is 'reject' (refuse a double booking) or
+# 'warn' (create it with a warning); free slots are looked for within VENUE_HOURS
+app.config['SCHEDULE_CONFLICTS'] = os.environ.get('SCHEDULE_CONFLICTS', 'reject')
+app.config['VENUE_HOURS'] = os.environ.get('VENUE_HOURS', '08:00-22:00')
+# Calendar: REGISTRATION_CLASHES is 'warn' (register, flagging overlaps with the
+# student's other events) or 'reject'; CALENDAR_NAME titles the .ics feed
+app.config['REGISTRATION_CLASHES'] = os.environ.get('REGISTRATION_CLASHES', 'warn')
+app.config['CALENDAR_NAME'] = os.environ.get('CALENDAR_NAME', 'College Events')
+# Background jobs: notices and reminders are queued in the job table and sent by
+# `flask run-jobs` to NOTIFY_OUTBOX_DIR (a mail-sink stand-in: one JSON line per
+# message). A worker's lease lasts JOB_LEASE_SECONDS; failed jobs retry with
+# exponential backoff from JOB_RETRY_SECONDS, up to JOB_MAX_ATTEMPTS runs
+app.config['NOTIFICATIONS'] = os.environ.get('NOTIFICATIONS', '1') == '1'
+app.config['NOTIFY_OUTBOX_DIR'] = os.environ.get('NOTIFY_OUTBOX_DIR', os.path.join(app.instance_path, 'outbox'))
+app.config['NOTIFY_BATCH_SIZE'] = int(os.environ.get('NOTIFY_BATCH_SIZE', 500))
+app.config['REMINDER_HOURS'] = float(os.environ.get('REMINDER_HOURS', 24))
+app.config['JOB_LEASE_SECONDS'] = int(os.environ.get('JOB_LEASE_SECONDS', 60))
+app.config['JOB_RETRY_SECONDS'] = int(os.environ.get('JOB_RETRY_SECONDS', 30))
+app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+app.config['JOB_RETENTION_DAYS'] = int(os.environ.get('JOB_RETENTION_DAYS', 7))
+# Exports: rows fetched from the cursor and written per chunk of the download
+app.config['EXPORT_BATCH_SIZE'] = int(os.environ.get('EXPORT_BATCH_SIZE', 2000))
+app.config['EVENTS_PER_PAGE'] = 20
+app.config['USERS_PER_PAGE'] = 50
+
+# The pragmas SQLITE_PRAGMAS may set, with their allowed values (int: any integer)
+SQLITE_PRAGMA_VALUES = {
+    'journal_mode': {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'},
+    'synchronous': {'OFF', 'NORMAL', 'FULL', 'EXTRA', '0', '1', '2', '3'},
+    'busy_timeout': int,
+    'mmap_size': int,
+    'cache_size': int,
+}
+
+def sqlite_pragma_statements(pragmas):
+    """PRAGMA statements for {name: value}; raises ValueError for anything outside SQLITE_PRAGMA_VALUES"""
+    statements = []
+    for name, value in pragmas.items():
+        allowed = SQLITE_PRAGMA_VALUES.get(name)
+        if allowed is None:
+            raise ValueError(f'Unsupported SQLite pragma: {name!r}')
+        if allowed is int:
+            value = int(value)
+        elif str(value).upper() in allowed:
+            value = str(value).upper()
+        else:
+            raise ValueError(f'Invalid value for SQLite pragma {name}: {value!r}')
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers run alongside the writer; busy_timeout makes writers queue instead of failing"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        for statement in sqlite_pragma_statements(app.config['SQLITE_PRAGMAS']):
+            cursor.execute(statement)
+        cursor.close()
 
 db = SQLAlchemy(app)
+sqlite_pragma_statements(app.config['SQLITE_PRAGMAS'])  # Fail at start-up, not on the first connection
+with app.app_context():
+    # Only the app's own engine; other engines in the process keep their settings
+    sa_event.listen(db.engine, 'connect', apply_sqlite_pragmas)
 
 # Database Models - Clean and Working
 class User(db.Model):
+    __table_args__ = (
+        db.Index('ix_user_role', 'role'),
+        db.Index('ix_user_created_at', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     full_name = db.Column(db.String(100), nullable=False)
     role = db.Column(db.String(20), default='student')
     last_login = db.Column(db.DateTime, nullable=True)
@@ -24,6 +238,19 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class Event(db.Model):
+    __table_args__ = (
+        # Upcoming-events filter: status = 'active' AND event_date >= today
+        db.Index('ix_event_status_date', 'status', 'event_date'),
+        db.Index('ix_event_created_at', 'created_at'),
+        db.Index('ix_event_category', 'category'),
+        # Waitlist sweep: the few events with anyone queued
+        db.Index('ix_event_waitlist', 'waitlist_count'),
+        # API change checks and since= sync
+        db.Index('ix_event_updated_at', 'updated_at'),
+        # Venue double-booking checks and free slots: one range per venue and days
+        db.Index('ix_event_venue_schedule', 'venue', 'status', 'event_date', 'event_time'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=True)
@@ -31,19 +258,44 @@ class Event(db.Model):
     event_time = db.Column(db.Time, nullable=False)
     venue = db.Column(db.String(100), nullable=False)
     capacity = db.Column(db.Integer, nullable=False)
+    # How long the venue is booked from event_time
+    duration_minutes = db.Column(db.Integer, nullable=False, default=60, server_default='60')
     category = db.Column(db.String(50), default='general')
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     status = db.Column(db.String(20), default='active')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Seats taken and queue length, kept in step with 'registered' and
+    # 'waitlisted' rows by every join, cancellation and promotion
+    registered_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    waitlist_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by every ORM or Core update, seat counts included
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Registration(db.Model):
+    __table_args__ = (
+        # Also serves every user_id lookup through its leading column
+        db.UniqueConstraint('user_id', 'event_id', name='uq_registration_user_event'),
+        # Per-event counts by status, and the waitlist in FIFO order
+        db.Index('ix_registration_event_status_date', 'event_id', 'status', 'registration_date'),
+        # Incremental analytics refresh: changed rows, then their days
+        db.Index('ix_registration_updated_at', 'updated_at'),
+        db.Index('ix_registration_date', 'registration_date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     event_id = db.Column(db.Integer, db.ForeignKey('event.id'), nullable=False)
     registration_date = db.Column(db.DateTime, default=datetime.utcnow)
-    status = db.Column(db.String(20), default='registered')
+    status = db.Column(db.String(20), default='registered')  # registered, waitlisted or cancelled
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class LoginActivity(db.Model):
+    __table_args__ = (
+        db.Index('ix_login_activity_login_time', 'login_time'),
+        db.Index('ix_login_activity_user', 'user_id'),
+        db.Index('ix_login_activity_session_key', 'session_key', unique=True),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     login_time = db.Column(db.DateTime, default=datetime.utcnow)
@@ -51,14 +303,530 @@ class LoginActivity(db.Model):
     ip_address = db.Column(db.String(45), nullable=True)
     user_agent = db.Column(db.String(200), nullable=True)
     session_duration = db.Column(db.Integer, nullable=True)
+    # Generated at login so logout can find the row before it has an id
+    session_key = db.Column(db.String(32), nullable=True)
+
+# One row per UTC day of logins, kept after the raw rows are archived
+class LoginActivityDaily(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    logins = db.Column(db.Integer, nullable=False, default=0)
+    unique_users = db.Column(db.Integer, nullable=False, default=0)
+    timed_sessions = db.Column(db.Integer, nullable=False, default=0)  # Logins with a session_duration
+    session_minutes = db.Column(db.Integer, nullable=False, default=0)
+
+    @property
+    def avg_session_minutes(self):
+        return self.session_minutes / self.timed_sessions if self.timed_sessions else None
+
+# Admin analytics: per-event fill, per-term category totals and sign-ups per day,
+# all rebuilt from the tables above by refresh_analytics()
+class EventAnalytics(db.Model):
+    __table_args__ = (
+        # Fullest / emptiest events of a term
+        db.Index('ix_event_analytics_term_fill', 'year', 'term', 'fill_rate'),
+    )
+
+    event_id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, nullable=False)
+    term = db.Column(db.String(10), nullable=False)  # spring, summer or fall
+    category = db.Column(db.String(50), nullable=False)
+    capacity = db.Column(db.Integer, nullable=False)
+    registered = db.Column(db.Integer, nullable=False)
+    waitlisted = db.Column(db.Integer, nullable=False)
+    fill_rate = db.Column(db.Float, nullable=False)
+
+class CategoryTermAnalytics(db.Model):
+    year = db.Column(db.Integer, primary_key=True)
+    term = db.Column(db.String(10), primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    events = db.Column(db.Integer, nullable=False)
+    capacity = db.Column(db.Integer, nullable=False)
+    registered = db.Column(db.Integer, nullable=False)
+    waitlisted = db.Column(db.Integer, nullable=False)
+
+class RegistrationDaily(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(50), primary_key=True)
+    registered = db.Column(db.Integer, nullable=False)
+    waitlisted = db.Column(db.Integer, nullable=False)
+
+class AnalyticsWatermark(db.Model):
+    name = db.Column(db.String(40), primary_key=True)
+    refreshed_at = db.Column(db.DateTime, nullable=False)  # Rows updated after this are re-read next time
+
+# Registration days that re-joins moved rows off, for the next incremental refresh to recount
+class AnalyticsStaleDay(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+
+class Job(db.Model):
+    __table_args__ = (
+        # Claiming: due jobs (queued, or leased past their expiry), oldest first
+        db.Index('ix_job_state_run_at', 'state', 'run_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(40), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    state = db.Column(db.String(10), nullable=False, default='queued')  # queued, leased, done or failed
+    # When it is due; while leased, when the lease runs out; once done or failed, when it ended
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    lease_owner = db.Column(db.String(80))
+    last_error = db.Column(db.Text)
+    dedupe_key = db.Column(db.String(120), unique=True)  # At most one job per key, e.g. per event reminder
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Running totals for the dashboards, shared by every worker through the database
+class StatCounter(db.Model):
+    name = db.Column(db.String(80), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+# Stats - counters maintained on flush so dashboards never rescan the tables
+STAT_FIELDS = {
+    User: ('role',),
+    Event: ('status', 'category'),
+    Registration: ('status',),
+    LoginActivity: ('login_time',),
+}
+
+_stats_cache = {'values': {}, 'expires': 0.0}
+
+# Load the previous value whenever a tracked field is overwritten, so the
+# flush hook can tell which counters a row moved out of
+for model, fields in STAT_FIELDS.items():
+    for field in fields:
+        sa_event.listen(getattr(model, field), 'set', lambda *args: None, active_history=True)
+
+def stat_keys(model, values):
+    """Counter names a row with the given field values contributes 1 to"""
+    if model is User:
+        return ['users', 'users:student'] if values['role'] == 'student' else ['users']
+    if model is Event:
+        keys = ['events', f"events:category:{values['category']}"]
+        if values['status'] == 'active':
+            keys.append('events:active')
+        return keys
+    if model is Registration:
+        return ['registrations', f"registrations:{values['status']}"]
+    if model is LoginActivity:
+        return [f"logins:{values['login_time'].date()}"] if values['login_time'] else []
+    return []
+
+def bump_stats(connection, deltas):
+    """Add `deltas` ({name: change}) to the shared counters"""
+    rows = [{'name': name, 'delta': delta} for name, delta in deltas.items() if delta]
+    if rows:
+        connection.execute(db.text(
+            "INSERT INTO stat_counter (name, value) VALUES (:name, :delta) "
+            "ON CONFLICT (name) DO UPDATE SET value = stat_counter.value + excluded.value"
+        ), rows)
+
+@sa_event.listens_for(db.session, 'after_flush')
+def count_stat_changes(session, flush_context):
+    """Turn the rows inserted, deleted or re-classified by this flush into counter deltas"""
+    deltas = Counter()
+    for obj in session.new:
+        fields = STAT_FIELDS.get(type(obj))
+        if fields:
+            deltas.update(stat_keys(type(obj), {f: getattr(obj, f) for f in fields}))
+    for obj in session.deleted:
+        fields = STAT_FIELDS.get(type(obj))
+        if fields:
+            deltas.subtract(stat_keys(type(obj), {f: getattr(obj, f) for f in fields}))
+    for obj in session.dirty:
+        fields = STAT_FIELDS.get(type(obj))
+        if not fields:
+            continue
+        attrs = db.inspect(obj).attrs
+        if not any(attrs[f].history.has_changes() for f in fields):
+            continue
+        old = {f: attrs[f].history.deleted[0] if attrs[f].history.deleted else getattr(obj, f)
+               for f in fields}
+        deltas.subtract(stat_keys(type(obj), old))
+        deltas.update(stat_keys(type(obj), {f: getattr(obj, f) for f in fields}))
+
+    if any(deltas.values()):
+        bump_stats(session.connection(), deltas)
+        session.info['stats_changed'] = True
+
+@sa_event.listens_for(db.session, 'after_commit')
+def expire_local_stats(session):
+    # Other workers pick the change up once their cache TTL runs out
+    if session.info.pop('stats_changed', False):
+        invalidate_stats()
+
+@sa_event.listens_for(db.session, 'after_rollback')
+def discard_stat_changes(session):
+    session.info.pop('stats_changed', None)
+
+def get_stats():
+    """Return {counter name: value}, re-read from the database at most every STATS_CACHE_TTL seconds"""
+    now = time.monotonic()
+    if now >= _stats_cache['expires']:
+        values = dict(db.session.query(StatCounter.name, StatCounter.value).all())
+        _stats_cache.update(values=values, expires=now + app.config['STATS_CACHE_TTL'])
+    return _stats_cache['values']
+
+def invalidate_stats():
+    """Drop this process's cached stats so the next read goes to the database"""
+    _stats_cache['expires'] = 0.0
+
+def rebuild_stats():
+    """Recount every stat counter from the base tables"""
+    counts = Counter()
+    for role, n in db.session.query(User.role, db.func.count(User.id)).group_by(User.role):
+        counts.update({key: n for key in stat_keys(User, {'role': role})})
+    for status, category, n in db.session.query(
+            Event.status, Event.category, db.func.count(Event.id)).group_by(Event.status, Event.category):
+        for key in stat_keys(Event, {'status': status, 'category': category}):
+            counts[key] += n
+    for status, n in db.session.query(
+            Registration.status, db.func.count(Registration.id)).group_by(Registration.status):
+        for key in stat_keys(Registration, {'status': status}):
+            counts[key] += n
+    for day, n in db.session.query(
+            db.func.date(LoginActivity.login_time), db.func.count(LoginActivity.id)).group_by(
+            db.func.date(LoginActivity.login_time)):
+        counts[f'logins:{day}'] += n
+    # Rolled-up days may have been archived, fully or part way
+    for day, n in db.session.query(LoginActivityDaily.day, LoginActivityDaily.logins):
+        counts[f'logins:{day}'] = n
+
+    StatCounter.query.filter(StatCounter.name != EVENTS_VERSION).delete()  # Never goes back
+    bump_stats(db.session.connection(), counts)
+    db.session.commit()
+    invalidate_stats()
+
+# Search - SQLite FTS5 index over events, kept in sync by triggers
+EVENT_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS event_fts USING fts5(
+        title, description, venue, category,
+        content='event', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS event_fts_ai AFTER INSERT ON event BEGIN
+        INSERT INTO event_fts (rowid, title, description, venue, category)
+        VALUES (new.id, new.title, new.description, new.venue, new.category);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS event_fts_ad AFTER DELETE ON event BEGIN
+        INSERT INTO event_fts (event_fts, rowid, title, description, venue, category)
+        VALUES ('delete', old.id, old.title, old.description, old.venue, old.category);
+    END""",
+    # Only the searchable columns, so seat counter updates never touch the index
+    """CREATE TRIGGER IF NOT EXISTS event_fts_au AFTER UPDATE OF title, description, venue, category ON event BEGIN
+        INSERT INTO event_fts (event_fts, rowid, title, description, venue, category)
+        VALUES ('delete', old.id, old.title, old.description, old.venue, old.category);
+        INSERT INTO event_fts (rowid, title, description, venue, category)
+        VALUES (new.id, new.title, new.description, new.venue, new.category);
+    END""",
+]
+
+_event_search = {'fts': None}
+
+def setup_event_search():
+    """Create the FTS5 index and its triggers, filling the index if it is new"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    inspector = db.inspect(db.engine)
+    is_new = 'event_fts' not in inspector.get_table_names()
+    try:
+        with db.engine.begin() as conn:
+            for ddl in EVENT_SEARCH_DDL:
+                conn.execute(db.text(ddl))
+            if is_new:
+                conn.execute(db.text("INSERT INTO event_fts (event_fts) VALUES ('rebuild')"))
+    except Exception as e:
+        print(f"Event search setup error: {e}")
+        return False
+    _event_search['fts'] = None
+    return True
+
+def event_search_available():
+    """True when the FTS5 index exists (checked once per process)"""
+    if _event_search['fts'] is None:
+        _event_search['fts'] = (db.engine.dialect.name == 'sqlite'
+                                and 'event_fts' in db.inspect(db.engine).get_table_names())
+    return _event_search['fts']
+
+def fts_match_expression(search):
+    """Turn free text into an FTS5 query: every word must match, as a prefix"""
+    words = re.findall(r'\w+', search)
+    return ' '.join(f'"{word}"*' for word in words)
+
+def apply_event_search(query, search, use_fts=None):
+    """Filter an Event query by `search`
+
+    Returns (query, rank) where rank is the BM25 column to order by (lower is
+    better), or None when the FTS index is unavailable and titles are matched
+    with LIKE instead.
+    """
+    if use_fts is None:
+        use_fts = event_search_available()
+    match = fts_match_expression(search)
+    if not (use_fts and match):
+        return query.filter(Event.title.contains(search)), None
+
+    # bm25() weights: title matches count most, then category, venue, description
+    ranked = db.text(
+        "SELECT rowid AS id, bm25(event_fts, 10.0, 1.0, 2.0, 3.0) AS rank "
+        "FROM event_fts WHERE event_fts MATCH :match"
+    ).bindparams(match=match).columns(id=db.Integer, rank=db.Float).subquery()
+    return query.join(ranked, ranked.c.id == Event.id), ranked.c.rank
+
+# Listing - lean row projections paged by keyset cursors
+# List rows carry a short description excerpt rather than the full text
+EVENT_LIST_COLUMNS = (
+    Event.id, Event.title, db.func.substr(Event.description, 1, 200).label('description'),
+    Event.event_date, Event.event_time, Event.venue, Event.capacity, Event.category,
+    Event.registered_count,
+)
+USER_LIST_COLUMNS = (
+    User.id, User.username, User.email, User.full_name, User.role,
+    User.last_login, User.is_active, User.created_at,
+)
+
+def encode_cursor(values):
+    """Pack the sort key of the last row on a page into a URL-safe token"""
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(token, keys):
+    """Inverse of encode_cursor, typed by the key columns; None if missing or malformed"""
+    if not token:
+        return None
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            return None
+        decoded = []
+        for key, value in zip(keys, values):
+            kind = key.type.python_type
+            decoded.append(kind.fromisoformat(value) if kind in (date, datetime) else kind(value))
+        return decoded
+    except (ValueError, TypeError, binascii.Error, NotImplementedError):
+        return None
+
+def keyset_page(query, keys, cursor=None, per_page=20, descending=False):
+    """Fetch the page of `query` after `cursor`, ordered by `keys`
+
+    Seeks straight to the cursor position with a row-value comparison instead
+    of OFFSET, so every page costs the same. Rows must expose each key by
+    name. Returns (rows, next_cursor), next_cursor being None on the last page.
+    """
+    after = decode_cursor(cursor, keys)
+    if after is not None:
+        position = db.tuple_(*keys)
+        query = query.filter(position < tuple(after) if descending else position > tuple(after))
+
+    query = query.order_by(*[key.desc() if descending else key.asc() for key in keys])
+    rows = query.limit(per_page + 1).all()
+    if len(rows) <= per_page:
+        return rows, None
+    rows = rows[:per_page]
+    return rows, encode_cursor([getattr(rows[-1], key.key) for key in keys])
+
+def event_list_query(search='', category='', date_filter=''):
+    """Active events as list rows, plus the keys to page them by"""
+    query = db.session.query(*EVENT_LIST_COLUMNS).filter(Event.status == 'active')
+    keys = [Event.event_date, Event.id]
+
+    if search:
+        query, rank = apply_event_search(query, search)
+        if rank is not None:
+            query = query.add_columns(rank)
+            keys = [rank, Event.id]
+
+    if category:
+        query = query.filter(Event.category == category)
+
+    if date_filter:
+        try:
+            filter_date = datetime.strptime(date_filter, '%Y-%m-%d').date()
+            query = query.filter(Event.event_date == filter_date)
+        except ValueError:
+            pass
+
+    return query, keys
+
+def row_to_dict(row):
+    """JSON-ready dict of a projection row"""
+    return {name: value.isoformat() if hasattr(value, 'isoformat') else value
+            for name, value in row._mapping.items()}
+
+# Sessions - server-side session store, and cached user principals for the auth checks
+class ServerSession(CallbackDict, SessionMixin):
+    """Session data held by SessionStore; the cookie carries only its random id"""
+
+    def __init__(self, data=None, sid=None, expires=0.0):
+        def on_update(self):
+            self.modified = True
+        super().__init__(data, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.issued_to = self.get('user_id')  # A change of user gets a new id
+        self.modified = False
+
+class SessionStore(SessionInterface):
+    """Sessions in a SQLite file shared by every worker on the host, expiring
+    after PERMANENT_SESSION_LIFETIME without a request"""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS session (id TEXT PRIMARY KEY, data TEXT, expires REAL)",
+        "CREATE INDEX IF NOT EXISTS ix_session_expires ON session (expires)",
+    )
+    serializer = TaggedJSONSerializer()  # What Flask's cookie sessions use: keeps tuples, dates, bytes
+
+    def __init__(self, path, sweep_seconds):
+        self.path = path
+        self.sweep_seconds = sweep_seconds
+        self.next_sweep = 0.0
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self.local.conn = conn
+        return conn
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self.connection().execute('SELECT data, expires FROM session WHERE id = ?', (sid,)).fetchone()
+            if row is not None and row[1] > time.time():
+                return ServerSession(self.serializer.loads(row[0]), sid, row[1])
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name, domain, path = self.get_cookie_name(app), self.get_cookie_domain(app), self.get_cookie_path(app)
+        conn = self.connection()
+        if session.sid and (not session or session.get('user_id') != session.issued_to):
+            # Cleared (logout), or now someone else's: the old id must stop working
+            conn.execute('DELETE FROM session WHERE id = ?', (session.sid,))
+            session.sid = None
+            if not session:
+                response.delete_cookie(name, domain=domain, path=path, secure=self.get_cookie_secure(app),
+                                       samesite=self.get_cookie_samesite(app), httponly=self.get_cookie_httponly(app))
+        if not session:
+            return
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        # Unchanged sessions are only rewritten (to push their expiry back) once half their lifetime has gone
+        if session.sid and not session.modified and session.expires - now > lifetime / 2:
+            return
+        new = session.sid is None
+        if new:
+            session.sid = secrets.token_urlsafe(32)
+        conn.execute('INSERT OR REPLACE INTO session VALUES (?, ?, ?)',
+                     (session.sid, self.serializer.dumps(dict(session)), now + lifetime))
+        if new:
+            response.set_cookie(name, session.sid, expires=self.get_expiration_time(app, session),
+                                httponly=self.get_cookie_httponly(app), domain=domain, path=path,
+                                secure=self.get_cookie_secure(app), samesite=self.get_cookie_samesite(app))
+        if now >= self.next_sweep:
+            self.next_sweep = now + self.sweep_seconds
+            conn.execute('DELETE FROM session WHERE expires < ?', (now,))
+
+if app.config['SESSION_STORE'] == 'sqlite':
+    app.session_interface = SessionStore(app.config['SESSION_STORE_PATH'], app.config['SESSION_SWEEP_SECONDS'])
+
+# What login_required/admin_required need to know about a user
+UserPrincipal = namedtuple('UserPrincipal', 'id username role full_name is_active')
+PRINCIPAL_FIELDS = ('username', 'role', 'full_name', 'is_active')
+
+class PrincipalCache:
+    """LRU of user principals, each trusted for at most `ttl` seconds
+
+    Commits in this process that change a user drop their entry at once; the
+    TTL bounds how long other workers keep serving the old role or is_active.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()  # user id -> (principal or None, expires)
+        self.generation = 0
+        self.counts = Counter()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[1] > now:
+                self.entries.move_to_end(user_id)
+                self.counts['hits'] += 1
+                return entry[0]
+            generation = self.generation
+        self.counts['misses'] += 1
+        row = db.session.query(User.id, User.username, User.role, User.full_name, User.is_active).filter(
+            User.id == user_id).first()
+        principal = UserPrincipal(*row) if row else None
+        with self.lock:
+            if generation == self.generation:  # Not read from rows that changed meanwhile
+                self.entries[user_id] = (principal, now + self.ttl)
+                self.entries.move_to_end(user_id)
+                while len(self.entries) > self.max_size:
+                    self.entries.popitem(last=False)
+        return principal
+
+    def discard(self, user_ids):
+        with self.lock:
+            self.generation += 1
+            for user_id in user_ids:
+                self.entries.pop(user_id, None)
+
+principal_cache = PrincipalCache(app.config['PRINCIPAL_CACHE_SIZE'], app.config['PRINCIPAL_CACHE_TTL'])
+
+@sa_event.listens_for(db.session, 'after_flush')
+def collect_principal_changes(session, flush_context):
+    changed = {obj.id for obj in session.deleted if isinstance(obj, User)}
+    changed.update(obj.id for obj in session.dirty if isinstance(obj, User) and any(
+        db.inspect(obj).attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS))
+    if changed:
+        session.info.setdefault('principals_changed', set()).update(changed)
+
+@sa_event.listens_for(db.session, 'after_commit')
+def discard_changed_principals(session):
+    changed = session.info.pop('principals_changed', None)
+    if changed:
+        principal_cache.discard(changed)
+
+@sa_event.listens_for(db.session, 'after_rollback')
+def forget_principal_changes(session):
+    session.info.pop('principals_changed', None)
+
+def current_principal():
+    """The logged-in user's principal, or None if nobody is logged in or the
+    account has since been deactivated or deleted"""
+    if 'principal' not in g:
+        user_id = session.get('user_id')
+        principal = principal_cache.get(user_id) if user_id is not None else None
+        g.principal = principal if principal is not None and principal.is_active else None
+    return g.principal
+
+def end_revoked_session():
+    """If the session belongs to a deactivated or deleted account, clear it;
+    returns the message to show"""
+    if 'user_id' in session:
+        session.clear()
+        return 'Your account is no longer active.'
+    return 'Please log in to access this page.'
 
 # Helper Functions
 def login_required(f):
     from functools import wraps
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please log in to access this page.', 'error')
+        if current_principal() is None:
+            flash(end_revoked_session(), 'error')
             return redirect(url_for('login'))
         return f(*args, **kwargs)
     return decorated_function
@@ -67,43 +835,245 @@ def admin_required(f):
     from functools import wraps
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please log in to access this page.', 'error')
+        principal = current_principal()
+        if principal is None:
+            flash(end_revoked_session(), 'error')
             return redirect(url_for('login'))
 
-        user = db.session.get(User, session['user_id'])
-        if not user or user.role != 'admin':
+        if principal.role != 'admin':
             flash('Admin access required.', 'error')
             return redirect(url_for('dashboard'))
         return f(*args, **kwargs)
     return decorated_function
 
-def track_login(user_id):
-    """Track user login activity"""
+USERNAME_TAKEN = 'Username already exists. Please choose another.'
+EMAIL_TAKEN = 'Email already registered. Please use another email.'
+
+def validate_user_fields(username, email, password, full_name):
+    """Field rules for a new account; returns an error message or None"""
+    if not all([username, email, password, full_name]):
+        return 'All fields are required.'
+    if len(password) < 6:
+        return 'Password must be at least 6 characters long.'
+    return None
+
+def parse_event_fields(title, event_date, event_time, venue, capacity, duration=None):
+    """Field rules for a new event; returns (error, parsed) where parsed holds
+    the typed capacity, event_date, event_time and duration_minutes"""
+    if not all([title, event_date, event_time, venue, capacity]):
+        return 'All fields are required.', None
+
     try:
-        activity = LoginActivity(
-            user_id=user_id,
-            ip_address=request.remote_addr,
-            user_agent=request.headers.get('User-Agent', '')[:200] if request.headers.get('User-Agent') else ''
-        )
-        db.session.add(activity)
+        capacity = int(capacity)
+    except ValueError:
+        return 'Invalid capacity value.', None
+    if capacity <= 0:
+        return 'Capacity must be a positive number.', None
 
-        # Update user's last login
-        user = db.session.get(User, user_id)
-        if user:
-            user.last_login = datetime.utcnow()
-        db.session.commit()
+    try:
+        event_date_obj = datetime.strptime(event_date, '%Y-%m-%d').date()
+        event_time_obj = datetime.strptime(event_time, '%H:%M').time()
+    except ValueError:
+        return 'Failed to create event. Please check your inputs.', None
 
-        # Store login activity ID in session for logout tracking
-        session['login_activity_id'] = activity.id
-    except Exception as e:
-        print(f"Login tracking error: {e}")
-        db.session.rollback()
+    try:
+        duration = int(duration) if duration else 60
+    except ValueError:
+        return 'Invalid duration value.', None
+    if not 0 < duration <= MAX_EVENT_MINUTES:
+        return f'Duration must be between 1 and {MAX_EVENT_MINUTES} minutes.', None
+
+    return None, {'capacity': capacity, 'event_date': event_date_obj, 'event_time': event_time_obj,
+                  'duration_minutes': duration}
+
+_hash_prefix = {}
+
+def hash_password(password):
+    """Hash a password with the configured method"""
+    return generate_password_hash(password, method=app.config['PASSWORD_HASH_METHOD'])
+
+def hash_passwords(passwords, pool=None):
+    """Hash many passwords, spread across `pool` (a ProcessPoolExecutor) when given"""
+    if pool is None:
+        return [hash_password(password) for password in passwords]
+    hasher = partial(generate_password_hash, method=app.config['PASSWORD_HASH_METHOD'])
+    workers = app.config['PASSWORD_HASH_WORKERS']
+    return list(pool.map(hasher, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+def password_hash_pool():
+    """A process pool for bulk hashing, or None when only one worker is configured"""
+    from concurrent.futures import ProcessPoolExecutor  # Only bulk imports need it; keep it off startup
+
+    workers = app.config['PASSWORD_HASH_WORKERS']
+    return ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+def password_needs_rehash(password_hash):
+    """True when a stored hash was made with other parameters than the configured method"""
+    method = app.config['PASSWORD_HASH_METHOD']
+    if method not in _hash_prefix:
+        # Werkzeug fills in defaults (e.g. 'pbkdf2' -> 'pbkdf2:sha256:600000'),
+        # so learn the full prefix from one throwaway hash
+        _hash_prefix[method] = generate_password_hash('', method=method).split('$', 1)[0]
+    return password_hash.split('$', 1)[0] != _hash_prefix[method]
+
+# Audit trail - login/logout records written in batches off the request path
+class AuditWriter:
+    """Buffers login/logout records in a bounded queue and writes them from a
+    background thread, one transaction per AUDIT_BATCH_SIZE records or
+    AUDIT_FLUSH_MS milliseconds, whichever comes first"""
+
+    def __init__(self):
+        self.queue = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.exit_hook = False
+
+    def submit(self, record):
+        """Queue a record without blocking; it is dropped if the queue is full"""
+        if not app.config['AUDIT_ASYNC']:
+            self.write([record])
+            return
+        self.start()
+        try:
+            self.queue.put_nowait(record)
+            self.counts['queued'] += 1
+        except queue.Full:
+            self.counts['dropped'] += 1
+            if self.counts['dropped'] % 100 == 1:
+                print(f"Audit queue full: {self.counts['dropped']} records dropped so far")
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.queue = queue.Queue(maxsize=app.config['AUDIT_QUEUE_SIZE'])
+                self.thread = threading.Thread(target=self.run, name='audit-writer', daemon=True)
+                self.thread.start()
+                if not self.exit_hook:
+                    atexit.register(self.stop)
+                    self.exit_hook = True
+
+    def stop(self, timeout=5):
+        """Write everything queued so far and stop the thread"""
+        with self.lock:
+            thread, self.thread = self.thread, None
+            if thread is None:
+                return
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                print("Audit writer did not drain in time")
+                return
+            thread.join(timeout)
+
+    def run(self):
+        batch_size = app.config['AUDIT_BATCH_SIZE']
+        interval = app.config['AUDIT_FLUSH_MS'] / 1000
+        records = self.queue
+        while True:
+            record = records.get()
+            if record is None:
+                return
+            batch, stopping = [record], False
+            deadline = time.monotonic() + interval
+            while len(batch) < batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    record = records.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if record is None:
+                    stopping = True
+                    break
+                batch.append(record)
+            self.write(batch)
+            if stopping:
+                return
+
+    def write(self, batch):
+        """Insert logins, then apply logouts, in one transaction"""
+        logins = [r for r in batch if r['kind'] == 'login']
+        logouts = [r for r in batch if r['kind'] == 'logout']
+        activity = LoginActivity.__table__
+        try:
+            with app.app_context(), db.engine.begin() as conn:
+                if logins:
+                    conn.execute(activity.insert(), [{
+                        'session_key': r['session_key'],
+                        'user_id': r['user_id'],
+                        'login_time': r['login_time'],
+                        'ip_address': r['ip_address'],
+                        'user_agent': r['user_agent'],
+                    } for r in logins])
+                    conn.execute(
+                        User.__table__.update()
+                        .where(User.id == db.bindparam('b_user_id'))
+                        .values(last_login=db.bindparam('b_login_time')),
+                        [{'b_user_id': r['user_id'], 'b_login_time': r['login_time']} for r in logins]
+                    )
+                    bump_stats(conn, Counter(
+                        key for r in logins for key in stat_keys(LoginActivity, r)
+                    ))
+                if logouts:
+                    conn.execute(
+                        activity.update()
+                        .where(activity.c.session_key == db.bindparam('b_session_key'))
+                        .values(logout_time=db.bindparam('b_logout_time'),
+                                session_duration=db.bindparam('b_session_duration')),
+                        [{'b_session_key': r['session_key'], 'b_logout_time': r['logout_time'],
+                          'b_session_duration': r['session_duration']} for r in logouts]
+                    )
+            self.counts['written'] += len(batch)
+            self.counts['batches'] += 1
+            if logins:
+                invalidate_stats()
+        except Exception as e:
+            self.counts['failed'] += len(batch)
+            print(f"Audit write error: {e}")
+
+    def stats(self):
+        """Queue depth plus queued/written/dropped/failed record counts"""
+        depth = self.queue.qsize() if self.queue is not None else 0
+        return {'depth': depth, 'capacity': app.config['AUDIT_QUEUE_SIZE'],
+                **{name: self.counts[name] for name in ('queued', 'written', 'dropped', 'failed', 'batches')}}
+
+audit_writer = AuditWriter()
+
+def track_login(user_id):
+    """Track user login activity"""
+    login_time = datetime.utcnow()
+    session_key = uuid.uuid4().hex
+    audit_writer.submit({
+        'kind': 'login',
+        'session_key': session_key,
+        'user_id': user_id,
+        'login_time': login_time,
+        'ip_address': request.remote_addr,
+        'user_agent': request.headers.get('User-Agent', '')[:200] if request.headers.get('User-Agent') else ''
+    })
+
+    # Keep the key and start time in the session for logout tracking
+    session['login_activity_key'] = session_key
+    session['login_time'] = login_time.isoformat()
 
 def track_logout():
     """Track user logout activity"""
     try:
-        if 'login_activity_id' in session:
+        if 'login_activity_key' in session:
+            logout_time = datetime.utcnow()
+            login_time = datetime.fromisoformat(session['login_time'])
+            audit_writer.submit({
+                'kind': 'logout',
+                'session_key': session['login_activity_key'],
+                'logout_time': logout_time,
+                'session_duration': int((logout_time - login_time).total_seconds() / 60)
+            })
+        elif 'login_activity_id' in session:
+            # Sessions started before login records were queued
             activity = db.session.get(LoginActivity, session['login_activity_id'])
             if activity:
                 activity.logout_time = datetime.utcnow()
@@ -114,19 +1084,1164 @@ def track_logout():
     except Exception as e:
         print(f"Logout tracking error: {e}")
 
+# Waitlist - full events queue new sign-ups and freed seats go to whoever waited longest
+def lock_event_seats(event_id):
+    """Take the event row's write lock; returns (capacity, registered_count, waitlist_count)
+
+    Every seat change on an event updates its row first, so joins,
+    cancellations and promotions for the same event run one at a time
+    """
+    return db.session.execute(
+        db.update(Event)
+        .where(Event.id == event_id)
+        .values(registered_count=Event.registered_count, updated_at=Event.updated_at)  # Lock only
+        .returning(Event.capacity, Event.registered_count, Event.waitlist_count)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+def join_event(user_id, event_id):
+    """Register the user, or queue them if the event is full or already has a
+    queue; returns (status, changed), or None if the event doesn't exist"""
+    seats = lock_event_seats(event_id)
+    if seats is None:
+        db.session.rollback()
+        return None
+    registration = Registration.query.filter_by(user_id=user_id, event_id=event_id).first()
+    if registration is not None and registration.status != 'cancelled':
+        db.session.rollback()
+        return registration.status, False
+
+    if registration is None:
+        registration = Registration(user_id=user_id, event_id=event_id)
+        db.session.add(registration)
+    else:
+        mark_analytics_days([registration.registration_date.date()])
+    registration.registration_date = datetime.utcnow()  # Place in the queue
+    if seats.waitlist_count == 0 and seats.registered_count < seats.capacity:
+        registration.status, counter = 'registered', Event.registered_count
+    else:
+        registration.status, counter = 'waitlisted', Event.waitlist_count
+    db.session.execute(
+        db.update(Event).where(Event.id == event_id).values({counter: counter + 1})
+        .execution_options(synchronize_session=False)
+    )
+    enqueue_notifications(event_id, [user_id], registration.status)
+    db.session.commit()
+    return registration.status, True
+
+def cancel_registration_for(user_id, event_id):
+    """Cancel the user's registration or waitlist place; returns the status it
+    had, or None if there was nothing to cancel"""
+    seats = lock_event_seats(event_id)
+    registration = seats and Registration.query.filter_by(user_id=user_id, event_id=event_id).first()
+    if not registration or registration.status == 'cancelled':
+        db.session.rollback()
+        return None
+
+    previous = registration.status
+    counter = Event.registered_count if previous == 'registered' else Event.waitlist_count
+    db.session.execute(
+        db.update(Event).where(Event.id == event_id).values({counter: counter - 1})
+        .execution_options(synchronize_session=False)
+    )
+    registration.status = 'cancelled'
+    db.session.commit()
+    if previous == 'registered':
+        waitlist_promoter.notify(event_id)
+    return previous
+
+def promote_waitlist(event_id):
+    """Fill the event's free seats from the front of its waitlist, one batch per
+    transaction; returns how many users were promoted
+
+    Each batch is an index range read of (event_id, 'waitlisted') in
+    registration_date order, so the cost per seat doesn't grow with the queue.
+    """
+    promoted = 0
+    while True:
+        seats = lock_event_seats(event_id)
+        take = min(seats.capacity - seats.registered_count, seats.waitlist_count,
+                   app.config['WAITLIST_BATCH_SIZE']) if seats else 0
+        if take <= 0:
+            db.session.rollback()
+            return promoted
+        promoted_rows = db.session.query(Registration.id, Registration.user_id).filter(
+            Registration.event_id == event_id, Registration.status == 'waitlisted'
+        ).order_by(Registration.registration_date, Registration.id).limit(take).all()
+        ids = [registration_id for registration_id, _ in promoted_rows]
+        if ids:
+            db.session.execute(
+                db.update(Registration).where(Registration.id.in_(ids)).values(status='registered')
+                .execution_options(synchronize_session=False)
+            )
+        db.session.execute(
+            db.update(Event).where(Event.id == event_id).values(
+                registered_count=Event.registered_count + len(ids),
+                # A short read means the counter drifted; resync it to the queue
+                waitlist_count=Event.waitlist_count - len(ids) if len(ids) == take else 0,
+            ).execution_options(synchronize_session=False)
+        )
+        # Core updates skip the flush hooks
+        bump_stats(db.session.connection(), {'registrations:waitlisted': -len(ids),
+                                             'registrations:registered': len(ids)})
+        db.session.info['stats_changed'] = True
+        tag_changed_pages(db.session, [f'event:{event_id}', *(f'calendar:{user_id}' for _, user_id in promoted_rows)])
+        enqueue_notifications(event_id, [user_id for _, user_id in promoted_rows], 'promoted')
+        db.session.commit()
+        promoted += len(ids)
+        if len(ids) < take:
+            return promoted
+
+class WaitlistPromoter:
+    """Runs promote_waitlist from a background thread for events whose seats
+    were freed in this process, and every WAITLIST_SWEEP_SECONDS for any event
+    with both free seats and a queue (cancellations in other workers)"""
+
+    def __init__(self):
+        self.pending = set()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.stopping = False
+        self.counts = Counter()
+        self.exit_hook = False
+
+    def notify(self, event_id):
+        """Schedule a promotion pass for the event"""
+        if not app.config['WAITLIST_ASYNC']:
+            self.promote([event_id])
+            return
+        self.start()
+        with self.condition:
+            self.pending.add(event_id)
+            self.condition.notify()
+
+    def start(self):
+        if self.thread is not None:
+            return
+        with self.condition:
+            if self.thread is None:
+                self.stopping = False
+                self.thread = threading.Thread(target=self.run, name='waitlist-promoter', daemon=True)
+                self.thread.start()
+                if not self.exit_hook:
+                    atexit.register(self.stop)
+                    self.exit_hook = True
+
+    def stop(self, timeout=5):
+        """Promote for everything already scheduled and stop the thread"""
+        with self.condition:
+            thread, self.thread = self.thread, None
+            if thread is None:
+                return
+            self.stopping = True
+            self.condition.notify()
+        thread.join(timeout)
+
+    def run(self):
+        while True:
+            with self.condition:
+                if not self.pending and not self.stopping:
+                    self.condition.wait(app.config['WAITLIST_SWEEP_SECONDS'])
+                event_ids, self.pending = self.pending, set()
+                stopping = self.stopping
+            if event_ids:
+                self.promote(event_ids)
+            elif not stopping:
+                self.sweep()
+            if stopping:
+                return
+
+    def sweep(self):
+        try:
+            with app.app_context():
+                event_ids = [event_id for (event_id,) in db.session.query(Event.id).filter(
+                    Event.waitlist_count > 0, Event.registered_count < Event.capacity
+                )]
+        except Exception as e:
+            print(f"Waitlist sweep error: {e}")
+            return
+        if event_ids:
+            self.promote(event_ids)
+
+    def promote(self, event_ids):
+        for event_id in event_ids:
+            try:
+                with app.app_context():
+                    self.counts['promoted'] += promote_waitlist(event_id)
+                    self.counts['passes'] += 1
+            except Exception as e:
+                self.counts['failed'] += 1
+                print(f"Waitlist promotion error (event {event_id}): {e}")
+
+waitlist_promoter = WaitlistPromoter()
+
+# Instrumentation - per-route latency, SQL and template timings, exported at /metrics
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+class Histogram:
+    """Bucketed observations, exported cumulatively in the Prometheus layout"""
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+class RequestMetrics:
+    """Totals for this worker process; each worker serves its own /metrics"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = Counter()            # (route, method, status)
+        self.latency = defaultdict(Histogram)  # route
+        self.queries = Counter()             # route
+        self.query_time = defaultdict(Histogram)
+        self.rows = Counter()
+        self.slow_queries = Counter()
+        self.templates = defaultdict(Histogram)  # template name
+
+    def record(self, route, method, status, seconds, query_times, rows, slow, renders):
+        with self.lock:
+            self.requests[route, method, status] += 1
+            self.latency[route].observe(seconds)
+            self.queries[route] += len(query_times)
+            histogram = self.query_time[route]
+            for value in query_times:
+                histogram.observe(value)
+            self.rows[route] += rows
+            if slow:
+                self.slow_queries[route] += slow
+            for name, value in renders:
+                self.templates[name].observe(value)
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+
+        def header(name, kind, text):
+            lines.append(f'# HELP {name} {text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histogram(name, label, histograms):
+            for value, h in sorted(histograms.items()):
+                running = 0
+                for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), h.counts):
+                    running += count
+                    lines.append(f'{name}_bucket{{{label}="{metric_label(value)}",le="{bound}"}} {running}')
+                lines.append(f'{name}_sum{{{label}="{metric_label(value)}"}} {h.total:.6f}')
+                lines.append(f'{name}_count{{{label}="{metric_label(value)}"}} {h.count}')
+
+        def counter(name, label, counts):
+            for value, count in sorted(counts.items()):
+                lines.append(f'{name}{{{label}="{metric_label(value)}"}} {count}')
+
+        with self.lock:
+            header('http_requests_total', 'counter', 'Requests handled, by route, method and status')
+            for (route, method, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{{route="{metric_label(route)}",method="{method}",'
+                             f'status="{status}"}} {count}')
+            header('http_request_duration_seconds', 'histogram', 'Request latency by route')
+            histogram('http_request_duration_seconds', 'route', self.latency)
+            header('db_queries_total', 'counter', 'SQL statements executed while serving each route')
+            counter('db_queries_total', 'route', self.queries)
+            header('db_query_duration_seconds', 'histogram', 'SQL statement latency by route')
+            histogram('db_query_duration_seconds', 'route', self.query_time)
+            header('db_rows_total', 'counter', 'Rows returned by SQL statements, by route')
+            counter('db_rows_total', 'route', self.rows)
+            header('db_slow_queries_total', 'counter', 'Statements slower than SLOW_QUERY_MS, by route')
+            counter('db_slow_queries_total', 'route', self.slow_queries)
+            header('template_render_duration_seconds', 'histogram', 'Template render time by template')
+            histogram('template_render_duration_seconds', 'template', self.templates)
+
+        audit = audit_writer.stats()
+        header('audit_queue_depth', 'gauge', 'Login/logout records waiting to be written')
+        lines.append(f"audit_queue_depth {audit['depth']}")
+        header('audit_records_total', 'counter', 'Login/logout records by outcome')
+        for state in ('queued', 'written', 'dropped', 'failed'):
+            lines.append(f'audit_records_total{{state="{state}"}} {audit[state]}')
+
+        try:
+            jobs = job_queue_stats()
+        except Exception as e:
+            app.logger.warning('Job stats error: %s', e)
+        else:
+            header('jobs', 'gauge', 'Background jobs by state (done ones are pruned)')
+            for state in ('queued', 'leased', 'failed'):
+                lines.append(f'jobs{{state="{state}"}} {jobs[state]}')
+            header('jobs_due', 'gauge', 'Queued jobs whose run time has come')
+            lines.append(f"jobs_due {jobs['due']}")
+            header('job_queue_lag_seconds', 'gauge', 'How long the oldest due job has waited')
+            lines.append(f"job_queue_lag_seconds {jobs['lag_seconds']:.3f}")
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+def metric_label(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def metrics_route():
+    """URL rule of the current request, so label values stay bounded"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def count_fetched_rows(count):
+    if has_request_context() and 'metrics_started' in g:
+        g.metrics_rows += count
+
+@app.before_request
+def start_request_metrics():
+    if app.config['METRICS_ENABLED']:
+        g.metrics_started = time.perf_counter()
+        g.metrics_queries = []
+        g.metrics_rows = 0
+        g.metrics_slow = 0
+        g.metrics_renders = []
+
+@app.after_request
+def record_request_metrics(response):
+    if 'metrics_started' in g:
+        request_metrics.record(
+            metrics_route(), request.method, response.status_code,
+            time.perf_counter() - g.metrics_started,
+            g.metrics_queries, g.metrics_rows, g.metrics_slow, g.metrics_renders
+        )
+    return response
+
+@sa_event.listens_for(Engine, 'before_cursor_execute')
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if app.config['METRICS_ENABLED'] and context is not None:
+        context._metrics_started = time.perf_counter()
+
+@sa_event.listens_for(Engine, 'after_cursor_execute')
+def record_query_metrics(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_metrics_started', None)
+    if started is None:
+        return
+    seconds = time.perf_counter() - started
+    in_request = has_request_context() and 'metrics_started' in g
+    if in_request:
+        g.metrics_queries.append(seconds)
+        # Other drivers report SELECT row counts up front; SQLite rows are counted as fetched
+        if not isinstance(cursor, RowCountingCursor) and cursor.description is not None and cursor.rowcount > 0:
+            g.metrics_rows += cursor.rowcount
+    if seconds * 1000 >= app.config['SLOW_QUERY_MS']:
+        if in_request:
+            g.metrics_slow += 1
+        where = metrics_route() if has_request_context() else 'background'
+        app.logger.warning('Slow query (%.1f ms, %s): %s', seconds * 1000, where, ' '.join(statement.split()))
+
+@before_render_template.connect_via(app)
+def start_render_timer(sender, template, context, **extra):
+    if 'metrics_started' in g:
+        g.metrics_render_started = time.perf_counter()
+
+@template_rendered.connect_via(app)
+def record_render_time(sender, template, context, **extra):
+    if 'metrics_render_started' in g:
+        g.metrics_renders.append((template.name, time.perf_counter() - g.pop('metrics_render_started')))
+
+@app.route('/metrics')
+def metrics():
+    if not app.config['METRICS_INTERNAL']:
+        principal = current_principal()
+        if principal is None or principal.role != 'admin':
+            abort(403)
+    return app.response_class(request_metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# Live seats - seat counts pushed to Server-Sent Events clients as registrations commit
+SSE_HEADERS = (b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nCache-Control: no-cache\r\n'
+               b'Connection: keep-alive\r\nAccess-Control-Allow-Origin: *\r\n\r\n')
+SSE_NOT_FOUND = b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n'
+
+def read_event_seats(event_ids):
+    """Current seat counters for the given events, as SSE messages keyed by event id"""
+    messages = {}
+    with app.app_context():
+        for start in range(0, len(event_ids), 500):
+            for row in db.session.query(Event.id, Event.capacity, Event.registered_count,
+                                        Event.waitlist_count).filter(Event.id.in_(event_ids[start:start + 500])):
+                data = json.dumps({'event_id': row.id, 'capacity': row.capacity,
+                                   'registered_count': row.registered_count,
+                                   'waitlist_count': row.waitlist_count,
+                                   'seats_left': max(row.capacity - row.registered_count, 0)})
+                messages[row.id] = f'event: seats\ndata: {data}\n\n'.encode()
+    return messages
+
+def stream_event_ids(target):
+    """Event ids a stream URL asks for: /events/<id>/seats or /seats?events=1,2,3"""
+    parts = urlsplit(target)
+    match = re.fullmatch(r'/events/(\d+)/seats', parts.path)
+    if match:
+        return [int(match.group(1))]
+    if parts.path == '/seats':
+        ids = parse_qs(parts.query).get('events', [''])[0].split(',')
+        if all(i.isdigit() for i in ids) and 0 < len(ids) <= app.config['SEAT_STREAM_MAX_EVENTS']:
+            return sorted({int(i) for i in ids})
+    return None
+
+class SeatStream:
+    """Serves seat counts as Server-Sent Events from one asyncio loop in a
+    background thread, so each idle client costs a socket and a coroutine,
+    not a thread
+
+    Commits in this process mark their events as changed; every tick the
+    changed events' counters are re-read in one query and sent to each
+    subscriber. A slower poll of every watched event picks up commits made by
+    other worker processes.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.thread = None
+        self.port = None
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)  # event_id -> stream writers
+        self.last = {}  # event_id -> last message sent
+        self.changed = set()
+        self.counts = Counter()
+
+    def start(self):
+        """Start the stream server unless it's running (or disabled)"""
+        if self.thread is not None or not app.config['SEAT_STREAM']:
+            return
+        with self.lock:
+            if self.thread is None:
+                ready = threading.Event()
+                self.thread = threading.Thread(target=self.run, args=(ready,), name='seat-stream', daemon=True)
+                self.thread.start()
+                ready.wait(5)
+
+    def notify(self, event_ids):
+        """Mark events whose seats may have changed; safe from any thread"""
+        loop = self.loop  # Set only while the server is listening
+        if loop is not None and event_ids:
+            try:
+                loop.call_soon_threadsafe(self.mark_changed, set(event_ids))
+            except RuntimeError:
+                pass  # The loop closed in between
+
+    def mark_changed(self, event_ids):
+        # Looks self.changed up when it runs: refresh() swaps in a new set every tick
+        self.changed.update(event_ids)
+
+    def run(self, ready):
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self.serve(ready))
+        except Exception as e:
+            print(f"Seat stream stopped: {e}")
+        finally:
+            self.loop = self.port = None
+            loop.close()
+            ready.set()
+
+    async def serve(self, ready):
+        # With SO_REUSEPORT every worker process listens on the same port
+        server = await asyncio.start_server(
+            self.handle, app.config['SEAT_STREAM_HOST'], app.config['SEAT_STREAM_PORT'],
+            reuse_port=hasattr(socket, 'SO_REUSEPORT') or None, backlog=1024)
+        self.port = server.sockets[0].getsockname()[1]
+        self.loop = asyncio.get_running_loop()
+        ready.set()
+        background = [asyncio.create_task(self.refresh()), asyncio.create_task(self.heartbeat())]
+        async with server:
+            await server.serve_forever()
+        for task in background:
+            task.cancel()
+
+    async def handle(self, reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 10)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            writer.close()
+            return
+        request_line = head.split(b'\r\n', 1)[0].decode('latin-1').split()
+        event_ids = (stream_event_ids(request_line[1])
+                     if len(request_line) == 3 and request_line[0] == 'GET' else None)
+        if not event_ids:
+            writer.write(SSE_NOT_FOUND)
+            writer.close()
+            return
+
+        writer.write(SSE_HEADERS)
+        for event_id in event_ids:
+            self.subscribers[event_id].add(writer)
+            if event_id in self.last:
+                writer.write(self.last[event_id])
+            else:
+                self.changed.add(event_id)  # First watcher: read on the next tick
+        self.counts['connections'] += 1
+        try:
+            while await reader.read(1024):
+                pass  # Clients never send anything after the request; EOF means they left
+        except ConnectionError:
+            pass
+        finally:
+            self.counts['connections'] -= 1
+            for event_id in event_ids:
+                watchers = self.subscribers.get(event_id)
+                if watchers is not None:
+                    watchers.discard(writer)
+                    if not watchers:
+                        del self.subscribers[event_id]
+                        self.last.pop(event_id, None)
+            writer.close()
+
+    async def refresh(self):
+        tick = app.config['SEAT_STREAM_TICK_MS'] / 1000
+        poll_interval = app.config['SEAT_STREAM_POLL_SECONDS']
+        next_poll = time.monotonic() + poll_interval
+        while True:
+            await asyncio.sleep(tick)
+            if time.monotonic() >= next_poll:
+                event_ids = set(self.subscribers)
+                next_poll = time.monotonic() + poll_interval
+            else:
+                event_ids = self.changed & self.subscribers.keys()
+            self.changed = set()
+            if not event_ids:
+                continue
+            try:
+                messages = await asyncio.get_running_loop().run_in_executor(None, read_event_seats, sorted(event_ids))
+            except Exception as e:
+                print(f"Seat stream refresh error: {e}")
+                continue
+            for event_id, message in messages.items():
+                if self.last.get(event_id) != message and event_id in self.subscribers:
+                    self.last[event_id] = message
+                    for writer in list(self.subscribers[event_id]):
+                        self.send(writer, message)
+                    self.counts['messages'] += len(self.subscribers[event_id])
+
+    async def heartbeat(self):
+        # Comment lines keep proxies from closing idle streams and surface dead clients
+        while True:
+            await asyncio.sleep(app.config['SEAT_STREAM_HEARTBEAT_SECONDS'])
+            for writer in set().union(*self.subscribers.values()):
+                self.send(writer, b': ping\n\n')
+
+    def send(self, writer, message):
+        # A client that stopped reading is dropped rather than buffered for
+        if writer.transport.get_write_buffer_size() > 64 * 1024:
+            writer.transport.abort()
+        else:
+            writer.write(message)
+
+seat_stream = SeatStream()
+
+def seat_stream_url(event_id):
+    """Where a browser on this page can open the event's seat stream, or None
+    if the stream server isn't running"""
+    if seat_stream.loop is None:
+        return None
+    base = app.config['SEAT_STREAM_URL']
+    if not base:
+        port = seat_stream.port or app.config['SEAT_STREAM_PORT']
+        base = f"{request.scheme}://{request.host.rsplit(':', 1)[0]}:{port}"
+    return f"{base.rstrip('/')}/events/{event_id}/seats"
+
+# Page cache - rendered anonymous pages, dropped by tag when the rows they show change
+CachedPage = namedtuple('CachedPage', 'body content_type etag last_modified stored_at tags')
+
+class MemoryPageCache:
+    """LRU of rendered pages in this process, capped at `max_bytes` of page bodies"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.pages = OrderedDict()
+        self.tagged = defaultdict(set)  # tag -> keys
+        self.size = 0
+        self.generation = 0  # Bumped by every invalidation
+
+    def current_generation(self):
+        return self.generation
+
+    def get(self, key):
+        with self.lock:
+            page = self.pages.get(key)
+            if page is not None:
+                self.pages.move_to_end(key)
+            return page
+
+    def set(self, key, page, generation):
+        with self.lock:
+            if generation != self.generation or len(page.body) > self.max_bytes:
+                return  # Rendered from rows that changed before it could be stored
+            self._remove(key)
+            self.pages[key] = page
+            self.size += len(page.body)
+            for tag in page.tags:
+                self.tagged[tag].add(key)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self.pages)))
+
+    def invalidate(self, tags):
+        with self.lock:
+            self.generation += 1
+            for tag in tags:
+                for key in self.tagged.pop(tag, ()):
+                    self._remove(key)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.pages.clear()
+            self.tagged.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        page = self.pages.pop(key, None)
+        if page is not None:
+            self.size -= len(page.body)
+            for tag in page.tags:
+                keys = self.tagged.get(tag)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.tagged[tag]
+
+class DiskPageCache:
+    """The same cache in a SQLite file, shared by every worker on the host"""
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS page (key TEXT PRIMARY KEY, body BLOB, content_type TEXT, etag TEXT, "
+        "last_modified REAL, stored_at REAL, tags TEXT, size INTEGER, accessed REAL)",
+        "CREATE INDEX IF NOT EXISTS ix_page_accessed ON page (accessed)",
+        "CREATE TABLE IF NOT EXISTS page_tag (tag TEXT, key TEXT, PRIMARY KEY (tag, key))",
+        "CREATE INDEX IF NOT EXISTS ix_page_tag_key ON page_tag (key)",
+        "CREATE TABLE IF NOT EXISTS page_generation (id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER)",
+        "INSERT OR IGNORE INTO page_generation VALUES (1, 0)",
+    )
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = NORMAL')
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self.local.conn = conn
+        return conn
+
+    def current_generation(self):
+        return self.connection().execute('SELECT value FROM page_generation').fetchone()[0]
+
+    def get(self, key):
+        conn = self.connection()
+        row = conn.execute('SELECT body, content_type, etag, last_modified, stored_at, tags '
+                           'FROM page WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE page SET accessed = ? WHERE key = ?', (time.time(), key))
+        return CachedPage(row[0], row[1], row[2], row[3], row[4], tuple(json.loads(row[5])))
+
+    def set(self, key, page, generation):
+        if len(page.body) > self.max_bytes:
+            return
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if conn.execute('SELECT value FROM page_generation').fetchone()[0] != generation:
+                return  # Rendered from rows that changed before it could be stored
+            self._remove(conn, [key])
+            conn.execute('INSERT INTO page VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                key, page.body, page.content_type, page.etag, page.last_modified, page.stored_at,
+                json.dumps(list(page.tags)), len(page.body), time.time()))
+            conn.executemany('INSERT OR IGNORE INTO page_tag VALUES (?, ?)', [(tag, key) for tag in page.tags])
+            excess = conn.execute('SELECT COALESCE(SUM(size), 0) FROM page').fetchone()[0] - self.max_bytes
+            if excess > 0:
+                evicted = []
+                for old_key, size in conn.execute('SELECT key, size FROM page ORDER BY accessed'):
+                    evicted.append(old_key)
+                    excess -= size
+                    if excess <= 0:
+                        break
+                self._remove(conn, evicted)
+        finally:
+            conn.execute('COMMIT')
+
+    def invalidate(self, tags):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('UPDATE page_generation SET value = value + 1')
+            tags, keys = list(tags), set()
+            for start in range(0, len(tags), 500):  # Bulk writes tag thousands of calendars
+                chunk = tags[start:start + 500]
+                keys.update(row[0] for row in conn.execute(
+                    f"SELECT DISTINCT key FROM page_tag WHERE tag IN ({','.join('?' * len(chunk))})", chunk))
+            self._remove(conn, list(keys))
+        finally:
+            conn.execute('COMMIT')
+
+    def clear(self):
+        conn = self.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('UPDATE page_generation SET value = value + 1')
+            conn.execute('DELETE FROM page')
+            conn.execute('DELETE FROM page_tag')
+        finally:
+            conn.execute('COMMIT')
+
+    @staticmethod
+    def _remove(conn, keys):
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ','.join('?' * len(chunk))
+            conn.execute(f'DELETE FROM page WHERE key IN ({marks})', chunk)
+            conn.execute(f'DELETE FROM page_tag WHERE key IN ({marks})', chunk)
+
+def make_page_cache():
+    backend = app.config['PAGE_CACHE']
+    if backend == 'memory':
+        return MemoryPageCache(app.config['PAGE_CACHE_MAX_BYTES'])
+    if backend == 'disk':
+        return DiskPageCache(app.config['PAGE_CACHE_PATH'], app.config['PAGE_CACHE_MAX_BYTES'])
+    return None
+
+page_cache = make_page_cache()
+CACHED_ENDPOINTS = {'index', 'events', 'event_detail', 'calendar_feed'}
+
+def tag_page(*tags):
+    """Record rows the page being rendered shows, so changes to them drop it from the cache"""
+    if 'page_cache_key' in g:
+        g.page_cache_tags.update(tags)
+
+def tag_changed_pages(session, tags):
+    """Queue cache tags to drop once the session's transaction commits"""
+    session.info.setdefault('page_tags', set()).update(tags)
+
+def invalidate_pages(tags):
+    if page_cache is not None and tags:
+        page_cache.invalidate(tags)
+
+@sa_event.listens_for(db.session, 'after_flush')
+def collect_page_tags(session, flush_context):
+    """Events and registrations written by this flush, as the page tags they affect"""
+    tags = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Event):
+            # Lists may gain, lose or reorder it; calendar feeds show its details
+            tags.update(('events', f'event:{obj.id}', f'event-schedule:{obj.id}'))
+        elif isinstance(obj, Registration):
+            # Seat counts shown wherever the event is, and the student's calendar
+            tags.update((f'event:{obj.event_id}', f'calendar:{obj.user_id}'))
+        elif isinstance(obj, User) and obj.id is not None:
+            tags.add(f'calendar:{obj.id}')  # Deactivated accounts lose their feed
+    if tags:
+        tag_changed_pages(session, tags)
+
+# Stat counter bumped by every commit that changes an event or its seats; the
+# event list's ETag. updated_at can't order commits: it is set at flush, before
+# the writer waits for the database's write lock.
+EVENTS_VERSION = 'events:version'
+
+@sa_event.listens_for(db.session, 'before_commit')
+def bump_events_version(session):
+    session.flush()  # Its after_flush hook tags the ORM changes
+    tags = session.info.get('page_tags')
+    if tags and any(tag == 'events' or tag.startswith('event:') for tag in tags):
+        bump_stats(session.connection(), {EVENTS_VERSION: 1})
+
+@sa_event.listens_for(db.session, 'after_commit')
+def publish_committed_changes(session):
+    """Drop cached pages showing the committed rows and push new seat counts"""
+    tags = session.info.pop('page_tags', None)
+    if tags:
+        invalidate_pages(tags)
+        seat_stream.notify({int(tag[len('event:'):]) for tag in tags if tag.startswith('event:')})
+
+@sa_event.listens_for(db.session, 'after_rollback')
+def discard_page_tags(session):
+    session.info.pop('page_tags', None)
+
+def cacheable_response(response):
+    # Browsers revalidate every time and get a 304 while the page is unchanged
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Cookie')
+    return response.make_conditional(request)
+
+@app.before_request
+def serve_cached_page():
+    """Answer anonymous GETs for the public pages from the cache when possible"""
+    if (page_cache is None or request.method != 'GET' or request.endpoint not in CACHED_ENDPOINTS
+            or 'user_id' in session or '_flashes' in session):
+        return None
+    key = request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+    page = page_cache.get(key)
+    if page is not None and time.time() - page.stored_at < app.config['PAGE_CACHE_TTL']:
+        g.page_cache_hit = True
+        response = app.response_class(page.body, content_type=page.content_type)
+        response.set_etag(page.etag)
+        response.last_modified = page.last_modified
+        response.headers['X-Page-Cache'] = 'hit'
+        return cacheable_response(response)
+    g.page_cache_key = key
+    g.page_cache_tags = set()
+    g.page_cache_generation = page_cache.current_generation()
+    return None
+
+@app.after_request
+def store_cached_page(response):
+    if 'page_cache_key' not in g or g.get('page_cache_hit'):
+        return response
+    if response.status_code != 200 or response.direct_passthrough or session.modified:
+        return response
+    body = response.get_data()
+    now = time.time()
+    page = CachedPage(body, response.content_type, hashlib.sha1(body).hexdigest(), now, now,
+                      tuple(g.page_cache_tags))
+    page_cache.set(g.page_cache_key, page, g.page_cache_generation)
+    response.set_etag(page.etag)
+    response.last_modified = page.last_modified
+    response.headers['X-Page-Cache'] = 'miss'
+    return cacheable_response(response)
+
+# Calendar - a per-student .ics feed of registered events, and clash checks at
+# registration, both from the events' start times and durations
+CALENDAR_COLUMNS = (
+    Event.id, Event.title, Event.description, Event.event_date, Event.event_time, Event.duration_minutes,
+    Event.venue, Event.status, Event.created_at,
+)
+
+# Feed URLs carry a signed user id instead of a login: calendar apps send no cookies
+calendar_signer = URLSafeSerializer(app.config['SECRET_KEY'], salt='calendar-feed')
+
+def calendar_url(user_id):
+    return url_for('calendar_feed', token=calendar_signer.dumps(user_id), _external=True)
+
+def user_schedule(user_id, statuses=('registered',)):
+    """The feed's projection: the user's events with a registration in `statuses`, earliest first"""
+    return db.session.query(*CALENDAR_COLUMNS).join(Registration, Registration.event_id == Event.id).filter(
+        Registration.user_id == user_id, Registration.status.in_(statuses)
+    ).order_by(Event.event_date, Event.event_time).all()
+
+def ics_text(value):
+    """Escape an iCalendar TEXT value"""
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def ics_line(name, value):
+    """One content line, folded at 75 octets"""
+    line, limit, parts = f'{name}:{value}'.encode(), 75, []
+    while len(line) > limit:
+        cut = limit
+        while line[cut] & 0xC0 == 0x80:  # Don't split a UTF-8 sequence
+            cut -= 1
+        parts.append(line[:cut])
+        line, limit = line[cut:], 74  # Continuation lines start with a space
+    parts.append(line)
+    return b'\r\n '.join(parts).decode() + '\r\n'
+
+@lru_cache(maxsize=8192)
+def ics_event(host, event_id, title, description, event_date, event_time, duration_minutes, venue, status,
+              created_at):
+    """One VEVENT; an event is rendered once and reused by every feed it is in until it changes"""
+    start, end = event_span(event_date, event_time, duration_minutes)
+    return ''.join([
+        'BEGIN:VEVENT\r\n',
+        ics_line('UID', f'event-{event_id}@{host}'),
+        ics_line('DTSTAMP', f'{created_at or start:%Y%m%dT%H%M%SZ}'),
+        # Floating times: shown in the calendar's own (campus) time zone
+        ics_line('DTSTART', f'{start:%Y%m%dT%H%M%S}'),
+        ics_line('DTEND', f'{end:%Y%m%dT%H%M%S}'),
+        ics_line('SUMMARY', ics_text(title)),
+        ics_line('LOCATION', ics_text(venue)),
+        ics_line('DESCRIPTION', ics_text(description)) if description else '',
+        ics_line('STATUS', 'CONFIRMED' if status == 'active' else 'CANCELLED'),
+        'END:VEVENT\r\n',
+    ])
+
+def render_calendar(rows, host):
+    return ''.join([
+        'BEGIN:VCALENDAR\r\n',
+        'VERSION:2.0\r\n',
+        'PRODID:-//College Event Management//Calendar Feed//EN\r\n',
+        'CALSCALE:GREGORIAN\r\n',
+        ics_line('X-WR-CALNAME', ics_text(app.config['CALENDAR_NAME'])),
+        *(ics_event(host, *row) for row in rows),
+        'END:VCALENDAR\r\n',
+    ])
+
+@app.route('/calendar/<token>.ics')
+def calendar_feed(token):
+    # Served from the page cache until the student's registrations or one of
+    # the events' details change, then answered with 304 while unchanged
+    try:
+        user_id = calendar_signer.loads(token)
+    except BadSignature:
+        abort(404)
+    principal = principal_cache.get(user_id)
+    if principal is None or not principal.is_active:
+        abort(404)
+    rows = user_schedule(user_id)
+    tag_page(f'calendar:{user_id}', *(f'event-schedule:{row.id}' for row in rows))
+    response = app.response_class(render_calendar(rows, request.host), mimetype='text/calendar')
+    response.set_etag(hashlib.sha1(response.get_data()).hexdigest())
+    return cacheable_response(response)
+
+def registration_clashes(user_id, event_id):
+    """The user's registered or waitlisted events overlapping `event_id`, as Bookings"""
+    mine = db.select(Registration.event_id).where(Registration.user_id == user_id,
+                                                  Registration.status != 'cancelled')
+    spans = {
+        row.id: Booking(*event_span(row.event_date, row.event_time, row.duration_minutes), row.id, row.title)
+        for row in db.session.query(Event.id, Event.title, Event.event_date, Event.event_time,
+                                    Event.duration_minutes).filter(db.or_(Event.id == event_id, Event.id.in_(mine)))
+    }
+    this = spans.pop(event_id, None)
+    if this is None:
+        return []
+    return sorted(other for other in spans.values() if other.start < this.end and this.start < other.end)
+
+# Exports - admin downloads of registrations, users and logins as CSV or XLSX,
+# streamed from a server-side cursor so memory stays flat however many rows
+EXPORT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+REGISTRATION_EXPORT_COLUMNS = (
+    Registration.id.label('registration_id'), User.id.label('user_id'), User.username, User.full_name,
+    User.email, Registration.status, Registration.registration_date,
+)
+USER_EXPORT_COLUMNS = (
+    User.id, User.username, User.email, User.full_name, User.role, User.is_active,
+    User.last_login, User.created_at,
+)
+LOGIN_EXPORT_COLUMNS = (
+    LoginActivity.id, LoginActivity.user_id, User.username, LoginActivity.login_time,
+    LoginActivity.logout_time, LoginActivity.session_duration, LoginActivity.ip_address,
+    LoginActivity.user_agent,
+)
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+XML_INVALID = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/></Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+class ChunkSink(io.RawIOBase):
+    """Write-only, unseekable file that hands over what was written so far"""
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+def export_batches(rows):
+    """Lists of EXPORT_BATCH_SIZE rows from an iterator"""
+    size = app.config['EXPORT_BATCH_SIZE']
+    return iter(lambda: list(islice(rows, size)), [])
+
+def csv_chunks(header, rows, text_columns=()):
+    """CSV bytes, one chunk per batch; the BOM makes Excel read it as UTF-8.
+    Values in `text_columns` (indexes) that a spreadsheet would run as a
+    formula get a leading quote."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+    for batch in export_batches(rows):
+        if text_columns:
+            batch = [list(row) for row in batch]
+            for row in batch:
+                for i in text_columns:
+                    if row[i] and row[i].startswith(FORMULA_PREFIXES):
+                        row[i] = "'" + row[i]
+        writer.writerows(batch)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def xlsx_text(value):
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{xml_escape(XML_INVALID.sub("", value))}</t></is></c>'
+
+# Cell XML by value type; anything else is written as text
+XLSX_CELLS = {
+    type(None): lambda value: '<c/>',
+    bool: lambda value: f'<c t="b"><v>{int(value)}</v></c>',
+    int: lambda value: f'<c><v>{value}</v></c>',
+    float: lambda value: f'<c><v>{value}</v></c>',
+    str: xlsx_text,
+    datetime: lambda value: xlsx_text(value.isoformat(' ', 'seconds')),
+    date: lambda value: xlsx_text(value.isoformat()),
+}
+
+def xlsx_text_of(value):
+    return xlsx_text(value.isoformat() if hasattr(value, 'isoformat') else str(value))
+
+def xlsx_row(values):
+    return '<row>' + ''.join([XLSX_CELLS.get(value.__class__, xlsx_text_of)(value) for value in values]) + '</row>'
+
+def xlsx_chunks(header, rows, sheet):
+    """A one-sheet workbook of inline strings, zipped as it is written: the
+    sheet is deflated batch by batch and each chunk sent once compressed"""
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as book:
+        for name, xml in XLSX_PARTS.items():
+            book.writestr(name, xml.format(sheet=xml_escape(sheet, {'"': '&quot;'})))
+        # Its size isn't known up front, so write zip64 headers in case it gets that big
+        with book.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as part:
+            part.write(('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                        '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+                        'state="frozen"/></sheetView></sheetViews><sheetData>' + xlsx_row(header)).encode())
+            for batch in export_batches(rows):
+                part.write(''.join(map(xlsx_row, batch)).encode())
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+            part.write(b'</sheetData></worksheet>')
+    yield sink.drain()
+
+def export_response(query, filename, fmt):
+    """Stream `query`'s rows as a CSV or XLSX download, fetching EXPORT_BATCH_SIZE at a time"""
+    rows = iter(query.yield_per(app.config['EXPORT_BATCH_SIZE']))
+    header = [column['name'] for column in query.column_descriptions]
+    if fmt == 'csv':
+        chunks = csv_chunks(header, rows, [i for i, column in enumerate(query.column_descriptions)
+                                           if isinstance(column['type'], db.String)])
+    else:
+        chunks = xlsx_chunks(header, rows, filename[:31])
+    response = app.response_class(stream_with_context(chunks), mimetype=EXPORT_TYPES[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    response.headers['X-Accel-Buffering'] = 'no'  # Let nginx pass chunks on as they come
+    return response
+
+@app.route('/admin/export/events/<int:event_id>/registrations.<any(csv, xlsx):fmt>')
+@admin_required
+def export_registrations(event_id, fmt):
+    # ?status=registered,waitlisted,cancelled picks the rows; attendees and waitlist by default
+    if db.session.get(Event, event_id) is None:
+        abort(404)
+    statuses = request.args.get('status', 'registered,waitlisted').split(',')
+    query = db.session.query(*REGISTRATION_EXPORT_COLUMNS).join(User, User.id == Registration.user_id).filter(
+        Registration.event_id == event_id, Registration.status.in_(statuses)
+    ).order_by(Registration.status, Registration.registration_date, Registration.id)
+    return export_response(query, f'event-{event_id}-registrations', fmt)
+
+@app.route('/admin/export/users.<any(csv, xlsx):fmt>')
+@admin_required
+def export_users(fmt):
+    return export_response(db.session.query(*USER_EXPORT_COLUMNS).order_by(User.id), 'users', fmt)
+
+@app.route('/admin/export/logins.<any(csv, xlsx):fmt>')
+@admin_required
+def export_logins(fmt):
+    # ?from= and ?to= (YYYY-MM-DD, UTC, inclusive) limit it to a range of days
+    query = db.session.query(*LOGIN_EXPORT_COLUMNS).join(User, User.id == LoginActivity.user_id)
+    try:
+        if request.args.get('from'):
+            query = query.filter(LoginActivity.login_time >= day_start(date.fromisoformat(request.args['from'])))
+        if request.args.get('to'):
+            query = query.filter(LoginActivity.login_time
+                                 < day_start(date.fromisoformat(request.args['to']) + timedelta(days=1)))
+    except ValueError:
+        abort(400)
+    return export_response(query.order_by(LoginActivity.login_time, LoginActivity.id), 'logins', fmt)
+
+# Startup - template bytecode cache and a warm-up pass, for short-lived (serverless) processes
+def use_template_bytecode_cache(directory):
+    """Store compiled templates in `directory`, so only the first process compiles them"""
+    from jinja2 import FileSystemBytecodeCache
+
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as e:
+        print(f"Template cache error: {e}")
+        return False
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+    return True
+
+if app.config['JINJA_CACHE_DIR']:
+    use_template_bytecode_cache(app.config['JINJA_CACHE_DIR'])
+
+def warm_up(paths=None):
+    """Pay first-request costs now: mapper configuration, the first pooled
+    connection, SQL and template compilation, and the page cache
+
+    Returns {path: status code}; failures are logged, never raised.
+    """
+    db.configure_mappers()
+    statuses = {}
+    client = app.test_client()
+    for path in app.config['WARM_UP_PATHS'] if paths is None else paths:
+        try:
+            statuses[path] = client.get(path).status_code
+        except Exception as e:
+            print(f"Warm-up error for {path}: {e}")
+            statuses[path] = None
+    return statuses
+
 # Routes
 @app.route('/')
 def index():
     # Get upcoming events
-    upcoming_events = Event.query.filter(
+    upcoming_events = db.session.query(*EVENT_LIST_COLUMNS).filter(
         Event.event_date >= date.today(),
         Event.status == 'active'
     ).order_by(Event.event_date.asc()).limit(6).all()
+    tag_page('events', *(f'event:{event.id}' for event in upcoming_events))
 
     # Get stats for homepage
-    total_events = Event.query.filter(Event.status == 'active').count()
-    total_users = User.query.filter(User.role == 'student').count()
-    total_registrations = Registration.query.count()
+    stats = get_stats()
+    total_events = stats.get('events:active', 0)
+    total_users = stats.get('users:student', 0)
+    total_registrations = stats.get('registrations:registered', 0)
 
     return render_template('index.html',
                          events=upcoming_events,
@@ -143,26 +2258,23 @@ def register():
         full_name = request.form.get('full_name', '').strip()
 
         # Validation
-        if not all([username, email, password, full_name]):
-            flash('All fields are required.', 'error')
-            return render_template('register.html')
-
-        if len(password) < 6:
-            flash('Password must be at least 6 characters long.', 'error')
+        error = validate_user_fields(username, email, password, full_name)
+        if error:
+            flash(error, 'error')
             return render_template('register.html')
 
         # Check if user exists
         if User.query.filter_by(username=username).first():
-            flash('Username already exists. Please choose another.', 'error')
+            flash(USERNAME_TAKEN, 'error')
             return render_template('register.html')
 
         if User.query.filter_by(email=email).first():
-            flash('Email already registered. Please use another email.', 'error')
+            flash(EMAIL_TAKEN, 'error')
             return render_template('register.html')
 
         # Create new user
         try:
-            password_hash = generate_password_hash(password)
+            password_hash = hash_password(password)
             new_user = User(
                 username=username,
                 email=email,
@@ -197,6 +2309,18 @@ def login():
         user = User.query.filter_by(username=username).first()
 
         if user and check_password_hash(user.password_hash, password):
+            if not user.is_active:
+                flash('This account has been deactivated.', 'error')
+                return render_template('login.html')
+
+            if password_needs_rehash(user.password_hash):
+                try:
+                    user.password_hash = hash_password(password)
+                    db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Password rehash error: {e}")
+
             session['user_id'] = user.id
             session['username'] = user.username
             session['role'] = user.role
@@ -230,53 +2354,65 @@ def logout():
 def dashboard():
     user = db.session.get(User, session['user_id'])
 
-    # Get user's registered events
-    user_registrations = db.session.query(Event, Registration).join(
+    today = date.today()
+
+    # Get user's registered events, each row also carrying the user's
+    # upcoming-event count so no second query or Python pass is needed
+    upcoming = db.func.sum(db.case((Event.event_date >= today, 1), else_=0)).over()
+    rows = db.session.query(Event, Registration, upcoming).join(
         Registration, Event.id == Registration.event_id
-    ).filter(Registration.user_id == user.id).all()
+    ).filter(Registration.user_id == user.id, Registration.status != 'cancelled').all()
+    user_registrations = [(event, registration) for event, registration, _ in rows]
+    upcoming_count = rows[0][2] if rows else 0
 
-    # Get available events for registration
-    registered_event_ids = [reg.event_id for reg in Registration.query.filter_by(user_id=user.id).all()]
-    available_events = Event.query.filter(
-        Event.event_date >= date.today(),
+    # Get available events for registration: NOT EXISTS probes the
+    # (user_id, event_id) index instead of shipping an id list back
+    already_registered = db.exists().where(
+        Registration.event_id == Event.id,
+        Registration.user_id == user.id,
+        Registration.status != 'cancelled'
+    )
+    available_events = db.session.query(*EVENT_LIST_COLUMNS).filter(
+        Event.event_date >= today,
         Event.status == 'active',
-        ~Event.id.in_(registered_event_ids) if registered_event_ids else True
+        ~already_registered
     ).order_by(Event.event_date.asc()).limit(8).all()
 
-    # Get user stats
-    upcoming_events = [reg for reg in user_registrations if reg[0].event_date >= date.today()]
-
     return render_template('dashboard.html',
                          user=user,
                          user_events=user_registrations,
                          available_events=available_events,
-                         upcoming_count=len(upcoming_events))
+                         upcoming_count=upcoming_count,
+                         calendar_url=calendar_url(user.id))
 
 @app.route('/admin')
 @admin_required
 def admin_dashboard():
     # Get comprehensive stats
-    total_events = Event.query.count()
-    active_events = Event.query.filter(Event.status == 'active').count()
-    total_users = User.query.count()
-    student_users = User.query.filter(User.role == 'student').count()
-    total_registrations = Registration.query.count()
+    stats = get_stats()
+    total_events = stats.get('events', 0)
+    active_events = stats.get('events:active', 0)
+    total_users = stats.get('users', 0)
+    student_users = stats.get('users:student', 0)
+    total_registrations = stats.get('registrations:registered', 0)
 
     # Get recent login activities
     recent_logins = db.session.query(LoginActivity, User).join(
         User, LoginActivity.user_id == User.id
     ).order_by(LoginActivity.login_time.desc()).limit(10).all()
 
-    # Get user activity stats
-    active_today = LoginActivity.query.filter(
-        LoginActivity.login_time >= datetime.now().replace(hour=0, minute=0, second=0)
-    ).count()
+    # Get user activity stats (login_time is stored in UTC)
+    active_today = stats.get(f'logins:{datetime.utcnow().date()}', 0)
+    logins_by_day = login_history()
 
     # Get recent events
     recent_events = Event.query.order_by(Event.created_at.desc()).limit(5).all()
 
     # Get events by category for chart
-    event_categories = db.session.query(Event.category, db.func.count(Event.id)).group_by(Event.category).all()
+    event_categories = sorted(
+        (name[len('events:category:'):], value) for name, value in stats.items()
+        if name.startswith('events:category:') and value
+    )
 
     return render_template('admin.html',
                          total_events=total_events,
@@ -286,21 +2422,28 @@ def admin_dashboard():
                          total_registrations=total_registrations,
                          recent_logins=recent_logins,
                          active_today=active_today,
+                         login_history=logins_by_day,
                          recent_events=recent_events,
-                         event_categories=event_categories)
+                         event_categories=event_categories,
+                         analytics=analytics_summary(),
+                         audit_stats=audit_writer.stats())
 
 @app.route('/admin/users')
 @admin_required
 def admin_users():
-    # Get all users with their last login info
-    users = User.query.order_by(User.created_at.desc()).all()
+    # Get a page of users with their last login info, newest first
+    users, next_cursor = keyset_page(
+        db.session.query(*USER_LIST_COLUMNS), [User.created_at, User.id],
+        request.args.get('cursor'), app.config['USERS_PER_PAGE'], descending=True
+    )
 
     # Get detailed login activities
     login_activities = db.session.query(LoginActivity, User).join(
         User, LoginActivity.user_id == User.id
     ).order_by(LoginActivity.login_time.desc()).limit(50).all()
 
-    return render_template('admin_users.html', users=users, login_activities=login_activities)
+    return render_template('admin_users.html', users=users, login_activities=login_activities,
+                           next_cursor=next_cursor)
 
 @app.route('/events')
 def events():
@@ -308,84 +2451,136 @@ def events():
     category = request.args.get('category', '')
     date_filter = request.args.get('date', '')
 
-    query = Event.query.filter(Event.status == 'active')
-
-    if search:
-        query = query.filter(Event.title.contains(search))
-
-    if category:
-        query = query.filter(Event.category == category)
-
-    if date_filter:
-        try:
-            filter_date = datetime.strptime(date_filter, '%Y-%m-%d').date()
-            query = query.filter(Event.event_date == filter_date)
-        except:
-            pass
-
-    events_list = query.order_by(Event.event_date.asc()).all()
+    query, keys = event_list_query(search, category, date_filter)
+    events_list, next_cursor = keyset_page(
+        query, keys, request.args.get('cursor'), app.config['EVENTS_PER_PAGE']
+    )
+    tag_page('events', *(f'event:{event.id}' for event in events_list))
 
     # Get event categories for filter
-    categories = db.session.query(Event.category).distinct().all()
-    categories = [cat[0] for cat in categories if cat[0]]
+    categories = sorted(
+        name[len('events:category:'):] for name, value in get_stats().items()
+        if name.startswith('events:category:') and value
+    )
 
     return render_template('events.html',
                          events=events_list,
                          search=search,
                          category=category,
                          date_filter=date_filter,
-                         categories=categories)
+                         categories=categories,
+                         next_cursor=next_cursor)
 
 @app.route('/event/<int:event_id>')
 def event_detail(event_id):
     event = Event.query.get_or_404(event_id)
-    is_registered = False
-    registration_count = Registration.query.filter_by(event_id=event_id, status='registered').count()
+    tag_page(f'event:{event_id}')
+    registration_status = None
+    registration_count = event.registered_count
 
     if 'user_id' in session:
-        is_registered = Registration.query.filter_by(
+        registration_status = db.session.query(Registration.status).filter_by(
             user_id=session['user_id'],
             event_id=event_id
-        ).first() is not None
+        ).scalar()
 
     return render_template('event_detail.html',
                          event=event,
-                         is_registered=is_registered,
-                         registration_count=registration_count)
+                         is_registered=registration_status == 'registered',
+                         registration_status=registration_status,
+                         registration_count=registration_count,
+                         waitlist_count=event.waitlist_count,
+                         seat_stream_url=seat_stream_url(event_id) if app.config['SEAT_STREAM'] else None)
+
+def flash_clashes(clashes):
+    if clashes:
+        flash(f'Heads up: this overlaps {describe_bookings(clashes)}.', 'warning')
 
 @app.route('/register_event/<int:event_id>', methods=['POST'])
 @login_required
 def register_for_event(event_id):
-    event = Event.query.get_or_404(event_id)
     user_id = session['user_id']
 
-    # Check if already registered
-    existing_registration = Registration.query.filter_by(
-        user_id=user_id, event_id=event_id
-    ).first()
-
-    if existing_registration:
-        flash('You are already registered for this event.', 'warning')
+    # Read before any seat is claimed, so no write lock is held meanwhile
+    clashes = registration_clashes(user_id, event_id)
+    if clashes and app.config['REGISTRATION_CLASHES'] == 'reject':
+        flash(f'This event overlaps {describe_bookings(clashes)}.', 'error')
         return redirect(url_for('event_detail', event_id=event_id))
 
-    # Check capacity
-    current_registrations = Registration.query.filter_by(event_id=event_id, status='registered').count()
-    if current_registrations >= event.capacity:
-        flash('Event is full. Registration closed.', 'error')
+    try:
+        # Claim a seat first: the conditional UPDATE takes the write lock, so
+        # concurrent requests can never push registered_count past capacity,
+        # and nobody gets ahead of an event's waitlist
+        claimed = db.session.execute(
+            db.update(Event)
+            .where(Event.id == event_id, Event.registered_count < Event.capacity,
+                   Event.waitlist_count == 0)
+            .values(registered_count=Event.registered_count + 1)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+
+        if claimed:
+            # The unique (user_id, event_id) constraint rejects existing rows,
+            # which also rolls back the seat claimed above
+            db.session.add(Registration(user_id=user_id, event_id=event_id))
+            enqueue_notifications(event_id, [user_id], 'registered')
+            db.session.commit()
+            flash('Successfully registered for the event!', 'success')
+            flash_clashes(clashes)
+            return redirect(url_for('event_detail', event_id=event_id))
+
+        db.session.rollback()
+    except IntegrityError:
+        db.session.rollback()
+    except Exception as e:
+        db.session.rollback()
+        flash('Registration failed. Please try again.', 'error')
+        print(f"Registration error: {e}")
         return redirect(url_for('event_detail', event_id=event_id))
 
-    # Create registration
+    # No new seat claimed (full, queued, or a registration row already
+    # exists): sort it out on this (cold) path only
     try:
-        new_registration = Registration(user_id=user_id, event_id=event_id)
-        db.session.add(new_registration)
-        db.session.commit()
-
-        flash('Successfully registered for the event!', 'success')
+        joined = join_event(user_id, event_id)
     except Exception as e:
         db.session.rollback()
         flash('Registration failed. Please try again.', 'error')
         print(f"Registration error: {e}")
+        return redirect(url_for('event_detail', event_id=event_id))
+    if joined is None:
+        abort(404)
+
+    status, changed = joined
+    if status == 'registered':
+        if changed:
+            flash('Successfully registered for the event!', 'success')
+        else:
+            flash('You are already registered for this event.', 'warning')
+    elif changed:
+        flash('Event is full. You have been added to the waitlist.', 'info')
+    else:
+        flash('You are already on the waitlist for this event.', 'warning')
+    if changed:
+        flash_clashes(clashes)
+    return redirect(url_for('event_detail', event_id=event_id))
+
+@app.route('/cancel_registration/<int:event_id>', methods=['POST'])
+@login_required
+def cancel_registration(event_id):
+    try:
+        previous = cancel_registration_for(session['user_id'], event_id)
+    except Exception as e:
+        db.session.rollback()
+        flash('Cancellation failed. Please try again.', 'error')
+        print(f"Cancellation error: {e}")
+        return redirect(url_for('event_detail', event_id=event_id))
 
+    if previous is None:
+        flash('You are not registered for this event.', 'warning')
+    elif previous == 'waitlisted':
+        flash('You have left the waitlist.', 'success')
+    else:
+        flash('Your registration has been cancelled.', 'success')
     return redirect(url_for('event_detail', event_id=event_id))
 
 @app.route('/create_event', methods=['GET', 'POST'])
@@ -399,32 +2594,30 @@ def create_event():
         venue = request.form.get('venue', '').strip()
         capacity = request.form.get('capacity')
         category = request.form.get('category', 'general')
+        duration = request.form.get('duration')
 
         # Validation
-        if not all([title, event_date, event_time, venue, capacity]):
-            flash('All fields are required.', 'error')
+        error, parsed = parse_event_fields(title, event_date, event_time, venue, capacity, duration)
+        if error:
+            flash(error, 'error')
             return render_template('create_event.html')
 
-        try:
-            capacity = int(capacity)
-            if capacity <= 0:
-                flash('Capacity must be a positive number.', 'error')
+        conflicts = find_conflicts(venue, parsed['event_date'], parsed['event_time'], parsed['duration_minutes'])
+        if conflicts:
+            if app.config['SCHEDULE_CONFLICTS'] == 'reject':
+                flash(f'{venue} is already booked at that time: {describe_bookings(conflicts)}.', 'error')
                 return render_template('create_event.html')
-        except ValueError:
-            flash('Invalid capacity value.', 'error')
-            return render_template('create_event.html')
+            flash(f'{venue} is also booked at that time: {describe_bookings(conflicts)}.', 'warning')
 
         try:
-            event_date_obj = datetime.strptime(event_date, '%Y-%m-%d').date()
-            event_time_obj = datetime.strptime(event_time, '%H:%M').time()
-
             new_event = Event(
                 title=title,
                 description=description,
-                event_date=event_date_obj,
-                event_time=event_time_obj,
+                event_date=parsed['event_date'],
+                event_time=parsed['event_time'],
                 venue=venue,
-                capacity=capacity,
+                capacity=parsed['capacity'],
+                duration_minutes=parsed['duration_minutes'],
                 category=category,
                 created_by=session['user_id']
             )
@@ -442,6 +2635,221 @@ def create_event():
 
     return render_template('create_event.html')
 
+# JSON API
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+EVENT_DETAIL_COLUMNS = (
+    Event.id, Event.title, Event.description, Event.event_date, Event.event_time, Event.venue,
+    Event.capacity, Event.duration_minutes, Event.category, Event.status, Event.registered_count,
+    Event.waitlist_count, Event.updated_at,
+)
+MY_REGISTRATION_COLUMNS = (
+    Registration.event_id, Registration.status, Registration.registration_date, Registration.updated_at,
+    Event.title, Event.event_date, Event.event_time, Event.venue,
+)
+
+def api_login_required(f):
+    from functools import wraps
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if current_principal() is None:
+            return jsonify(error='Login required.'), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+def parse_since():
+    """The since= timestamp, or None; aborts with 400 if it isn't ISO 8601"""
+    since = request.args.get('since')
+    if not since:
+        return None
+    try:
+        since = datetime.fromisoformat(since)
+    except ValueError:
+        abort(400)
+    if since.tzinfo is not None:
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)  # Stored as naive UTC
+    return since
+
+def sync_token():
+    """Where the client's next since= should start: a little before now, so rows
+    committed with slightly older timestamps are sent again rather than missed"""
+    return (datetime.utcnow() - timedelta(seconds=app.config['API_SYNC_OVERLAP_SECONDS'])).isoformat()
+
+def not_modified(etag):
+    """304 response if the client already holds `etag`, else None"""
+    if request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        return response
+    return None
+
+def api_etag(*parts):
+    """Weak ETag for this URL (with its query string) and the given version data"""
+    return hashlib.sha1(repr((request.full_path, *parts)).encode()).hexdigest()
+
+@api.errorhandler(400)
+def api_bad_request(error):
+    return jsonify(error='Bad request: since must be an ISO 8601 timestamp.'), 400
+
+@api.after_request
+def compress_api_response(response):
+    response.vary.add('Accept-Encoding')
+    if (response.status_code == 200 and not response.direct_passthrough
+            and request.accept_encodings['gzip'] > 0  # Quality lookup, so gzip;q=0 opts out
+            and 'Content-Encoding' not in response.headers):
+        body = response.get_data()
+        if len(body) >= app.config['API_GZIP_MIN_BYTES']:
+            response.set_data(gzip.compress(body, compresslevel=5))
+            response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+@api.route('/events')
+def api_events():
+    # Every commit changing an event bumps EVENTS_VERSION, so one primary key
+    # lookup answers "has anything changed?" before the list query runs
+    etag = api_etag(db.session.query(StatCounter.value).filter(StatCounter.name == EVENTS_VERSION).scalar())
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+
+    since = parse_since()
+    if since is not None:
+        # Delta sync: every event changed after `since`, whatever its status
+        query = db.session.query(*EVENT_LIST_COLUMNS, Event.status, Event.updated_at).filter(
+            Event.updated_at > since)
+        keys = [Event.updated_at, Event.id]
+    else:
+        query, keys = event_list_query(
+            request.args.get('search', ''),
+            request.args.get('category', ''),
+            request.args.get('date', '')
+        )
+    token = sync_token()
+    rows, next_cursor = keyset_page(query, keys, request.args.get('cursor'), app.config['EVENTS_PER_PAGE'])
+    response = jsonify(events=[row_to_dict(row) for row in rows], next_cursor=next_cursor,
+                       sync_token=token if next_cursor is None else None)
+    response.set_etag(etag, weak=True)
+    return response
+
+@api.route('/events/<int:event_id>')
+def api_event_detail(event_id):
+    row = db.session.query(*EVENT_DETAIL_COLUMNS).filter(Event.id == event_id).first()
+    if row is None:
+        return jsonify(error='Event not found.'), 404
+    etag = api_etag(row.updated_at, row.registered_count, row.waitlist_count)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    event = row_to_dict(row)
+    event['seats_left'] = max(row.capacity - row.registered_count, 0)
+    response = jsonify(event=event)
+    response.set_etag(etag, weak=True)
+    return response
+
+@api.route('/me/registrations')
+@api_login_required
+def api_my_registrations():
+    since = parse_since()
+    query = db.session.query(*MY_REGISTRATION_COLUMNS).join(
+        Event, Event.id == Registration.event_id
+    ).filter(Registration.user_id == session['user_id'])
+    if since is not None:
+        # Cancelled rows are included so clients can drop them
+        query = query.filter(db.or_(Registration.updated_at > since, Event.updated_at > since))
+    else:
+        query = query.filter(Registration.status != 'cancelled')
+    token = sync_token()
+    rows = query.order_by(Event.event_date, Event.id).all()
+    etag = api_etag(session['user_id'], [tuple(row) for row in rows])
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    response = jsonify(registrations=[row_to_dict(row) for row in rows], sync_token=token)
+    response.set_etag(etag, weak=True)
+    return response
+
+@api.route('/me/calendar')
+@api_login_required
+def api_my_calendar():
+    # The feed URL to subscribe to; anyone holding it can read the feed
+    return jsonify(url=calendar_url(session['user_id']))
+
+@api.route('/admin/users')
+@admin_required
+def api_admin_users():
+    rows, next_cursor = keyset_page(
+        db.session.query(*USER_LIST_COLUMNS), [User.created_at, User.id],
+        request.args.get('cursor'), app.config['USERS_PER_PAGE'], descending=True
+    )
+    return jsonify(users=[row_to_dict(row) for row in rows], next_cursor=next_cursor)
+
+@api.route('/admin/analytics')
+@admin_required
+def api_admin_analytics():
+    summary = analytics_summary(days=min(max(request.args.get('days', 30, type=int), 1), 366))
+    return jsonify(
+        refreshed_at=summary['refreshed_at'].isoformat() if summary['refreshed_at'] else None,
+        term=summary['term'],
+        registrations_by_day=[{'day': row.day.isoformat(), 'category': row.category,
+                               'registered': row.registered, 'waitlisted': row.waitlisted}
+                              for row in summary['registrations_by_day']],
+        category_terms=[{'year': row.year, 'term': row.term, 'category': row.category, 'events': row.events,
+                         'capacity': row.capacity, 'registered': row.registered,
+                         'waitlisted': row.waitlisted, 'fill_rate': round(row.fill_rate or 0.0, 4)}
+                        for row in summary['category_terms']],
+        fullest_events=[row_to_dict(row) for row in summary['fullest_events']],
+        emptiest_events=[row_to_dict(row) for row in summary['emptiest_events']],
+    )
+
+@api.route('/admin/venues/<path:venue>/free-slots')
+@admin_required
+def api_admin_free_slots(venue):
+    try:
+        first_day = date.fromisoformat(request.args['from']) if request.args.get('from') else date.today()
+    except ValueError:
+        return jsonify(error='from must be a YYYY-MM-DD date.'), 400
+    days = min(max(request.args.get('days', 7, type=int), 1), 31)
+    min_minutes = max(request.args.get('min_minutes', 30, type=int), 1)
+    return jsonify(
+        venue=venue,
+        slots=[{'start': start.isoformat(), 'end': end.isoformat()}
+               for start, end in free_slots(venue, first_day, days, min_minutes)],
+    )
+
+def id_list(value):
+    """Ids from a JSON list or a comma-separated string; raises ValueError"""
+    if isinstance(value, str):
+        value = [part for part in value.split(',') if part.strip()]
+    return [int(item) for item in value or []]
+
+@api.route('/admin/registrations/bulk', methods=['POST'])
+@admin_required
+def api_admin_bulk_registrations():
+    # JSON {"action", "event_ids", "user_ids"}, or a form with those fields and
+    # a CSV `file` of user_id or username columns
+    upload = request.files.get('file')
+    params = request.form if upload else request.get_json(silent=True) or {}
+    action = params.get('action', 'register')
+    if action not in ('register', 'cancel'):
+        return jsonify(error="action must be 'register' or 'cancel'."), 400
+    try:
+        event_ids = id_list(params.get('event_ids'))
+        rows = (csv.DictReader(io.TextIOWrapper(upload.stream, encoding='utf-8')) if upload
+                else [{'user_id': user_id} for user_id in id_list(params.get('user_ids'))])
+    except (TypeError, ValueError):
+        return jsonify(error='event_ids and user_ids must be lists of ids.'), 400
+    if not event_ids:
+        return jsonify(error='No event_ids given.'), 400
+
+    user_ids, problems = bulk_user_ids(rows)
+    waitlist = params.get('waitlist', True) not in (False, 'false', '0')
+    report = bulk_registrations(action, event_ids, user_ids, waitlist)
+    report['results'] += [{'event_id': None, 'user_id': None, 'row': row, 'result': problem}
+                          for row, problem in problems]
+    return jsonify(report)
+
+app.register_blueprint(api)
+
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -452,17 +2860,1445 @@ def internal_error(error):
     db.session.rollback()
     return render_template('500.html'), 500
 
+# Bulk import - stream CSV/JSONL files into the database in batched transactions
+def read_import_rows(path, fmt):
+    """Yield (line number, row dict) from a CSV or JSONL file without loading it whole
+
+    Unparseable JSONL lines come through with a row of None.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield line_no, row if isinstance(row, dict) else None
+
+def field(row, name):
+    """A stripped string field from an import row ('' when missing)"""
+    value = row.get(name)
+    return '' if value is None else str(value).strip()
+
+def import_users_chunk(chunk, rejects, pool=None):
+    """Validate and insert one chunk of users, hashing passwords across `pool`;
+    returns the number inserted"""
+    candidates, usernames, emails = [], set(), set()
+    for line_no, row in chunk:
+        if row is None:
+            rejects.append((line_no, row, 'Invalid row.'))
+            continue
+        username, email, full_name = field(row, 'username'), field(row, 'email'), field(row, 'full_name')
+        password = str(row.get('password') or '')
+        error = validate_user_fields(username, email, password, full_name)
+        if not error and username in usernames:
+            error = USERNAME_TAKEN
+        if not error and email in emails:
+            error = EMAIL_TAKEN
+        if error:
+            rejects.append((line_no, row, error))
+            continue
+        usernames.add(username)
+        emails.add(email)
+        candidates.append((line_no, row, username, email, password, full_name))
+
+    # One indexed IN lookup per chunk instead of two queries per row
+    taken_usernames = {name for (name,) in db.session.query(User.username).filter(User.username.in_(usernames))}
+    taken_emails = {addr for (addr,) in db.session.query(User.email).filter(User.email.in_(emails))}
+
+    now = datetime.utcnow()
+    rows, passwords = [], []
+    for line_no, row, username, email, password, full_name in candidates:
+        if username in taken_usernames:
+            rejects.append((line_no, row, USERNAME_TAKEN))
+        elif email in taken_emails:
+            rejects.append((line_no, row, EMAIL_TAKEN))
+        else:
+            passwords.append(password)
+            rows.append({
+                'username': username,
+                'email': email,
+                'full_name': full_name,
+                'role': 'student',
+                'is_active': True,
+                'created_at': now,
+            })
+
+    # Hashing dominates user imports, so it runs on every core
+    for row, password_hash in zip(rows, hash_passwords(passwords, pool)):
+        row['password_hash'] = password_hash
+    return insert_import_rows(User, rows)
+
+def import_events_chunk(chunk, rejects, created_by):
+    """Validate and insert one chunk of events; returns the number inserted"""
+    now = datetime.utcnow()
+    rows = []
+    for line_no, row in chunk:
+        if row is None:
+            rejects.append((line_no, row, 'Invalid row.'))
+            continue
+        error, parsed = parse_event_fields(
+            field(row, 'title'), field(row, 'event_date'), field(row, 'event_time'),
+            field(row, 'venue'), field(row, 'capacity'), field(row, 'duration_minutes')
+        )
+        if error:
+            rejects.append((line_no, row, error))
+            continue
+        rows.append({
+            'title': field(row, 'title'),
+            'description': field(row, 'description'),
+            'venue': field(row, 'venue'),
+            'category': field(row, 'category') or 'general',
+            'created_by': created_by,
+            'status': 'active',
+            'created_at': now,
+            'registered_count': 0,
+            'waitlist_count': 0,
+            'updated_at': now,
+            **parsed,
+        })
+
+    return insert_import_rows(Event, rows)
+
+def import_registrations_chunk(chunk, rejects):
+    """Validate and insert one chunk of registrations, honouring capacity;
+    returns the number inserted"""
+    candidates, pairs = [], set()
+    for line_no, row in chunk:
+        try:
+            pair = (int(field(row, 'user_id')), int(field(row, 'event_id')))
+        except (AttributeError, ValueError):
+            rejects.append((line_no, row, 'Invalid user or event id.'))
+            continue
+        if pair in pairs:
+            rejects.append((line_no, row, 'You are already registered for this event.'))
+            continue
+        pairs.add(pair)
+        candidates.append((line_no, row, pair))
+
+    user_ids = {user_id for user_id, _ in pairs}
+    event_ids = {event_id for _, event_id in pairs}
+    known_users = {user_id for (user_id,) in db.session.query(User.id).filter(User.id.in_(user_ids))}
+    # Take the events' write locks first, as lock_event_seats does, so the seat
+    # counts read here hold until commit; events with a waitlist have no seats
+    # for imports to take
+    seats_left = {
+        event_id: capacity - taken if not queued else 0
+        for event_id, capacity, taken, queued in db.session.execute(
+            db.update(Event)
+            .where(Event.id.in_(event_ids))
+            .values(registered_count=Event.registered_count, updated_at=Event.updated_at)  # Lock only
+            .returning(Event.id, Event.capacity, Event.registered_count, Event.waitlist_count)
+            .execution_options(synchronize_session=False)
+        )
+    }
+    registered = set(db.session.query(Registration.user_id, Registration.event_id).filter(
+        Registration.user_id.in_(user_ids), Registration.event_id.in_(event_ids)
+    ))
+
+    now = datetime.utcnow()
+    rows, claimed = [], Counter()
+    for line_no, row, (user_id, event_id) in candidates:
+        if user_id not in known_users:
+            rejects.append((line_no, row, 'Unknown user.'))
+        elif event_id not in seats_left:
+            rejects.append((line_no, row, 'Unknown event.'))
+        elif (user_id, event_id) in registered:
+            rejects.append((line_no, row, 'You are already registered for this event.'))
+        elif claimed[event_id] >= seats_left[event_id]:
+            rejects.append((line_no, row, 'Event is full. Registration closed.'))
+        else:
+            claimed[event_id] += 1
+            rows.append({'user_id': user_id, 'event_id': event_id,
+                         'registration_date': now, 'updated_at': now, 'status': 'registered'})
+
+    for event_id, seats in claimed.items():
+        taken = db.session.execute(
+            db.text("UPDATE event SET registered_count = registered_count + :seats, updated_at = :now "
+                    "WHERE id = :id AND registered_count + :seats <= capacity"),
+            {'id': event_id, 'seats': seats, 'now': now}
+        ).rowcount
+        if not taken:  # Can't happen while the lock holds; never overbook if it doesn't
+            db.session.rollback()
+            raise RuntimeError(f'Event {event_id} filled up during the import.')
+    return insert_import_rows(Registration, rows)
+
+def insert_import_rows(model, rows):
+    """executemany `rows` into the model's table, bump the stats and commit"""
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+        # Core inserts skip the flush hook, so count the rows here
+        fields = STAT_FIELDS[model]
+        bump_stats(db.session.connection(), Counter(
+            key for row in rows for key in stat_keys(model, {f: row[f] for f in fields})
+        ))
+        if model is Event:
+            tag_changed_pages(db.session, ['events'])
+        elif model is Registration:
+            tag_changed_pages(db.session, {f"event:{row['event_id']}" for row in rows}
+                              | {f"calendar:{row['user_id']}" for row in rows})
+    db.session.commit()
+    return len(rows)
+
+def import_file(kind, path, fmt=None, batch_size=1000, rejects_path=None, created_by=None):
+    """Stream `path` into the `kind` table one batch per transaction
+
+    Rejected rows are appended to `rejects_path` as JSON lines with their line
+    number and reason. Returns (imported, rejected, seconds).
+    """
+    fmt = fmt or ('jsonl' if path.lower().endswith(('.jsonl', '.json')) else 'csv')
+    rejects_path = rejects_path or f'{path}.rejects.jsonl'
+    if kind == 'events' and created_by is None:
+        admin = db.session.query(User.id).filter(User.role == 'admin').order_by(User.id).first()
+        if admin is None:
+            raise click.ClickException('No admin user to own the imported events; pass --created-by.')
+        created_by = admin[0]
+
+    imported = rejected = 0
+    started = last_report = time.perf_counter()
+    rows = read_import_rows(path, fmt)
+    pool = password_hash_pool() if kind == 'users' else None
+    try:
+        with open(rejects_path, 'w', encoding='utf-8') as rejects_file:
+            while True:
+                chunk = list(islice(rows, batch_size))
+                if not chunk:
+                    break
+                rejects = []
+                try:
+                    if kind == 'users':
+                        imported += import_users_chunk(chunk, rejects, pool)
+                    elif kind == 'events':
+                        imported += import_events_chunk(chunk, rejects, created_by)
+                    else:
+                        imported += import_registrations_chunk(chunk, rejects)
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Import batch error: {e}")
+                    rejects = [(line_no, row, f'Batch failed: {e}') for line_no, row in chunk]
+
+                for line_no, row, error in rejects:
+                    rejects_file.write(json.dumps({'line': line_no, 'error': error, 'row': row}) + '\n')
+                rejected += len(rejects)
+
+                now = time.perf_counter()
+                if now - last_report >= 5:
+                    last_report = now
+                    print(f"   {imported + rejected} rows read, {imported} imported, "
+                          f"{rejected} rejected ({(imported + rejected) / (now - started):.0f} rows/sec)")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    invalidate_stats()
+    return imported, rejected, time.perf_counter() - started
+
+# Bulk registration - whole sections registered or cancelled per event, set-wise,
+# each event in one short transaction
+BULK_CHUNK = 5000  # Ids per IN list, under SQLite's bound parameter limit
+
+# Students a batch is about to place or cancel, in list order; per connection
+# and outside the main database, so filling it doesn't take the write lock
+bulk_roster = db.Table(
+    'bulk_roster', db.MetaData(),
+    db.Column('pos', db.Integer, primary_key=True),
+    db.Column('user_id', db.Integer, nullable=False),
+    db.Column('registration_id', db.Integer),  # Row to update rather than insert
+    prefixes=['TEMPORARY'],
+)
+
+def id_chunks(ids):
+    ids = list(ids)
+    for start in range(0, len(ids), BULK_CHUNK):
+        yield ids[start:start + BULK_CHUNK]
+
+def bulk_user_ids(rows):
+    """Ordered, de-duplicated user ids from rows carrying a user_id or username;
+    returns (user ids, [(row, problem)] for rows that name nobody)"""
+    user_ids, usernames, problems = [], [], []
+    for row in rows:
+        if field(row, 'user_id'):
+            try:
+                user_ids.append(int(field(row, 'user_id')))
+            except ValueError:
+                problems.append((row, 'Invalid user id.'))
+        elif field(row, 'username'):
+            usernames.append((row, field(row, 'username')))
+        else:
+            problems.append((row, 'Missing user_id or username.'))
+    by_name = {}
+    for chunk in id_chunks({name for _, name in usernames}):
+        by_name.update(db.session.query(User.username, User.id).filter(User.username.in_(chunk)))
+    for row, name in usernames:
+        if name in by_name:
+            user_ids.append(by_name[name])
+        else:
+            problems.append((row, 'Unknown user.'))
+    return list(dict.fromkeys(user_ids)), problems
+
+def event_registrations(event_id, user_ids=None, since=None):
+    """{user id: (registration id, status)} for the event, limited to `user_ids`
+    or to rows updated since `since`"""
+    columns = (Registration.user_id, Registration.id, Registration.status)
+    if since is not None:
+        rows = db.session.query(*columns).filter(Registration.updated_at >= since, Registration.event_id == event_id)
+        return {user_id: (registration_id, status) for user_id, registration_id, status in rows}
+    found = {}
+    for chunk in id_chunks(user_ids):
+        found.update((user_id, (registration_id, status)) for user_id, registration_id, status in db.session.query(
+            *columns).filter(Registration.event_id == event_id, Registration.user_id.in_(chunk)))
+    return found
+
+def roster_rows(user_ids, existing, pick, only=None):
+    """Roster rows for the users `pick(user_id, (registration id, status) or None)` accepts"""
+    return [{'pos': pos, 'user_id': user_id, 'registration_id': existing[user_id][0] if user_id in existing else None}
+            for pos, user_id in enumerate(user_ids)
+            if (only is None or user_id in only) and pick(user_id, existing.get(user_id))]
+
+def fill_roster(rows, only=None):
+    """Load rows into this connection's bulk_roster, replacing all of it or just the users in `only`"""
+    connection = db.session.connection()
+    bulk_roster.create(connection, checkfirst=True)
+    if only is None:
+        connection.execute(bulk_roster.delete())
+    else:
+        for chunk in id_chunks(only):
+            connection.execute(bulk_roster.delete().where(bulk_roster.c.user_id.in_(chunk)))
+    if rows:
+        connection.execute(bulk_roster.insert(), rows)
+
+def run_bulk(event_id, user_ids, wanted, pick, apply):
+    """Shared shape of bulk_register and bulk_cancel
+
+    The anti-join against the event's registrations, and loading the roster,
+    happen before the event's lock; under it only rows written since (a
+    student signing up meanwhile) are re-read, then `apply(seats, existing,
+    plan)` runs its set-based statements. Returns (apply's result, milliseconds locked).
+    """
+    since = datetime.utcnow() - timedelta(seconds=app.config['API_SYNC_OVERLAP_SECONDS'])
+    db.session.commit()  # Read from a fresh snapshot
+    existing = event_registrations(event_id, wanted)
+    fill_roster(roster_rows(user_ids, existing, pick))
+
+    started = time.perf_counter()
+    seats = lock_event_seats(event_id)
+    if seats is None:
+        db.session.rollback()
+        return None, 0.0
+    late = {user_id: row for user_id, row in event_registrations(event_id, since=since).items()
+            if user_id in wanted and existing.get(user_id) != row}
+    if late:
+        existing.update(late)
+        fill_roster(roster_rows(user_ids, existing, pick, only=late), only=late)
+    result = apply(seats, existing, roster_rows(user_ids, existing, pick))
+    db.session.commit()
+    return result, (time.perf_counter() - started) * 1000
+
+def bulk_register(event_id, user_ids, waitlist=True):
+    """Register `user_ids`, in priority order, for one event: free seats go to the
+    first ones, the rest join the waitlist (or are turned away when `waitlist` is
+    False); returns ({user id: result}, milliseconds the event was locked)"""
+    known = set()
+    for chunk in id_chunks(user_ids):
+        known.update(user_id for (user_id,) in db.session.query(User.id).filter(
+            User.id.in_(chunk), User.is_active.is_(True)))
+
+    def pick(user_id, current):
+        return user_id in known and (current is None or current[1] == 'cancelled')
+
+    def apply(seats, existing, plan):
+        # Joining behind an existing queue, like join_event
+        free = seats.capacity - seats.registered_count if seats.waitlist_count == 0 else 0
+        seated, queued = plan[:max(free, 0)], plan[max(free, 0):] if waitlist else []
+        cutoff = seated[-1]['pos'] if seated else -1
+        placed = bulk_roster.c.pos <= cutoff if not waitlist else db.true()
+        now = datetime.utcnow()
+        table, roster = Registration.__table__, bulk_roster
+        if any(row['registration_id'] is None for row in seated + queued):
+            db.session.execute(table.insert().from_select(
+                ['user_id', 'event_id', 'status', 'registration_date', 'updated_at'],
+                db.select(roster.c.user_id, db.literal(event_id),
+                          db.case((roster.c.pos <= cutoff, 'registered'), else_='waitlisted'),
+                          db.literal(now, db.DateTime), db.literal(now, db.DateTime))
+                .where(roster.c.registration_id.is_(None), placed).order_by(roster.c.pos)
+            ))
+        # Cancelled rows are re-used, going to the back of the queue like a re-join
+        rejoined = sum(row['registration_id'] is not None for row in seated + queued)
+        if rejoined:
+            mark_analytics_days(date.fromisoformat(str(day)) for (day,) in db.session.query(
+                db.func.date(Registration.registration_date)).filter(Registration.id.in_(
+                    db.select(roster.c.registration_id).where(roster.c.registration_id.isnot(None)))).distinct())
+        for status, rows, band in (('registered', seated, roster.c.pos <= cutoff),
+                                   ('waitlisted', queued, roster.c.pos > cutoff)):
+            if any(row['registration_id'] is not None for row in rows):
+                db.session.execute(
+                    db.update(table).where(table.c.id.in_(
+                        db.select(roster.c.registration_id).where(roster.c.registration_id.isnot(None), band)
+                    )).values(status=status, registration_date=now, updated_at=now)
+                )
+
+        if seated or queued:
+            db.session.execute(
+                db.update(Event).where(Event.id == event_id).values(
+                    registered_count=Event.registered_count + len(seated),
+                    waitlist_count=Event.waitlist_count + len(queued),
+                ).execution_options(synchronize_session=False)
+            )
+            # Core writes skip the flush hooks
+            bump_stats(db.session.connection(), {
+                'registrations': len(seated) + len(queued) - rejoined, 'registrations:cancelled': -rejoined,
+                'registrations:registered': len(seated), 'registrations:waitlisted': len(queued),
+            })
+            db.session.info['stats_changed'] = True
+            tag_changed_pages(db.session, [f'event:{event_id}',
+                                           *(f"calendar:{row['user_id']}" for row in seated + queued)])
+            enqueue_notifications(event_id, [row['user_id'] for row in seated], 'registered')
+            enqueue_notifications(event_id, [row['user_id'] for row in queued], 'waitlisted')
+
+        results = dict.fromkeys((row['user_id'] for row in seated), 'registered')
+        results.update(dict.fromkeys((row['user_id'] for row in plan[len(seated):]),
+                                     'waitlisted' if waitlist else 'event full'))
+        return {user_id: results.get(user_id) or ('unknown user' if user_id not in known
+                                                  else f'already {existing[user_id][1]}')
+                for user_id in user_ids}
+
+    results, locked = run_bulk(event_id, user_ids, known, pick, apply)
+    if results is None:
+        return dict.fromkeys(user_ids, 'unknown event'), locked
+    return results, locked
+
+def bulk_cancel(event_id, user_ids):
+    """Cancel `user_ids`' registrations and waitlist places for one event, then
+    hand any freed seats to the waitlist; returns ({user id: result}, milliseconds locked)"""
+    def pick(user_id, current):
+        return current is not None and current[1] != 'cancelled'
+
+    def apply(seats, existing, plan):
+        counts = Counter(existing[row['user_id']][1] for row in plan)
+        if plan:
+            db.session.execute(
+                db.update(Registration.__table__)
+                .where(Registration.__table__.c.id.in_(db.select(bulk_roster.c.registration_id)))
+                .values(status='cancelled', updated_at=datetime.utcnow())
+            )
+            db.session.execute(
+                db.update(Event).where(Event.id == event_id).values(
+                    registered_count=Event.registered_count - counts['registered'],
+                    waitlist_count=Event.waitlist_count - counts['waitlisted'],
+                ).execution_options(synchronize_session=False)
+            )
+            bump_stats(db.session.connection(), {
+                'registrations:cancelled': len(plan),
+                'registrations:registered': -counts['registered'], 'registrations:waitlisted': -counts['waitlisted'],
+            })
+            db.session.info['stats_changed'] = True
+            tag_changed_pages(db.session, [f'event:{event_id}', *(f"calendar:{row['user_id']}" for row in plan)])
+        cancelled = {row['user_id']: existing[row['user_id']][1] for row in plan}
+        return {user_id: ('not registered' if user_id not in cancelled
+                          else 'cancelled' if cancelled[user_id] == 'registered' else 'left waitlist')
+                for user_id in user_ids}
+
+    results, locked = run_bulk(event_id, user_ids, set(user_ids), pick, apply)
+    if results is None:
+        return dict.fromkeys(user_ids, 'unknown event'), locked
+    if any(result == 'cancelled' for result in results.values()):
+        waitlist_promoter.notify(event_id)
+    return results, locked
+
+def bulk_registrations(action, event_ids, user_ids, waitlist=True):
+    """Run bulk_register or bulk_cancel for each event; returns a report with a
+    result per (event, user), totals per result and lock time per event"""
+    report = {'results': [], 'summary': Counter(), 'lock_ms': {}}
+    for event_id in dict.fromkeys(event_ids):
+        if action == 'register':
+            results, locked = bulk_register(event_id, user_ids, waitlist)
+        else:
+            results, locked = bulk_cancel(event_id, user_ids)
+        report['lock_ms'][event_id] = round(locked, 2)
+        for user_id, result in results.items():
+            report['results'].append({'event_id': event_id, 'user_id': user_id, 'result': result})
+            report['summary'][result] += 1
+    return report
+
+# Login retention - daily rollups, and raw rows past the horizon moved to gzip archives
+LOGIN_ARCHIVE_COLUMNS = ('id', 'user_id', 'login_time', 'logout_time', 'ip_address', 'user_agent',
+                         'session_duration', 'session_key')
+
+def day_start(day):
+    return datetime.combine(day, datetime.min.time())
+
+def rollup_login_days(start, end):
+    """(Re)compute the daily rows for days in [start, end) from the raw login rows"""
+    day = db.func.date(LoginActivity.login_time)
+    rows = db.session.query(
+        day, db.func.count(LoginActivity.id), db.func.count(db.distinct(LoginActivity.user_id)),
+        db.func.count(LoginActivity.session_duration),
+        db.func.coalesce(db.func.sum(LoginActivity.session_duration), 0),
+    ).filter(
+        LoginActivity.login_time >= day_start(start), LoginActivity.login_time < day_start(end)
+    ).group_by(day).all()
+    days = [date.fromisoformat(str(row[0])) for row in rows]
+    if days:
+        LoginActivityDaily.query.filter(LoginActivityDaily.day.in_(days)).delete(synchronize_session=False)
+        db.session.execute(db.insert(LoginActivityDaily), [{
+            'day': day, 'logins': logins, 'unique_users': users,
+            'timed_sessions': timed, 'session_minutes': minutes,
+        } for day, (_, logins, users, timed, minutes) in zip(days, rows)])
+    db.session.commit()
+    return len(days)
+
+def archive_login_day(day, archive_dir, batch_size):
+    """Write one day's raw login rows to a gzip JSON lines file, then delete them
+    in short transactions; returns (rows archived, longest delete in ms)"""
+    path = os.path.join(archive_dir, f'login_activity-{day.isoformat()}.jsonl.gz')
+    day_range = (LoginActivity.login_time >= day_start(day),
+                 LoginActivity.login_time < day_start(day + timedelta(days=1)))
+
+    # A finished archive file means an earlier run got as far as deleting;
+    # the day's rollup already counted every row, so just finish the deletes
+    if not os.path.exists(path):
+        rollup_login_days(day, day + timedelta(days=1))
+        os.makedirs(archive_dir, exist_ok=True)
+        columns = [getattr(LoginActivity, name) for name in LOGIN_ARCHIVE_COLUMNS]
+        with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as archive:
+            for row in db.session.query(*columns).filter(*day_range).order_by(
+                    LoginActivity.login_time, LoginActivity.id).yield_per(batch_size):
+                archive.write(json.dumps(row_to_dict(row)) + '\n')
+        db.session.commit()  # End the read before the deletes start
+        os.replace(path + '.tmp', path)
+
+    archived, longest = 0, 0.0
+    while True:
+        started = time.perf_counter()
+        batch = db.session.query(LoginActivity.id).filter(*day_range).limit(batch_size).scalar_subquery()
+        deleted = db.session.execute(
+            db.delete(LoginActivity).where(LoginActivity.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        longest = max(longest, (time.perf_counter() - started) * 1000)
+        archived += deleted
+        if deleted < batch_size:
+            return archived, longest
+
+def archive_logins(retention_days, archive_dir, batch_size=5000):
+    """Roll up finished days, and archive every day older than `retention_days`
+
+    Returns {'days_rolled_up', 'days_archived', 'rows_archived', 'longest_batch_ms'}.
+    """
+    today = datetime.utcnow().date()
+    cutoff = today - timedelta(days=retention_days)
+    summary = Counter()
+
+    # Recent days: refresh from the last rolled-up day (late logouts may have
+    # changed it) up to yesterday
+    latest = db.session.query(db.func.max(LoginActivityDaily.day)).scalar()
+    start = max(cutoff, latest - timedelta(days=1)) if latest else cutoff
+    summary['days_rolled_up'] += rollup_login_days(start, today)
+
+    # Old days, oldest first, one at a time
+    while True:
+        oldest = db.session.query(db.func.min(LoginActivity.login_time)).scalar()
+        if oldest is None or oldest.date() >= cutoff:
+            break
+        rows, longest = archive_login_day(oldest.date(), archive_dir, batch_size)
+        summary['days_archived'] += 1
+        summary['rows_archived'] += rows
+        summary['longest_batch_ms'] = max(summary['longest_batch_ms'], round(longest, 1))
+    return dict(summary)
+
+def login_history(days=30):
+    """[(day, logins, unique users, average session minutes)] for the last `days`
+    days, oldest first: rollups for finished days, the live counter for today"""
+    today = datetime.utcnow().date()
+    rolled = {row.day: row for row in LoginActivityDaily.query.filter(
+        LoginActivityDaily.day >= today - timedelta(days=days - 1))}
+    stats = get_stats()
+    history = []
+    for offset in range(days - 1, -1, -1):
+        day = today - timedelta(days=offset)
+        row = rolled.get(day) if day < today else None
+        history.append((day, row.logins, row.unique_users, row.avg_session_minutes) if row
+                       else (day, stats.get(f'logins:{day}', 0), None, None))
+    return history
+
+# Analytics - summary tables behind the admin charts, refreshed from the base
+# tables with set-based INSERT ... SELECT statements instead of ad hoc scans
+def academic_term(day):
+    """(year, 'spring' | 'summer' | 'fall') of a date"""
+    return day.year, 'spring' if day.month <= 5 else 'summer' if day.month <= 7 else 'fall'
+
+def term_columns(event_date):
+    """academic_term() as SQL expressions"""
+    month = db.extract('month', event_date)
+    return (db.extract('year', event_date),
+            db.case((month <= 5, 'spring'), (month <= 7, 'summer'), else_='fall'))
+
+def refresh_event_analytics(changed=None):
+    """Recompute the EventAnalytics rows of events matching `changed` (all events
+    when None), then the category/term totals those events moved out of or into"""
+    year, term = term_columns(Event.event_date)
+    rows = db.select(
+        Event.id, year, term, db.func.coalesce(Event.category, 'general'),
+        Event.capacity, Event.registered_count, Event.waitlist_count,
+        db.case((Event.capacity > 0, db.cast(Event.registered_count, db.Float) / Event.capacity), else_=0.0),
+    )
+    target = EventAnalytics.__table__
+    columns = ['event_id', 'year', 'term', 'category', 'capacity', 'registered', 'waitlisted', 'fill_rate']
+    group = (EventAnalytics.year, EventAnalytics.term, EventAnalytics.category)
+
+    if changed is None:
+        db.session.execute(db.delete(target))
+        db.session.execute(db.insert(target).from_select(columns, rows))
+        refresh_term_analytics(None)
+        return
+
+    ids = db.select(Event.id).where(changed)
+    groups = set(db.session.query(*group).filter(EventAnalytics.event_id.in_(ids)).distinct())
+    db.session.execute(db.delete(target).where(target.c.event_id.in_(ids)))
+    db.session.execute(db.insert(target).from_select(columns, rows.where(changed)))
+    groups.update(db.session.query(*group).filter(EventAnalytics.event_id.in_(ids)).distinct())
+    refresh_term_analytics(groups)
+
+def refresh_term_analytics(groups):
+    """Re-total CategoryTermAnalytics from EventAnalytics for the given
+    (year, term, category) groups, or for every group when None"""
+    target = CategoryTermAnalytics.__table__
+    totals = db.select(
+        EventAnalytics.year, EventAnalytics.term, EventAnalytics.category, db.func.count(),
+        db.func.sum(EventAnalytics.capacity), db.func.sum(EventAnalytics.registered),
+        db.func.sum(EventAnalytics.waitlisted),
+    ).group_by(EventAnalytics.year, EventAnalytics.term, EventAnalytics.category)
+    columns = ['year', 'term', 'category', 'events', 'capacity', 'registered', 'waitlisted']
+
+    if groups is None:
+        db.session.execute(db.delete(target))
+        db.session.execute(db.insert(target).from_select(columns, totals))
+        return
+    for year, term, category in groups:
+        db.session.execute(db.delete(target).where(
+            target.c.year == year, target.c.term == term, target.c.category == category))
+        db.session.execute(db.insert(target).from_select(columns, totals.where(
+            EventAnalytics.year == year, EventAnalytics.term == term, EventAnalytics.category == category)))
+
+def refresh_daily_analytics(days=None):
+    """Recount RegistrationDaily for the given days (every day when None)
+
+    Rows count on the day they joined, for as long as they are registered or
+    waitlisted: a cancellation takes a row out of its day, and a re-join
+    (which resets registration_date) adds it to the new one.
+    """
+    day = db.func.date(Registration.registration_date)
+    category = db.func.coalesce(Event.category, 'general')
+    counts = db.select(
+        day, category,
+        db.func.sum(db.case((Registration.status == 'registered', 1), else_=0)),
+        db.func.sum(db.case((Registration.status == 'waitlisted', 1), else_=0)),
+    ).join(Event, Event.id == Registration.event_id).where(
+        Registration.status != 'cancelled'
+    ).group_by(day, category)
+    target = RegistrationDaily.__table__
+    columns = ['day', 'category', 'registered', 'waitlisted']
+
+    if days is None:
+        db.session.execute(db.delete(target))
+        db.session.execute(db.insert(target).from_select(columns, counts))
+        return
+    for changed in days:
+        db.session.execute(db.delete(target).where(target.c.day == changed))
+        db.session.execute(db.insert(target).from_select(columns, counts.where(
+            Registration.registration_date >= day_start(changed),
+            Registration.registration_date < day_start(changed + timedelta(days=1)))))
+
+def mark_analytics_days(days):
+    """Have the next incremental refresh recount `days`: registration_date is
+    about to move rows off them, which updated_at alone doesn't show"""
+    rows = [{'day': day} for day in days if day is not None]
+    if rows:
+        db.session.execute(db.text(
+            "INSERT INTO analytics_stale_day (day) VALUES (:day) ON CONFLICT (day) DO NOTHING"
+        ).bindparams(db.bindparam('day', type_=db.Date)), rows)
+
+def refresh_analytics(full=False):
+    """Bring the summary tables up to date; returns 'full' or 'incremental'
+
+    Incremental refreshes recompute only the events and registration days
+    whose rows changed (updated_at) since the last refresh.
+    """
+    # Start the next window a little early, as since= sync does, so rows
+    # committed with slightly older timestamps are picked up next time
+    started = datetime.utcnow() - timedelta(seconds=app.config['API_SYNC_OVERLAP_SECONDS'])
+    watermark = db.session.get(AnalyticsWatermark, 'analytics')
+    if full or watermark is None:
+        refresh_event_analytics()
+        refresh_daily_analytics()
+        db.session.execute(db.delete(AnalyticsStaleDay.__table__))
+        kind = 'full'
+    else:
+        since = watermark.refreshed_at
+        refresh_event_analytics(Event.updated_at > since)
+        days = {date.fromisoformat(str(day)) for (day,) in db.session.query(
+            db.func.date(Registration.registration_date)).filter(Registration.updated_at > since).distinct()}
+        # Read after the first write, so no re-join can add a day between here and the delete
+        stale = [day for (day,) in db.session.query(AnalyticsStaleDay.day)]
+        refresh_daily_analytics(sorted(days.union(stale)))
+        if stale:
+            db.session.execute(db.delete(AnalyticsStaleDay.__table__).where(AnalyticsStaleDay.day.in_(stale)))
+        kind = 'incremental'
+
+    if watermark is None:
+        watermark = AnalyticsWatermark(name='analytics')
+        db.session.add(watermark)
+    watermark.refreshed_at = started
+    db.session.commit()
+    return kind
+
+def analytics_summary(days=30, top=10):
+    """Everything the admin charts show, read from the summary tables as they
+    are; run-jobs or refresh-analytics keeps them up to date"""
+    watermark = db.session.get(AnalyticsWatermark, 'analytics')
+
+    today = datetime.utcnow().date()
+    year, term = academic_term(today)
+    fill_columns = (EventAnalytics.event_id, Event.title, EventAnalytics.category, EventAnalytics.capacity,
+                    EventAnalytics.registered, EventAnalytics.waitlisted, EventAnalytics.fill_rate)
+    this_term = db.session.query(*fill_columns).join(Event, Event.id == EventAnalytics.event_id).filter(
+        EventAnalytics.year == year, EventAnalytics.term == term)
+    return {
+        'refreshed_at': watermark.refreshed_at if watermark else None,
+        'term': f'{term} {year}',
+        'registrations_by_day': db.session.query(*RegistrationDaily.__table__.columns).filter(
+            RegistrationDaily.day >= today - timedelta(days=days - 1)
+        ).order_by(RegistrationDaily.day, RegistrationDaily.category).all(),
+        'category_terms': db.session.query(*CategoryTermAnalytics.__table__.columns, (
+            db.cast(CategoryTermAnalytics.registered, db.Float) / db.func.nullif(CategoryTermAnalytics.capacity, 0)
+        ).label('fill_rate')).filter(
+            CategoryTermAnalytics.year >= year - 1
+        ).order_by(CategoryTermAnalytics.year, CategoryTermAnalytics.term, CategoryTermAnalytics.category).all(),
+        'fullest_events': this_term.order_by(EventAnalytics.fill_rate.desc()).limit(top).all(),
+        'emptiest_events': this_term.order_by(EventAnalytics.fill_rate).limit(top).all(),
+    }
+
+# Scheduling - event durations, venue double-booking checks and free slots, each
+# answered from a range of ix_event_venue_schedule (venue, status, event_date, event_time)
+MAX_EVENT_MINUTES = 24 * 60  # So a booking can spill into the next day at most
+
+Booking = namedtuple('Booking', 'start end id title')
+
+def event_span(event_date, event_time, duration_minutes):
+    """(start, end) datetimes of a booking"""
+    start = datetime.combine(event_date, event_time)
+    return start, start + timedelta(minutes=duration_minutes)
+
+def venue_bookings(venue, first_day, last_day, exclude_id=None):
+    """Active bookings of `venue` that touch first_day..last_day, earliest first"""
+    query = db.session.query(
+        Event.id, Event.title, Event.event_date, Event.event_time, Event.duration_minutes
+    ).filter(
+        Event.venue == venue,
+        # The day before too: a late event may run past midnight
+        Event.event_date.between(first_day - timedelta(days=1), last_day),
+        Event.status == 'active',
+    ).order_by(Event.event_date, Event.event_time)
+    if exclude_id is not None:
+        query = query.filter(Event.id != exclude_id)
+    opens = datetime.combine(first_day, datetime.min.time())
+    bookings = []
+    for event_id, title, event_date, event_time, minutes in query:
+        start, end = event_span(event_date, event_time, minutes)
+        if end > opens:
+            bookings.append(Booking(start, end, event_id, title))
+    return bookings
+
+def find_conflicts(venue, event_date, event_time, duration_minutes, exclude_id=None):
+    """Bookings of `venue` overlapping the given slot, earliest first"""
+    start, end = event_span(event_date, event_time, duration_minutes)
+    return [booking for booking in venue_bookings(venue, event_date, end.date(), exclude_id)
+            if booking.start < end and start < booking.end]
+
+def describe_bookings(bookings, limit=3):
+    """'Title (12 Mar 10:00-11:30); ...' for flash messages"""
+    text = '; '.join(f"{b.title} ({b.start:%d %b %H:%M}-{b.end:%H:%M})" for b in bookings[:limit])
+    return text + (f' and {len(bookings) - limit} more' if len(bookings) > limit else '')
+
+def venue_hours():
+    """(opens, closes) times from VENUE_HOURS"""
+    opens, closes = app.config['VENUE_HOURS'].split('-')
+    return datetime.strptime(opens.strip(), '%H:%M').time(), datetime.strptime(closes.strip(), '%H:%M').time()
+
+def free_slots(venue, first_day, days=7, min_minutes=30):
+    """Gaps of at least `min_minutes` between bookings of `venue` within VENUE_HOURS,
+    as (start, end) pairs, for `days` days from `first_day`"""
+    opens, closes = venue_hours()
+    bookings = venue_bookings(venue, first_day, first_day + timedelta(days=days - 1))
+    shortest = timedelta(minutes=min_minutes)
+    slots = []
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        cursor, day_end = datetime.combine(day, opens), datetime.combine(day, closes)
+        for booking in bookings:
+            if booking.start >= day_end:
+                break
+            if booking.end <= cursor:
+                continue
+            if booking.start - cursor >= shortest:
+                slots.append((cursor, booking.start))
+            cursor = max(cursor, booking.end)
+        if day_end - cursor >= shortest:
+            slots.append((cursor, day_end))
+    return slots
+
+def schedule_conflicts(first_day=None, batch_size=5000):
+    """Yield every pair of overlapping active bookings at the same venue as
+    (venue, earlier, later), from one ordered range of ix_event_venue_schedule per venue"""
+    venues = [venue for (venue,) in db.session.query(Event.venue).distinct().order_by(Event.venue)]
+    for venue in venues:
+        query = db.session.query(
+            Event.id, Event.title, Event.event_date, Event.event_time, Event.duration_minutes
+        ).filter(Event.venue == venue, Event.status == 'active').order_by(Event.event_date, Event.event_time)
+        if first_day is not None:
+            query = query.filter(Event.event_date >= first_day)
+        running = []  # Bookings of this venue not yet over
+        for event_id, title, event_date, event_time, minutes in query.yield_per(batch_size):
+            booking = Booking(*event_span(event_date, event_time, minutes), event_id, title)
+            running = [earlier for earlier in running if earlier.end > booking.start]
+            for earlier in running:
+                yield venue, earlier, booking
+            running.append(booking)
+
+# Jobs - a persistent queue in the job table for notification work, so requests
+# only insert a row; `flask run-jobs` workers lease, run and retry them
+JOB_HANDLERS = {}
+outbox_lock = threading.Lock()
+
+def job_handler(kind):
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+def enqueue(kind, payload, run_at=None, dedupe_key=None):
+    """Add a job to the session; it is queued when the caller's transaction commits"""
+    db.session.add(Job(kind=kind, payload=json.dumps(payload), run_at=run_at or datetime.utcnow(),
+                       dedupe_key=dedupe_key))
+
+def enqueue_notifications(event_id, user_ids, status):
+    """Queue notices telling `user_ids` their place at the event, NOTIFY_BATCH_SIZE per job"""
+    if not app.config['NOTIFICATIONS']:
+        return
+    size = app.config['NOTIFY_BATCH_SIZE']
+    for start in range(0, len(user_ids), size):
+        enqueue('registration_notice', {'event_id': event_id, 'status': status,
+                                        'user_ids': list(user_ids[start:start + size])})
+
+def local_to_utc(moment):
+    """Event dates and times are campus-local; jobs run on UTC"""
+    offset = round((datetime.utcnow() - datetime.now()).total_seconds() / 60)
+    return moment + timedelta(minutes=offset)
+
+def claim_jobs(worker, limit):
+    """Lease up to `limit` due jobs, oldest first: queued ones, and leased ones
+    whose worker stopped before finishing. A lease moves run_at to its expiry.
+
+    An expired lease that already used its last attempt crashed or hung its
+    worker every time, so it is marked failed rather than leased again.
+    """
+    now = datetime.utcnow()
+    db.session.execute(
+        db.update(Job)
+        .where(Job.state == 'leased', Job.run_at <= now, Job.attempts >= app.config['JOB_MAX_ATTEMPTS'])
+        .values(state='failed', run_at=now, lease_owner=None,
+                last_error='Lease expired on the last attempt.')
+        .execution_options(synchronize_session=False)
+    )
+    due = (Job.state.in_(('queued', 'leased')), Job.run_at <= now)
+    rows = db.session.execute(
+        db.update(Job)
+        .where(Job.id.in_(db.select(Job.id).where(*due).order_by(Job.run_at).limit(limit)), *due)
+        .values(state='leased', lease_owner=worker, attempts=Job.attempts + 1,
+                run_at=now + timedelta(seconds=app.config['JOB_LEASE_SECONDS']))
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.session.commit()
+    return rows
+
+def finish_job(job, worker, error=None, follow_ups=()):
+    """Record a run: done (queueing `follow_ups`), retried after a backoff, or
+    failed for good after JOB_MAX_ATTEMPTS; returns False if the lease was lost"""
+    now = datetime.utcnow()
+    if error is None:
+        values = {'state': 'done', 'run_at': now, 'last_error': None}
+    elif job.attempts >= app.config['JOB_MAX_ATTEMPTS']:
+        values = {'state': 'failed', 'run_at': now, 'last_error': error}
+    else:
+        # Exponential, with jitter so a failing batch doesn't retry in lockstep
+        delay = min(app.config['JOB_RETRY_SECONDS'] * 2 ** (job.attempts - 1), 3600) * random.uniform(0.8, 1.2)
+        values = {'state': 'queued', 'run_at': now + timedelta(seconds=delay), 'last_error': error}
+    owned = db.session.execute(
+        db.update(Job).where(Job.id == job.id, Job.state == 'leased', Job.lease_owner == worker)
+        .values(**values).execution_options(synchronize_session=False)
+    ).rowcount
+    if not owned:
+        db.session.rollback()  # The lease ran out and another worker has it
+        return False
+    for kind, payload in follow_ups:
+        enqueue(kind, payload)
+    db.session.commit()
+    return True
+
+def run_job(job, worker):
+    """Run one leased job; returns 'done', 'retried', 'failed' or 'lost'"""
+    try:
+        follow_ups = JOB_HANDLERS[job.kind](json.loads(job.payload)) or ()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Job {job.id} ({job.kind}) error: {e}")
+        if not finish_job(job, worker, error=f'{type(e).__name__}: {e}'[:1000]):
+            return 'lost'
+        return 'failed' if job.attempts >= app.config['JOB_MAX_ATTEMPTS'] else 'retried'
+    return 'done' if finish_job(job, worker, follow_ups=follow_ups) else 'lost'
+
+def send_messages(messages):
+    """Deliver to the outbox: one JSON line per message in today's file
+
+    Delivery is at least once: a batch retried after a crash is sent again,
+    with the same message ids.
+    """
+    if not messages:
+        return
+    directory = app.config['NOTIFY_OUTBOX_DIR']
+    os.makedirs(directory, exist_ok=True)
+    lines = ''.join(json.dumps(message) + '\n' for message in messages)
+    with outbox_lock, open(os.path.join(directory, f'{datetime.utcnow():%Y-%m-%d}.jsonl'), 'a',
+                           encoding='utf-8') as f:
+        f.write(lines)
+
+def event_message(message_id, user, subject, body):
+    return {'id': message_id, 'to': f'{user.full_name} <{user.email}>', 'subject': subject, 'body': body,
+            'sent_at': datetime.utcnow().isoformat()}
+
+NOTICE_SUBJECTS = {
+    'registered': 'You are registered for {title}',
+    'waitlisted': 'You are on the waitlist for {title}',
+    'promoted': 'A seat opened up: you are registered for {title}',
+}
+
+@job_handler('registration_notice')
+def send_registration_notices(payload):
+    """Confirmation, waitlist and promotion notices for one batch of users"""
+    event = db.session.query(Event.id, Event.title, Event.event_date, Event.event_time, Event.venue).filter(
+        Event.id == payload['event_id']).first()
+    if event is None:
+        return
+    subject = NOTICE_SUBJECTS[payload['status']].format(title=event.title)
+    body = f'{event.title}\n{event.event_date:%A %d %B %Y}, {event.event_time:%H:%M} at {event.venue}'
+    users = db.session.query(User.id, User.email, User.full_name).filter(User.id.in_(payload['user_ids']))
+    send_messages([event_message(f"{payload['status']}:{event.id}:{user.id}", user, subject, body)
+                   for user in users])
+
+@job_handler('event_reminder')
+def send_event_reminders(payload):
+    """Remind an event's registrants: the first job splits them into
+    NOTIFY_BATCH_SIZE ranges of (registration_date, id), queued as follow-up
+    jobs so workers send them in parallel"""
+    event = db.session.query(Event.id, Event.title, Event.event_date, Event.event_time, Event.venue,
+                             Event.status).filter(Event.id == payload['event_id']).first()
+    if (event is None or event.status != 'active'
+            or datetime.combine(event.event_date, event.event_time).isoformat() != payload['start']):
+        return  # Cancelled or moved; the sweep queues a reminder for the new time
+    key = db.tuple_(Registration.registration_date, Registration.id)
+    registrants = Registration.query.filter(Registration.event_id == event.id, Registration.status == 'registered')
+    if 'through' not in payload:
+        keys = [[moment.isoformat(), registration_id] for moment, registration_id in registrants.with_entities(
+            Registration.registration_date, Registration.id).order_by(Registration.registration_date, Registration.id)]
+        size = app.config['NOTIFY_BATCH_SIZE']
+        return [('event_reminder', {**payload, 'after': keys[start - 1] if start else None,
+                                    'through': keys[min(start + size, len(keys)) - 1]})
+                for start in range(0, len(keys), size)]
+
+    def bound(value):
+        return (datetime.fromisoformat(value[0]), value[1])
+
+    if payload['after']:
+        registrants = registrants.filter(key > bound(payload['after']))
+    rows = registrants.filter(key <= bound(payload['through'])).join(User, User.id == Registration.user_id).with_entities(
+        User.id, User.email, User.full_name)
+    subject = f'Reminder: {event.title} is coming up'
+    body = f'{event.title}\n{event.event_date:%A %d %B %Y}, {event.event_time:%H:%M} at {event.venue}'
+    send_messages([event_message(f"reminder:{event.id}:{payload['start']}:{row.id}", row, subject, body)
+                   for row in rows])
+
+def schedule_reminders():
+    """Queue a reminder, REMINDER_HOURS before the start, for every active event
+    starting before tomorrow's sweep that has none yet; returns how many were queued
+
+    Catches events however they were created (form, import, generate-data) and
+    moved ones, whose reminder key includes the start time.
+    """
+    now = datetime.now()
+    lead = timedelta(hours=app.config['REMINDER_HOURS'])
+    events = db.session.query(Event.id, Event.event_date, Event.event_time).filter(
+        Event.status == 'active', Event.event_date.between(now.date(), (now + lead + timedelta(days=1)).date()))
+    wanted = {}
+    for event_id, event_date, event_time in events:
+        start = datetime.combine(event_date, event_time)
+        if start > now:
+            wanted[f'reminder:{event_id}:{start:%Y%m%dT%H%M}'] = (event_id, start)
+    for chunk in id_chunks(wanted):
+        for (key,) in db.session.query(Job.dedupe_key).filter(Job.dedupe_key.in_(chunk)):
+            del wanted[key]
+    for key, (event_id, start) in wanted.items():
+        enqueue('event_reminder', {'event_id': event_id, 'start': start.isoformat()},
+                run_at=local_to_utc(max(start - lead, now)), dedupe_key=key)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # Another worker's sweep got there first
+        return 0
+    return len(wanted)
+
+@job_handler('analytics_refresh')
+def run_analytics_refresh(payload):
+    refresh_analytics()
+
+def schedule_analytics_refresh():
+    """Queue an analytics refresh once the summary tables are older than
+    ANALYTICS_REFRESH_SECONDS; one per interval, however many workers sweep"""
+    max_age = app.config['ANALYTICS_REFRESH_SECONDS']
+    if not max_age:
+        return False
+    watermark = db.session.get(AnalyticsWatermark, 'analytics')
+    if watermark is not None and watermark.refreshed_at >= datetime.utcnow() - timedelta(seconds=max_age):
+        return False
+    key = f'analytics:{int(time.time() // max_age)}'
+    if db.session.query(Job.id).filter(Job.dedupe_key == key).first() is not None:
+        return False
+    enqueue('analytics_refresh', {}, dedupe_key=key)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # Another worker's sweep got there first
+        return False
+    return True
+
+def prune_jobs(batch_size=5000):
+    """Delete jobs finished more than JOB_RETENTION_DAYS ago; returns how many"""
+    cutoff = datetime.utcnow() - timedelta(days=app.config['JOB_RETENTION_DAYS'])
+    pruned = 0
+    while True:
+        deleted = db.session.execute(
+            db.delete(Job).where(Job.id.in_(
+                db.select(Job.id).where(Job.state == 'done', Job.run_at < cutoff).limit(batch_size)
+            )).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        pruned += deleted
+        if deleted < batch_size:
+            return pruned
+
+def job_queue_stats():
+    """Jobs by state, how many are due now, and how long the oldest due job has waited (queue lag)"""
+    now = datetime.utcnow()
+    counts = dict(db.session.query(Job.state, db.func.count(Job.id)).filter(
+        Job.state.in_(('queued', 'leased', 'failed'))).group_by(Job.state))
+    due, oldest = db.session.query(db.func.count(Job.id), db.func.min(Job.run_at)).filter(
+        Job.state == 'queued', Job.run_at <= now).one()
+    return {'queued': counts.get('queued', 0), 'leased': counts.get('leased', 0),
+            'failed': counts.get('failed', 0), 'due': due,
+            'lag_seconds': (now - oldest).total_seconds() if oldest else 0.0}
+
+def run_job_workers(threads=4, once=False, batch_size=10, poll_seconds=1.0, sweep_seconds=60, report=None):
+    """Run jobs on `threads` threads until interrupted (or, with `once`, until
+    none are due); the calling thread sweeps for reminders and calls
+    `report(counts, seconds)` every sweep. Returns (counts, seconds)."""
+    counts, lock, stopping = Counter(), threading.Lock(), threading.Event()
+    idle = [0]  # Threads that found nothing due, for `once`
+
+    def work(number):
+        worker = f'{socket.gethostname()}:{os.getpid()}:{number}'
+        waiting = False
+        while not stopping.is_set():
+            try:
+                with app.app_context():
+                    jobs = claim_jobs(worker, batch_size)
+                    with lock:
+                        if waiting != (not jobs):
+                            idle[0] += -1 if jobs else 1
+                            waiting = not jobs
+                        if once and idle[0] == threads:
+                            stopping.set()
+                    outcomes = Counter(run_job(job, worker) for job in jobs)
+            except Exception as e:
+                print(f"Job worker error: {e}")
+                jobs, outcomes = [], ()
+                with lock:  # Idle as far as `once` goes, or a failing thread would keep it running
+                    if not waiting:
+                        idle[0] += 1
+                        waiting = True
+                    if once and idle[0] == threads:
+                        stopping.set()
+            with lock:
+                counts.update(outcomes)
+            if not jobs:
+                stopping.wait(poll_seconds)
+
+    started = time.perf_counter()
+    pool = [threading.Thread(target=work, args=(n,), name=f'job-worker-{n}', daemon=True) for n in range(threads)]
+    with app.app_context():
+        schedule_reminders()
+        schedule_analytics_refresh()
+    for thread in pool:
+        thread.start()
+    try:
+        while not stopping.wait(sweep_seconds):
+            with app.app_context():
+                schedule_reminders()
+                schedule_analytics_refresh()
+                prune_jobs()
+            if report is not None:
+                with lock:
+                    report(Counter(counts), time.perf_counter() - started)
+    except KeyboardInterrupt:
+        stopping.set()
+    for thread in pool:
+        thread.join()
+    return counts, time.perf_counter() - started
+
+# Synthetic data - a reproducible campus for demos and load tests, added through the models
+SYNTHETIC_FIRST_NAMES = ['Aarav', 'Priya', 'Rohan', 'Ananya', 'Vikram', 'Sneha', 'Arjun', 'Kavya', 'Rahul', 'Meera',
+                         'Aditya', 'Isha', 'Karan', 'Diya', 'Nikhil', 'Pooja', 'Sahil', 'Riya', 'Varun', 'Tanvi']
+SYNTHETIC_LAST_NAMES = ['Sharma', 'Patel', 'Gupta', 'Reddy', 'Iyer', 'Singh', 'Nair', 'Das', 'Mehta', 'Joshi',
+                        'Rao', 'Kulkarni', 'Bose', 'Menon', 'Chopra']
+SYNTHETIC_EVENTS = {
+    'technology': ['Hackathon', 'AI Workshop', 'Robotics Demo', 'Coding Contest', 'Cloud Bootcamp'],
+    'cultural': ['Music Night', 'Dance Battle', 'Drama Festival', 'Art Exhibition', 'Poetry Slam'],
+    'career': ['Career Fair', 'Resume Clinic', 'Mock Interviews', 'Alumni Talk', 'Startup Pitch'],
+    'sports': ['Cricket Match', 'Football League', 'Chess Open', 'Marathon', 'Yoga Session'],
+    'academic': ['Research Seminar', 'Guest Lecture', 'Quiz Bowl', 'Debate Final', 'Science Expo'],
+}
+SYNTHETIC_VENUES = ['Main Auditorium', 'Seminar Hall A', 'Seminar Hall B', 'Computer Lab 3', 'Sports Complex',
+                    'College Amphitheater', 'Library Hall', 'Open Air Theatre']
+
+def generate_data(users, events, registrations, logins, seed=1, chunk_size=5000):
+    """Add students, events, registrations and login history drawn from `seed`
+
+    Events spread over the 60 days before and 90 after today, and a few are far
+    more popular than the rest. Registrations past an event's capacity are
+    waitlisted in sign-up order, with the event counters to match. Every
+    student's password is 'password123'. Returns {table: rows added}.
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    password_hash = hash_password('password123')
+    admin = User.query.filter_by(role='admin').order_by(User.id).first()
+    first = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+
+    def add_in_chunks(rows):
+        for chunk in iter(lambda: list(islice(rows, chunk_size)), []):
+            db.session.add_all(chunk)
+            db.session.commit()
+
+    add_in_chunks(User(
+        username=f"{rng.choice(SYNTHETIC_FIRST_NAMES).lower()}.{rng.choice(SYNTHETIC_LAST_NAMES).lower()}{n}",
+        email=f'student{n}@college.edu', password_hash=password_hash,
+        full_name=f'{rng.choice(SYNTHETIC_FIRST_NAMES)} {rng.choice(SYNTHETIC_LAST_NAMES)}',
+        role='student', created_at=now - timedelta(days=rng.uniform(0, 365)),
+    ) for n in range(first, first + users))
+    student_ids = [user_id for (user_id,) in db.session.query(User.id).filter(User.id >= first, User.role == 'student')]
+
+    new_events = []
+    for _ in range(events):
+        category = rng.choice(list(SYNTHETIC_EVENTS))
+        title = rng.choice(SYNTHETIC_EVENTS[category])
+        event_date = now.date() + timedelta(days=rng.randint(-60, 90))
+        new_events.append(Event(
+            title=f'{title} {rng.randint(1, 99)}',
+            description=f'{title} for every {category} enthusiast on campus.',
+            event_date=event_date, event_time=datetime.strptime(rng.choice(['09:00', '10:00', '11:00', '14:00', '16:00', '18:00']), '%H:%M').time(),
+            venue=rng.choice(SYNTHETIC_VENUES), capacity=rng.choice([30, 50, 100, 200, 500]),
+            duration_minutes=rng.choice([60, 90, 120]),
+            category=category, created_by=admin.id if admin else student_ids[0],
+            created_at=day_start(event_date) - timedelta(days=rng.randint(7, 45)),
+        ))
+
+    # Plan every registration before inserting, so statuses and counters agree
+    pairs = {}
+    if new_events and student_ids:
+        popularity = [rank ** -0.5 for rank in range(1, len(new_events) + 1)]
+        rng.shuffle(popularity)
+        target = min(registrations, len(student_ids) * len(new_events))
+        while len(pairs) < target:
+            for index in rng.choices(range(len(new_events)), popularity, k=target - len(pairs)):
+                event = new_events[index]
+                opened = event.created_at
+                closed = min(datetime.combine(event.event_date, event.event_time), now)
+                signed_up = opened + (closed - opened) * rng.random() if closed > opened else opened
+                pairs.setdefault((rng.choice(student_ids), index), signed_up)
+    signups_by_event = defaultdict(list)
+    for (user_id, index), signed_up in pairs.items():
+        signups_by_event[index].append((signed_up, user_id))
+    for index, signups in signups_by_event.items():
+        signups.sort()
+        event = new_events[index]
+        event.registered_count = min(len(signups), event.capacity)
+        event.waitlist_count = len(signups) - event.registered_count
+    add_in_chunks(iter(new_events))
+
+    add_in_chunks(Registration(
+        user_id=user_id, event_id=new_events[index].id, registration_date=signed_up, updated_at=signed_up,
+        status='registered' if position < new_events[index].capacity else 'waitlisted',
+    ) for index, signups in signups_by_event.items() for position, (signed_up, user_id) in enumerate(signups))
+
+    def login_rows():
+        for _ in range(logins if student_ids else 0):
+            login_time = now - timedelta(minutes=rng.uniform(1, 30 * 24 * 60))
+            minutes = int(rng.expovariate(1 / 20)) + 1
+            logged_out = rng.random() < 0.8 and login_time + timedelta(minutes=minutes) < now
+            yield LoginActivity(
+                user_id=rng.choice(student_ids), login_time=login_time,
+                logout_time=login_time + timedelta(minutes=minutes) if logged_out else None,
+                session_duration=minutes if logged_out else None,
+                ip_address=f'10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}',
+                user_agent=rng.choice(['Mozilla/5.0 (Windows NT 10.0)', 'Mozilla/5.0 (Macintosh)',
+                                       'Mozilla/5.0 (iPhone)', 'Mozilla/5.0 (Linux; Android 14)']),
+            )
+    add_in_chunks(login_rows())
+    return {'users': len(student_ids), 'events': len(new_events), 'registrations': len(pairs),
+            'logins': logins if student_ids else 0}
+
+def upgrade_database():
+    """Bring a database created by an older version up to the current schema"""
+    inspector = db.inspect(db.engine)
+    event_columns = {col['name'] for col in inspector.get_columns('event')}
+    activity_columns = {col['name'] for col in inspector.get_columns('login_activity')}
+    registration_keys = [uc['column_names'] for uc in inspector.get_unique_constraints('registration')]
+    registration_keys += [ix['column_names'] for ix in inspector.get_indexes('registration') if ix['unique']]
+    event_indexes = {ix['name']: ix['column_names'] for ix in inspector.get_indexes('event')}
+
+    with db.engine.begin() as conn:
+        if ['user_id', 'event_id'] not in registration_keys:
+            # Keep the earliest registration of any duplicated pair
+            conn.execute(db.text(
+                "DELETE FROM registration WHERE id NOT IN "
+                "(SELECT MIN(id) FROM registration GROUP BY user_id, event_id)"
+            ))
+            conn.execute(db.text(
+                "CREATE UNIQUE INDEX uq_registration_user_event ON registration (user_id, event_id)"
+            ))
+            print("✅ Unique registration index added")
+
+        if 'registered_count' not in event_columns:
+            conn.execute(db.text(
+                "ALTER TABLE event ADD COLUMN registered_count INTEGER NOT NULL DEFAULT 0"
+            ))
+            conn.execute(db.text(
+                "UPDATE event SET registered_count = (SELECT COUNT(*) FROM registration "
+                "WHERE registration.event_id = event.id AND registration.status = 'registered')"
+            ))
+            print("✅ Event seat counters backfilled")
+
+        if 'session_key' not in activity_columns:
+            conn.execute(db.text("ALTER TABLE login_activity ADD COLUMN session_key VARCHAR(32)"))
+
+        if 'waitlist_count' not in event_columns:
+            conn.execute(db.text(
+                "ALTER TABLE event ADD COLUMN waitlist_count INTEGER NOT NULL DEFAULT 0"
+            ))
+            conn.execute(db.text(
+                "UPDATE event SET waitlist_count = (SELECT COUNT(*) FROM registration "
+                "WHERE registration.event_id = event.id AND registration.status = 'waitlisted')"
+            ))
+
+        if 'duration_minutes' not in event_columns:
+            conn.execute(db.text("ALTER TABLE event ADD COLUMN duration_minutes INTEGER NOT NULL DEFAULT 60"))
+
+        for table, column, backfill in (('event', 'updated_at', 'created_at'),
+                                        ('registration', 'updated_at', 'registration_date')):
+            if column not in {col['name'] for col in inspector.get_columns(table)}:
+                conn.execute(db.text(f"ALTER TABLE {table} ADD COLUMN {column} TIMESTAMP"))
+                conn.execute(db.text(f"UPDATE {table} SET {column} = {backfill}"))
+
+        # Superseded by ix_registration_event_status_date
+        conn.execute(db.text("DROP INDEX IF EXISTS ix_registration_event_status"))
+
+        # Rebuilt with status after venue, so the active-only overlap checks stay on it
+        schedule_columns = event_indexes.get('ix_event_venue_schedule')
+        if schedule_columns and schedule_columns != ['venue', 'status', 'event_date', 'event_time']:
+            conn.execute(db.text("DROP INDEX ix_event_venue_schedule"))
+
+    # Add any index declared on the models since the file was created
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    if db.session.query(StatCounter).first() is None:
+        rebuild_stats()
+
+    setup_event_search()
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recount the cached homepage and admin dashboard stats"""
+    rebuild_stats()
+    print("✅ Stats rebuilt")
+
+@app.cli.command('import-data')
+@click.argument('kind', type=click.Choice(['users', 'events', 'registrations']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--batch-size', default=1000, show_default=True, help='Rows per transaction.')
+@click.option('--rejects', 'rejects_path', help='Rejected rows file (default: PATH.rejects.jsonl).')
+@click.option('--created-by', type=int, help='Admin user id recorded on imported events.')
+def import_data_command(kind, path, fmt, batch_size, rejects_path, created_by):
+    """Bulk-load users, events or registrations from a CSV or JSONL file"""
+    print(f"📥 Importing {kind} from {path}...")
+    imported, rejected, elapsed = import_file(kind, path, fmt, batch_size, rejects_path, created_by)
+    rate = (imported + rejected) / elapsed if elapsed else 0
+    print(f"✅ {imported} {kind} imported, {rejected} rejected in {elapsed:.1f}s ({rate:.0f} rows/sec)")
+    if rejected:
+        print(f"⚠️ Rejected rows written to {rejects_path or path + '.rejects.jsonl'}")
+
+@app.cli.command('archive-logins')
+@click.option('--days', type=int, help='Keep this many days of raw login rows (default: LOGIN_RETENTION_DAYS).')
+@click.option('--archive-dir', help='Where the gzip archives go (default: LOGIN_ARCHIVE_DIR).')
+@click.option('--batch-size', default=5000, show_default=True, help='Rows deleted per transaction.')
+def archive_logins_command(days, archive_dir, batch_size):
+    """Roll login activity up by day and archive raw rows past the retention horizon"""
+    days = days if days is not None else app.config['LOGIN_RETENTION_DAYS']
+    archive_dir = archive_dir or app.config['LOGIN_ARCHIVE_DIR']
+    print(f"🗃️ Archiving login activity older than {days} days to {archive_dir}...")
+    started = time.perf_counter()
+    summary = archive_logins(days, archive_dir, batch_size)
+    print(f"✅ {summary.get('days_rolled_up', 0)} days rolled up, {summary.get('rows_archived', 0)} rows from "
+          f"{summary.get('days_archived', 0)} days archived in {time.perf_counter() - started:.1f}s "
+          f"(longest delete batch {summary.get('longest_batch_ms', 0)} ms)")
+
+@app.cli.command('refresh-analytics')
+@click.option('--full', is_flag=True, help='Rebuild every summary table from scratch.')
+def refresh_analytics_command(full):
+    """Update the admin analytics tables from rows changed since the last refresh"""
+    started = time.perf_counter()
+    kind = refresh_analytics(full=full)
+    print(f"✅ Analytics refreshed ({kind}) in {time.perf_counter() - started:.1f}s")
+
+@app.cli.command('check-schedule')
+@click.option('--from', 'first_day', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Only bookings from this day on (default: today).')
+@click.option('--all', 'everything', is_flag=True, help='Past bookings too.')
+def check_schedule_command(first_day, everything):
+    """Re-validate every active booking and list double-booked venues"""
+    first_day = None if everything else first_day.date() if first_day else date.today()
+    started = time.perf_counter()
+    clashes = 0
+    for venue, earlier, later in schedule_conflicts(first_day):
+        clashes += 1
+        print(f"⚠️ {venue}: #{earlier.id} {earlier.title} ({earlier.start:%Y-%m-%d %H:%M}-{earlier.end:%H:%M}) "
+              f"overlaps #{later.id} {later.title} ({later.start:%Y-%m-%d %H:%M}-{later.end:%H:%M})")
+    print(f"{'⚠️' if clashes else '✅'} {clashes} double bookings found in {time.perf_counter() - started:.1f}s")
+
+@app.cli.command('free-slots')
+@click.argument('venue')
+@click.option('--from', 'first_day', type=click.DateTime(formats=['%Y-%m-%d']), help='Default: today.')
+@click.option('--days', default=7, show_default=True)
+@click.option('--min-minutes', default=30, show_default=True, help='Shortest gap worth listing.')
+def free_slots_command(venue, first_day, days, min_minutes):
+    """List the times a venue is free within VENUE_HOURS"""
+    slots = free_slots(venue, first_day.date() if first_day else date.today(), days, min_minutes)
+    for start, end in slots:
+        print(f"🟢 {start:%a %Y-%m-%d} {start:%H:%M}-{end:%H:%M}")
+    if not slots:
+        print(f"❌ {venue} has no free slots of {min_minutes}+ minutes in that period")
+
+@app.cli.command('run-jobs')
+@click.option('--workers', default=4, show_default=True, help='Worker threads.')
+@click.option('--once', is_flag=True, help='Exit once no job is due, e.g. from cron.')
+@click.option('--batch-size', default=10, show_default=True, help='Jobs leased per claim.')
+@click.option('--report-seconds', default=60, show_default=True, help='Reminder sweep and progress report interval.')
+def run_jobs_command(workers, once, batch_size, report_seconds):
+    """Send queued notifications and event reminders"""
+    def report(counts, seconds):
+        stats = job_queue_stats()
+        print(f"⚙️ {sum(counts.values())} jobs ({sum(counts.values()) / seconds:.1f}/sec): {dict(counts)}; "
+              f"{stats['due']} due, lag {stats['lag_seconds']:.1f}s, {stats['failed']} failed")
+
+    print(f"⚙️ Running jobs on {workers} threads{' until none are due' if once else ' (Ctrl+C to stop)'}...")
+    counts, seconds = run_job_workers(workers, once, batch_size, sweep_seconds=report_seconds, report=report)
+    report(counts, seconds)
+
+@app.cli.command('generate-data')
+@click.option('--users', default=2000, show_default=True, help='Students to add.')
+@click.option('--events', default=200, show_default=True)
+@click.option('--registrations', default=20000, show_default=True)
+@click.option('--logins', default=20000, show_default=True)
+@click.option('--seed', default=1, show_default=True, help='Same seed, same data.')
+def generate_data_command(users, events, registrations, logins, seed):
+    """Add a synthetic campus's worth of users, events, registrations and logins"""
+    started = time.perf_counter()
+    added = generate_data(users, events, registrations, logins, seed=seed)
+    print(f"✅ Added {', '.join(f'{n} {table}' for table, n in added.items())} "
+          f"in {time.perf_counter() - started:.1f}s (password: password123)")
+
+@app.cli.command('compile-templates')
+def compile_templates_command():
+    """Compile every template into JINJA_CACHE_DIR (run at build time)"""
+    if not app.config['JINJA_CACHE_DIR']:
+        print("❌ JINJA_CACHE_DIR is empty, so there is nowhere to store compiled templates")
+        return
+    names = app.jinja_env.list_templates()
+    for name in names:
+        app.jinja_env.get_template(name)
+    print(f"✅ {len(names)} templates compiled into {app.config['JINJA_CACHE_DIR']}")
+
+@app.cli.command('bulk-registrations')
+@click.argument('action', type=click.Choice(['register', 'cancel']))
+@click.option('--events', 'event_ids', required=True, help='Comma-separated event ids.')
+@click.option('--users', 'user_ids', help='Comma-separated user ids.')
+@click.option('--file', 'path', type=click.Path(exists=True, dir_okay=False),
+              help='CSV with a user_id or username column.')
+@click.option('--no-waitlist', is_flag=True, help='Turn away students who get no seat instead of queueing them.')
+@click.option('--report', 'report_path', type=click.Path(dir_okay=False), help='Write a result per student here (CSV).')
+def bulk_registrations_command(action, event_ids, user_ids, path, no_waitlist, report_path):
+    """Register or cancel a whole list of students for one or more events"""
+    if bool(user_ids) == bool(path):
+        raise click.UsageError('Give exactly one of --users or --file.')
+    try:
+        event_ids = id_list(event_ids)
+        rows = ([row for _, row in read_import_rows(path, 'csv')] if path
+                else [{'user_id': user_id} for user_id in id_list(user_ids)])
+    except ValueError:
+        raise click.UsageError('Ids must be whole numbers.')
+    user_ids, problems = bulk_user_ids(rows)
+    print(f"📋 {action.title()}ing {len(user_ids)} students for {len(event_ids)} events...")
+    report = bulk_registrations(action, event_ids, user_ids, waitlist=not no_waitlist)
+    for row, problem in problems:
+        print(f"   ⚠️ {problem} {row}")
+    print(f"✅ {dict(report['summary'])}; event locks held {report['lock_ms']} ms")
+    if report_path:
+        with open(report_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['event_id', 'user_id', 'result'])
+            writer.writeheader()
+            writer.writerows(report['results'])
+        print(f"📝 Results written to {report_path}")
+
 def init_database():
     """Initialize database with fresh data"""
     with app.app_context():
         # Create all tables
         db.create_all()
+        upgrade_database()
         print("✅ Database tables created")
 
         # Create admin user
         admin_user = User.query.filter_by(username='admin').first()
         if not admin_user:
-            admin_password = generate_password_hash('admin123')
+            admin_password = hash_password('admin123')
             admin = User(
                 username='admin',
                 email='admin@college.edu',
@@ -560,3 +4396,7 @@ def init_database():
 port = int(os.environ.get("PORT", 5000))
 app.run(host="0.0.0.0", port=port)
 """
+
+if __name__ == '__main__':
+    seat_stream.start()  # A no-op unless SEAT_STREAM=1
+    app.run(host=os.environ.get('HOST', '127.0.0.1'), port=int(os.environ.get('PORT', 5000)))
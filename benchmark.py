@@ -0,0 +1,2086 @@
+#!/usr/bin/env python3
+"""
+📈 Benchmark Script - Measure hot paths against a throwaway database
+Usage: python benchmark.py registration --requests 500 --capacity 100
+       python benchmark.py query-plans --registrations 1000000
+       python benchmark.py search --sizes 10000,100000,1000000
+       python benchmark.py pagination --events 200000
+       python benchmark.py hashing --methods pbkdf2:sha256:600000,scrypt:32768:8:1
+       python benchmark.py logins --logins 2000 --workers 16
+       python benchmark.py waitlist --students 400 --capacity 50
+       python benchmark.py api-polling --requests 2000
+       python benchmark.py seat-stream --connections 2000
+       python benchmark.py instrumentation --requests 2000
+       python benchmark.py page-cache --requests 5000
+       python benchmark.py retention --logins 1000000 --days 365
+       python benchmark.py analytics --registrations 10000000
+       python benchmark.py load --requests 5000 --output load.json [--baseline previous.json]
+       python benchmark.py startup --runs 5
+       python benchmark.py sessions --requests 5000
+       python benchmark.py bulk-registration --students 10000 --capacity 6000
+       python benchmark.py scheduling --sizes 10000,100000
+       python benchmark.py calendar --students 2000 --per-student 20
+       python benchmark.py jobs --registrants 10000 --workers 1,4
+       python benchmark.py exports --rows 1000000
+       python benchmark.py engine [--postgres-url postgresql://localhost/college_events_bench]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, time as dtime
+from urllib.parse import urlsplit
+
+def use_scratch_database():
+    """Point the app at a fresh SQLite file (must run before importing app)"""
+    path = os.path.join(tempfile.mkdtemp(prefix='college-events-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{path}'
+    return path
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+def stand_in_templates(app, names):
+    """Serve minimal templates for pages whose real templates aren't in this checkout"""
+    from jinja2 import ChoiceLoader, DictLoader
+
+    body = '{% for event in events %}<li>{{ event.title }} {{ event.event_date }}</li>{% endfor %}'
+    app.jinja_loader = ChoiceLoader([app.jinja_loader, DictLoader({name: body for name in names})])
+
+def seed_students(count, start=0):
+    """Insert `count` students (numbered from `start`) in one statement and return their ids"""
+    from app import db, User
+    from werkzeug.security import generate_password_hash
+
+    password_hash = generate_password_hash('password123')
+    first_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    db.session.execute(db.insert(User), [
+        {
+            'username': f'student{i}',
+            'email': f'student{i}@college.edu',
+            'password_hash': password_hash,
+            'full_name': f'Student {i}',
+            'role': 'student',
+        }
+        for i in range(start, start + count)
+    ])
+    db.session.commit()
+    return [row[0] for row in db.session.query(User.id).filter(User.role == 'student', User.id >= first_id)]
+
+def bench_registration(args):
+    """Fire concurrent register_for_event POSTs at a single event"""
+    from app import app, db, User, Event, Registration
+
+    with app.app_context():
+        db.create_all()
+        admin = User(username='admin', email='admin@college.edu', password_hash='-',
+                     full_name='System Administrator', role='admin')
+        db.session.add(admin)
+        db.session.commit()
+        student_ids = seed_students(args.requests)
+        event = Event(title='Benchmark Night', event_date=date.today(), event_time=dtime(18, 0),
+                      venue='Main Auditorium', capacity=args.capacity, created_by=admin.id)
+        db.session.add(event)
+        db.session.commit()
+        event_id = event.id
+
+    def register(user_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        return client.post(f'/register_event/{event_id}').status_code
+
+    print(f"🏁 {args.requests} students racing for {args.capacity} seats ({args.workers} workers)")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        statuses = list(pool.map(register, student_ids))
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        seats = db.session.get(Event, event_id).registered_count
+        rows = Registration.query.filter_by(event_id=event_id, status='registered').count()
+
+    print(f"⏱️  {elapsed:.2f}s, {len(statuses) / elapsed:.1f} requests/sec")
+    print(f"📊 Responses: { {code: statuses.count(code) for code in set(statuses)} }")
+    print(f"🎟️  Registrations: {rows}, seat counter: {seats}, capacity: {args.capacity}")
+
+    expected = min(args.capacity, args.requests)
+    if rows == seats == expected:
+        print("✅ Capacity enforced exactly")
+        return 0
+    print("❌ Oversold or lost registrations")
+    return 1
+
+def insert_chunked(table, rows, chunk_size=50000):
+    """executemany `rows` (a generator of dicts) into `table` in chunks"""
+    from app import db
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            db.session.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+    db.session.commit()
+
+def seed_bulk(users, events, registrations, logins):
+    """Seed large tables quickly with Core executemany (ids start at 1, admin is user 1)"""
+    from app import User, Event, Registration, LoginActivity, rebuild_stats
+
+    today = date.today()
+    now = datetime.utcnow()
+    categories = ['technology', 'cultural', 'career', 'sports', 'academic']
+    per_user = min(events, registrations // users)
+
+    insert_chunked(User.__table__, ({
+        'username': 'admin' if i == 0 else f'student{i}',
+        'email': f'user{i}@college.edu',
+        'password_hash': '-',
+        'full_name': f'User {i}',
+        'role': 'admin' if i == 0 else 'student',
+        'is_active': True,
+        'created_at': now - timedelta(minutes=i),
+    } for i in range(users)))
+    insert_chunked(Event.__table__, ({
+        'title': f'Event {i}',
+        'description': 'Synthetic benchmark event',
+        # Half in the past, half upcoming
+        'event_date': today + timedelta(days=i - events // 2),
+        'event_time': dtime(10, 0),
+        'venue': f'Hall {i % 20}',
+        'capacity': 1000,
+        'category': categories[i % len(categories)],
+        'created_by': 1,
+        'status': 'active',
+        'created_at': now - timedelta(hours=i),
+        'registered_count': 0,
+    } for i in range(events)))
+    insert_chunked(Registration.__table__, ({
+        'user_id': u + 1,
+        'event_id': (u + j) % events + 1,
+        'registration_date': now,
+        'status': 'registered',
+    } for u in range(users) for j in range(per_user)))
+    insert_chunked(LoginActivity.__table__, ({
+        'user_id': i % users + 1,
+        'login_time': now - timedelta(minutes=i),
+        'ip_address': '127.0.0.1',
+        'user_agent': 'benchmark',
+    } for i in range(logins)))
+    # Core inserts bypass the session hooks that maintain the counters
+    rebuild_stats()
+
+def bench_query_plans(args):
+    """EXPLAIN every query the hot routes issue; fail on full table scans or
+    on a route running more queries than its budget"""
+    import app as app_module
+    from app import app, db, encode_cursor, invalidate_stats, event_search_available, principal_cache
+    from sqlalchemy import event as sa_event
+
+    app_module.page_cache = None  # Every scenario must reach the database
+    app.config['WAITLIST_ASYNC'] = False  # Count promotion queries against the cancelling route
+
+    users = max(2, args.registrations // 50)
+    with app.app_context():
+        db.create_all()
+        print(f"🌱 Seeding {users} users, {args.events} events, "
+              f"{args.registrations} registrations, {args.logins} logins...")
+        seed_bulk(users, args.events, args.registrations, args.logins)
+        event_search_available()  # One-off per process; keep it out of the budgets
+        engine = db.engine
+
+    captured = {}
+    query_counts = Counter()
+    route = None
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        query_counts[route] += 1
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            captured.setdefault(statement, (route, parameters))
+
+    # (method, url, logged-in user id, most queries the route may run)
+    scenarios = [
+        ('GET', '/', None, 2),
+        ('GET', '/events', None, 2),
+        ('GET', '/events?search=Event&category=technology&date=' + date.today().isoformat(), None, 2),
+        ('GET', '/events?cursor=' + encode_cursor([date.today(), 1]), None, 2),
+        ('GET', '/event/1', 2, 2),
+        ('POST', '/login', None, 1),
+        ('GET', '/dashboard', 2, 4),
+        ('POST', '/register_event/1', 2, 7),
+        ('POST', '/cancel_registration/1', 2, 8),
+        ('GET', '/admin', 1, 10),
+        ('GET', '/admin/users', 1, 3),
+        ('POST', '/create_event', 1, 5),
+        ('GET', '/admin/users?cursor=' + encode_cursor([datetime.utcnow(), users]), 1, 3),
+    ]
+    app.logger.disabled = True
+    sa_event.listen(engine, 'before_cursor_execute', capture)
+    for method, url, user_id, _ in scenarios:
+        route = f'{method} {url}'
+        invalidate_stats()  # Count the cold-cache worst case
+        principal_cache.discard(range(1, users + 1))
+        client = app.test_client()
+        if user_id:
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+        try:
+            client.open(url, method=method, data={
+                'username': 'student1', 'password': 'wrong',
+                'title': 'Plan check', 'venue': 'Plan Hall', 'capacity': '50',
+                'event_date': date.today().isoformat(), 'event_time': '10:00',
+            })
+        except Exception:
+            pass  # Templates may be missing; the queries already ran
+    sa_event.remove(engine, 'before_cursor_execute', capture)
+    app.logger.disabled = False
+
+    # stat_counter is a handful of rows read whole by design
+    tables = {name.strip('"') for name in db.metadata.tables} - {'stat_counter'}
+    failures = 0
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        for statement, (route, parameters) in captured.items():
+            plan = [row[3] for row in cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters)]
+            scans = [step for step in plan
+                     if step.startswith('SCAN ') and step.split()[1] in tables and 'USING' not in step]
+            failures += bool(scans)
+            print(f"{'❌' if scans else '✅'} {route}: {' | '.join(plan)}")
+            if scans:
+                print(f"   {' '.join(statement.split())}")
+    finally:
+        raw.close()
+
+    print(f"🔎 {len(captured)} queries checked, {failures} full table scans")
+
+    over_budget = 0
+    for method, url, _, budget in scenarios:
+        route = f'{method} {url}'
+        if query_counts[route] > budget:
+            over_budget += 1
+            print(f"❌ {route}: {query_counts[route]} queries, budget {budget}")
+    print(f"🧮 Queries per route: {dict(query_counts)}")
+    return 1 if failures or over_budget else 0
+
+SEARCH_WORDS = ['tech', 'robotics', 'coding', 'hackathon', 'music', 'dance', 'drama', 'art',
+                'career', 'placement', 'startup', 'cricket', 'football', 'chess', 'science',
+                'research', 'poetry', 'film', 'quiz', 'debate', 'photography', 'yoga', 'ai']
+SYLLABLES = ['ka', 'ro', 'mi', 'ten', 'vel', 'dor', 'si', 'lum', 'pra', 'zo', 'nex', 'tar']
+# Club and speaker names: thousands of words that each appear in few events
+RARE_WORDS = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+SEARCH_TERMS = {
+    'common': ['hackathon', 'robo', 'dance quiz'],
+    'rare': ['karoten', 'velnexzo', 'lumsi', 'pradorka tech'],
+}
+
+def synthetic_events(start, count, rng):
+    """Yield Event rows with searchable titles and descriptions"""
+    today = date.today()
+    categories = ['technology', 'cultural', 'career', 'sports', 'academic']
+    for i in range(start, start + count):
+        words = rng.sample(SEARCH_WORDS, 5)
+        club = rng.choice(RARE_WORDS)
+        yield {
+            'title': f"{club.title()} {words[0].title()} {words[1].title()} {i}",
+            'description': f"A session on {words[2]}, {words[3]} and {words[4]} hosted by the {club} club.",
+            'event_date': today + timedelta(days=i % 365),
+            'event_time': dtime(10, 0),
+            'venue': f'Hall {i % 40}',
+            'capacity': 100,
+            'category': categories[i % len(categories)],
+            'created_by': 1,
+            'status': 'active',
+            'created_at': datetime.utcnow(),
+            'registered_count': 0,
+        }
+
+def bench_search(args):
+    """Compare /events search latency: LIKE on title vs the FTS5 index"""
+    from app import app, db, Event, setup_event_search, apply_event_search
+
+    rng = random.Random(42)
+    sizes = sorted(int(size) for size in args.sizes.split(','))
+    with app.app_context():
+        db.create_all()
+        setup_event_search()
+        seeded = 0
+        for size in sizes:
+            print(f"🌱 Growing catalogue to {size} events...")
+            insert_chunked(Event.__table__, synthetic_events(seeded, size - seeded, rng))
+            seeded = size
+
+            for kind, terms in SEARCH_TERMS.items():
+                for label, use_fts in (('LIKE', False), ('FTS5', True)):
+                    timings = []
+                    for term in terms:
+                        for _ in range(args.repeat):
+                            started = time.perf_counter()
+                            query, rank = apply_event_search(Event.query.filter(Event.status == 'active'), term, use_fts)
+                            query.order_by(rank if rank is not None else Event.event_date).limit(50).all()
+                            timings.append((time.perf_counter() - started) * 1000)
+                    print(f"   {label:>4} {kind:>6} terms @ {size:>8} events: "
+                          f"median {statistics.median(timings):8.2f} ms, max {max(timings):8.2f} ms")
+    return 0
+
+def bench_pagination(args):
+    """Time deep pages of /events: keyset cursor vs LIMIT/OFFSET"""
+    from app import app, db, Event, event_list_query, keyset_page
+
+    rng = random.Random(7)
+    per_page = app.config['EVENTS_PER_PAGE']
+    with app.app_context():
+        db.create_all()
+        print(f"🌱 Seeding {args.events} events...")
+        insert_chunked(Event.__table__, synthetic_events(0, args.events, rng))
+
+        # Walk the whole list once by cursor, remembering where each page starts
+        started = time.perf_counter()
+        cursors, cursor = [None], None
+        while True:
+            query, keys = event_list_query()
+            _, cursor = keyset_page(query, keys, cursor, per_page)
+            if cursor is None:
+                break
+            cursors.append(cursor)
+        elapsed = time.perf_counter() - started
+        print(f"🚶 Walked {len(cursors)} pages in {elapsed:.2f}s "
+              f"({elapsed / len(cursors) * 1000:.2f} ms/page)")
+
+        for page in (0, len(cursors) // 10, len(cursors) // 2, len(cursors) - 1):
+            keyset_ms, offset_ms = [], []
+            for _ in range(args.repeat):
+                query, keys = event_list_query()
+                started = time.perf_counter()
+                keyset_page(query, keys, cursors[page], per_page)
+                keyset_ms.append((time.perf_counter() - started) * 1000)
+
+                query, keys = event_list_query()
+                started = time.perf_counter()
+                query.order_by(*keys).offset(page * per_page).limit(per_page + 1).all()
+                offset_ms.append((time.perf_counter() - started) * 1000)
+            print(f"   page {page + 1:>6}: keyset {statistics.median(keyset_ms):7.2f} ms, "
+                  f"offset {statistics.median(offset_ms):7.2f} ms")
+    return 0
+
+def bench_hashing(args):
+    """Hashes/sec (serial and process pool) and login latency per hash setting"""
+    from app import app, db, User, hash_password, hash_passwords, password_hash_pool
+
+    with app.app_context():
+        db.create_all()
+
+    workers = app.config['PASSWORD_HASH_WORKERS']
+    for number, method in enumerate(args.methods.split(',')):
+        app.config['PASSWORD_HASH_METHOD'] = method
+        passwords = [f'password{i}' for i in range(args.hashes)]
+
+        started = time.perf_counter()
+        hash_passwords(passwords)
+        serial_rate = args.hashes / (time.perf_counter() - started)
+
+        pool = password_hash_pool()
+        started = time.perf_counter()
+        hash_passwords(passwords, pool)
+        pooled_rate = args.hashes / (time.perf_counter() - started)
+        if pool is not None:
+            pool.shutdown()
+
+        with app.app_context():
+            username = f'hashbench{number}'
+            db.session.add(User(username=username, email=f'{username}@college.edu',
+                                password_hash=hash_password('password123'), full_name='Hash Bench'))
+            db.session.commit()
+
+        client = app.test_client()
+        latencies = []
+        for _ in range(args.logins):
+            started = time.perf_counter()
+            response = client.post('/login', data={'username': username, 'password': 'password123'})
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 302, response.status_code
+
+        print(f"🔐 {method}: {serial_rate:7.1f} hashes/sec serial, {pooled_rate:7.1f} with {workers} workers, "
+              f"login p50 {percentile(latencies, 50):7.1f} ms, p99 {percentile(latencies, 99):7.1f} ms")
+    return 0
+
+def bench_logins(args):
+    """Concurrent login/logout throughput with synchronous vs batched activity writes"""
+    from app import app, db, User, LoginActivity, audit_writer, hash_password
+
+    # A cheap hash keeps the measurement on the activity writes
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    with app.app_context():
+        db.create_all()
+        password_hash = hash_password('password123')
+        insert_chunked(User.__table__, ({
+            'username': f'student{i}', 'email': f'student{i}@college.edu', 'password_hash': password_hash,
+            'full_name': f'Student {i}', 'role': 'student', 'is_active': True,
+        } for i in range(args.workers)))
+
+    def login_logout(i):
+        client = app.test_client()
+        started = time.perf_counter()
+        client.post('/login', data={'username': f'student{i % args.workers}', 'password': 'password123'})
+        client.get('/logout')
+        return (time.perf_counter() - started) * 1000
+
+    for label, asynchronous in (('synchronous', False), ('batched', True)):
+        app.config['AUDIT_ASYNC'] = asynchronous
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            latencies = list(pool.map(login_logout, range(args.logins)))
+        elapsed = time.perf_counter() - started
+        audit_writer.stop()
+        print(f"🔑 {label:>11}: {args.logins / elapsed:7.1f} login+logout/sec, "
+              f"p50 {percentile(latencies, 50):6.1f} ms, p99 {percentile(latencies, 99):6.1f} ms")
+
+    with app.app_context():
+        rows = LoginActivity.query.count()
+        closed = LoginActivity.query.filter(LoginActivity.logout_time.isnot(None)).count()
+    print(f"📊 Writer: {audit_writer.stats()}")
+    print(f"🗄️ {rows} activity rows, {closed} with logout recorded (expected {2 * args.logins})")
+    return 0 if rows == closed == 2 * args.logins else 1
+
+def bench_mixed(args):
+    """Mixed read/write request throughput against whatever DATABASE_URL points at"""
+    from app import app, db, Registration
+
+    users, events = 2000, 200
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        seed_bulk(users, events, 0, 0)
+
+    def request_mix(k):
+        client = app.test_client()
+        started = time.perf_counter()
+        if k % 100 < args.write_percent:
+            # Each write is a distinct (user, event) pair, so every one should succeed
+            with client.session_transaction() as sess:
+                sess['user_id'] = k % (users - 1) + 2
+            client.post(f'/register_event/{k // (users - 1) % events + 1}')
+        else:
+            client.get('/api/v1/events')
+        return (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        latencies = list(pool.map(request_mix, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        attempted = sum(1 for k in range(args.requests) if k % 100 < args.write_percent)
+        failed = attempted - Registration.query.count()
+        print(json.dumps({
+            'database': db.engine.url.render_as_string(hide_password=True),
+            'requests_per_sec': round(args.requests / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'failed_writes': failed,
+        }))
+    return 0
+
+def bench_waitlist(args):
+    """Race joins, cancellations and promotions on one event, check the seat
+    invariants, then time promotion against growing waitlists"""
+    from app import (app, db, Event, Registration, StatCounter, promote_waitlist, rebuild_stats,
+                     waitlist_promoter)
+
+    with app.app_context():
+        db.create_all()
+        user_ids = seed_students(args.students)
+        event = Event(title='Waitlist Race', description='', event_date=date.today(), event_time=dtime(10),
+                      venue='Hall', capacity=args.capacity, category='technology', created_by=user_ids[0])
+        db.session.add(event)
+        db.session.commit()
+        event_id = event.id
+    app.logger.disabled = True  # Lock waits under the race trip the slow query log
+
+    def post(user_id, action):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        return client.post(f'/{action}/{event_id}').status_code
+
+    def seat_state():
+        with app.app_context():
+            counts = Counter(dict(db.session.query(Registration.status, db.func.count(Registration.id))
+                                  .filter(Registration.event_id == event_id).group_by(Registration.status)))
+            event = db.session.get(Event, event_id)
+            return counts, event.registered_count, event.waitlist_count
+
+    failures = 0
+
+    def check(label, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {label}")
+
+    # Everyone at once: the first `capacity` get seats, the rest queue
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(lambda user_id: post(user_id, 'register_event'), user_ids))
+    counts, registered, queued = seat_state()
+    check(f"joins: {counts['registered']} registered, {counts['waitlisted']} waitlisted",
+          counts['registered'] == registered == args.capacity and counts['waitlisted'] == queued
+          == args.students - args.capacity)
+
+    with app.app_context():
+        first_waitlisted = [user_id for (user_id,) in db.session.query(Registration.user_id).filter(
+            Registration.event_id == event_id, Registration.status == 'waitlisted'
+        ).order_by(Registration.registration_date, Registration.id)]
+        seated = [user_id for (user_id,) in db.session.query(Registration.user_id).filter(
+            Registration.event_id == event_id, Registration.status == 'registered')]
+
+    # Seated users cancel (some twice), queued users leave, latecomers join
+    # and the promoter runs, all at the same time
+    rng = random.Random(3)
+    cancelling = rng.sample(seated, len(seated) // 2)
+    leaving = rng.sample(first_waitlisted[len(first_waitlisted) // 2:], len(first_waitlisted) // 10)
+    with app.app_context():
+        latecomers = seed_students(args.students // 10, start=args.students)
+        rebuild_stats()  # seed_students bypasses the counters
+    actions = ([(u, 'cancel_registration') for u in cancelling + cancelling[:10] + leaving]
+               + [(u, 'register_event') for u in latecomers])
+    rng.shuffle(actions)
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        list(pool.map(lambda action: post(*action), actions))
+    waitlist_promoter.stop()
+    with app.app_context():
+        promote_waitlist(event_id)  # Whatever the last pass hadn't reached yet
+
+    counts, registered, queued = seat_state()
+    check(f"after races: {counts['registered']} registered, {counts['waitlisted']} waitlisted, "
+          f"{counts['cancelled']} cancelled",
+          counts['registered'] == registered == args.capacity and counts['waitlisted'] == queued
+          and counts['cancelled'] == len(cancelling) + len(leaving))
+    with app.app_context():
+        now_seated = {user_id for (user_id,) in db.session.query(Registration.user_id).filter(
+            Registration.event_id == event_id, Registration.status == 'registered')}
+    promoted = [user_id for user_id in first_waitlisted if user_id in now_seated]
+    expected = [user_id for user_id in first_waitlisted if user_id not in leaving][:len(promoted)]
+    check(f"FIFO: {len(promoted)} promoted, in queue order", promoted == expected)
+    with app.app_context():
+        before = dict(db.session.query(StatCounter.name, StatCounter.value))
+        rebuild_stats()
+        after = dict(db.session.query(StatCounter.name, StatCounter.value))
+    drift = {k: (before.get(k, 0), after.get(k, 0)) for k in before.keys() | after.keys()
+             if before.get(k, 0) != after.get(k, 0)}
+    check(f"stat counters match a full recount{f': {drift}' if drift else ''}", not drift)
+
+    # Promotion cost per freed seat as the queue grows
+    for size in [int(n) for n in args.sizes.split(',')]:
+        with app.app_context():
+            event = Event(title=f'Queue {size}', description='', event_date=date.today(), event_time=dtime(10),
+                          venue='Hall', capacity=0, category='technology', created_by=user_ids[0],
+                          waitlist_count=size)
+            db.session.add(event)
+            db.session.commit()
+            started = datetime.utcnow()
+            insert_chunked(Registration.__table__, ({
+                'user_id': 10_000_000 + i, 'event_id': event.id, 'status': 'waitlisted',
+                'registration_date': started + timedelta(microseconds=i),
+            } for i in range(size)))
+            timings = []
+            for _ in range(args.seats):
+                db.session.execute(db.update(Event).where(Event.id == event.id)
+                                   .values(capacity=Event.capacity + 1))
+                db.session.commit()
+                t = time.perf_counter()
+                promote_waitlist(event.id)
+                timings.append((time.perf_counter() - t) * 1000)
+            print(f"   waitlist {size:>8}: {statistics.median(timings):6.2f} ms per freed seat")
+    app.logger.disabled = False
+    return 1 if failures else 0
+
+def bench_api_polling(args):
+    """What a kiosk polling the event list costs: HTML page, full JSON, gzip, 304"""
+    import app as app_module
+    from app import app, db, Event
+
+    app_module.page_cache = None  # Compare against the uncached page
+    rng = random.Random(13)
+    with app.app_context():
+        db.create_all()
+        insert_chunked(Event.__table__, synthetic_events(0, args.events, rng))
+    stand_in_templates(app, ['events.html'])
+    client = app.test_client()
+    etag = client.get('/api/v1/events').headers['ETag']
+
+    scenarios = [
+        ('HTML /events', '/events', {}),
+        ('JSON', '/api/v1/events', {}),
+        ('JSON, gzip', '/api/v1/events', {'Accept-Encoding': 'gzip'}),
+        ('JSON, If-None-Match', '/api/v1/events', {'If-None-Match': etag}),
+    ]
+    for label, url, headers in scenarios:
+        size = len(client.get(url, headers=headers).data)
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            client.get(url, headers=headers)
+        elapsed = time.perf_counter() - started
+        print(f"📱 {label:<20} {args.requests / elapsed:8.1f} req/sec, "
+              f"{elapsed / args.requests * 1000:6.3f} ms/request, {size:>6} bytes")
+
+    failures = 0
+
+    def check(label, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {label}")
+
+    response = client.get('/api/v1/events', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    check("gzip;q=0 gets an uncompressed list", 'Content-Encoding' not in response.headers)
+    # A writer that waited for the lock commits after newer ones, with an older updated_at
+    with app.app_context():
+        event = db.session.get(Event, 1)
+        event.title, event.updated_at = 'Renamed while waiting', datetime(2000, 1, 1)
+        db.session.commit()
+    response = client.get('/api/v1/events', headers={'If-None-Match': etag})
+    check("a commit with an older updated_at still changes the list ETag", response.status_code == 200)
+    return 1 if failures else 0
+
+def rss_kb(field='VmRSS'):
+    """Resident memory of this process in KiB (Linux); RssAnon leaves out mapped
+    files such as SQLite's mmap of the database"""
+    with open('/proc/self/status') as status:
+        return next(int(line.split()[1]) for line in status if line.startswith(field + ':'))
+
+def bench_seat_stream(args):
+    """Hold many idle SSE subscribers, then time how fast registrations reach them"""
+    import threading
+    from app import app, db, Event, seat_stream
+
+    with app.app_context():
+        db.create_all()
+        student_ids = seed_students(args.registrations)
+        insert_chunked(Event.__table__, synthetic_events(0, args.events, random.Random(17)))
+        db.session.execute(db.update(Event).values(capacity=args.registrations, status='active'))
+        db.session.commit()
+    app.config.update(SEAT_STREAM=True, SEAT_STREAM_PORT=0)  # Any free port
+    seat_stream.start()
+
+    before_kb, before_threads = rss_kb(), threading.active_count()
+    clients = subprocess.Popen(
+        [sys.executable, __file__, 'seat-stream-clients', '--port', str(seat_stream.port),
+         '--connections', str(args.connections), '--events', str(args.events)],
+        stdout=subprocess.PIPE, text=True)
+    if clients.stdout.readline().strip() != 'ready':
+        print("❌ Subscribers failed to connect")
+        return 1
+    after_kb, after_threads = rss_kb(), threading.active_count()
+    print(f"🔌 {seat_stream.counts['connections']} subscribers: +{after_kb - before_kb} KiB RSS "
+          f"({(after_kb - before_kb) * 1024 / args.connections:.0f} bytes/connection), "
+          f"threads {before_threads} -> {after_threads}")
+
+    # Register one student at a time on the first few events
+    commits, taken = {}, Counter()
+    client = app.test_client()
+    for i, user_id in enumerate(student_ids):
+        event_id = i % args.hot_events + 1
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        client.post(f'/register_event/{event_id}')
+        taken[event_id] += 1
+        commits[f'{event_id}:{taken[event_id]}'] = time.time()
+        time.sleep(args.interval_ms / 1000)
+
+    received = json.loads(clients.stdout.readline())
+    clients.wait()
+    delays = [(received[key][1] - committed) * 1000 for key, committed in commits.items() if key in received]
+    # Updates inside one tick coalesce, so only the latest count of a burst may arrive
+    print(f"📨 {received['_messages']} messages delivered for {len(delays)}/{len(commits)} seat counts")
+    if delays:
+        print(f"⏱️  commit -> last subscriber: p50 {percentile(delays, 50):.1f} ms, "
+              f"p99 {percentile(delays, 99):.1f} ms")
+    return 0
+
+def seat_stream_clients(args):
+    """Child process for seat-stream: hold the connections, report what arrived"""
+    import asyncio
+
+    async def run():
+        latest, counts = {}, Counter()
+        connected = 0
+        last_message = time.monotonic()
+
+        async def subscribe(i):
+            nonlocal connected, last_message
+            reader, writer = await asyncio.open_connection('127.0.0.1', args.port)
+            writer.write(f'GET /events/{i % args.events + 1}/seats HTTP/1.1\r\nHost: bench\r\n\r\n'.encode())
+            await reader.readuntil(b'\r\n\r\n')
+            snapshot = True
+            while True:
+                block = await reader.readuntil(b'\n\n')
+                if not block.startswith(b'event: seats'):
+                    continue
+                if snapshot:
+                    connected += 1
+                    snapshot = False
+                    continue
+                seats = json.loads(block.split(b'data: ', 1)[1])
+                key = f"{seats['event_id']}:{seats['registered_count']}"
+                now = time.time()
+                first, _ = latest.get(key, (now, now))
+                latest[key] = (first, now)
+                counts['messages'] += 1
+                last_message = time.monotonic()
+
+        tasks = []
+        for start in range(0, args.connections, 200):
+            tasks += [asyncio.create_task(subscribe(i)) for i in range(start, min(start + 200, args.connections))]
+            await asyncio.sleep(0.05)
+        while connected < args.connections:
+            await asyncio.sleep(0.05)
+        print('ready', flush=True)
+        last_message = time.monotonic()
+        while time.monotonic() - last_message < args.idle:
+            await asyncio.sleep(0.1)
+        print(json.dumps({**latest, '_messages': counts['messages']}), flush=True)
+        for task in tasks:
+            task.cancel()
+
+    asyncio.run(run())
+    return 0
+
+def bench_instrumentation(args):
+    """/events latency with the /metrics instrumentation switched on vs off"""
+    import app as app_module
+    from app import app, db, Event, request_metrics
+
+    app_module.page_cache = None  # Time the full route, not cache hits
+    rng = random.Random(11)
+    with app.app_context():
+        db.create_all()
+        insert_chunked(Event.__table__, synthetic_events(0, args.events, rng))
+    stand_in_templates(app, ['events.html'])
+    client = app.test_client()
+
+    timings = {True: [], False: []}
+    for round_number in range(args.rounds * 2):
+        enabled = round_number % 2 == 0  # Interleave so drift hits both sides equally
+        app.config['METRICS_ENABLED'] = enabled
+        for _ in range(args.requests // args.rounds):
+            started = time.perf_counter()
+            client.get('/events')
+            timings[enabled].append((time.perf_counter() - started) * 1000)
+    app.config['METRICS_ENABLED'] = True
+
+    for enabled in (False, True):
+        values = timings[enabled]
+        print(f"⏱️  instrumentation {'on ' if enabled else 'off'}: p50 {percentile(values, 50):6.3f} ms, "
+              f"p99 {percentile(values, 99):6.3f} ms")
+    overhead = percentile(timings[True], 50) / percentile(timings[False], 50) - 1
+    print(f"📊 Median overhead: {overhead * 100:+.1f}%")
+
+    with app.app_context():  # The job gauges query the database
+        exported = request_metrics.render()
+    expected = f'http_request_duration_seconds_count{{route="/events"}} {len(timings[True])}'
+    print(f"{'✅' if expected in exported else '❌'} /metrics reports {len(timings[True])} /events requests")
+    for line in exported.splitlines():
+        if '"/events"' in line and '_bucket' not in line:
+            print(f"   {line}")
+    jobs = 'jobs{state="queued"}' in exported
+    print(f"{'✅' if jobs else '❌'} /metrics reports the job queue")
+    return 0 if expected in exported and jobs else 1
+
+def bench_page_cache(args):
+    """Anonymous browsing of /, /events and /event/<id> with each page cache backend"""
+    import app as app_module
+    from app import app, db, Event
+
+    rng = random.Random(5)
+    with app.app_context():
+        db.create_all()
+        insert_chunked(Event.__table__, synthetic_events(0, args.events, rng))
+    stand_in_templates(app, ['index.html', 'events.html', 'event_detail.html'])
+    urls = ['/', '/events'] + [f'/events?category={c}' for c in ('technology', 'cultural', 'sports')]
+    urls += [f'/event/{rng.randint(1, args.events)}' for _ in range(args.pages)]
+    plan = [rng.choice(urls) for _ in range(args.requests)]
+    client = app.test_client()
+
+    results = {}
+    for backend in ('off', 'memory', 'disk'):
+        app.config['PAGE_CACHE'] = backend
+        app.config['PAGE_CACHE_PATH'] = os.path.join(tempfile.mkdtemp(prefix='college-events-pages-'), 'pages.db')
+        app_module.page_cache = app_module.make_page_cache()
+        hits = 0
+        started = time.perf_counter()
+        for url in plan:
+            hits += client.get(url).headers.get('X-Page-Cache') == 'hit'
+        elapsed = time.perf_counter() - started
+        results[backend] = args.requests / elapsed
+        print(f"📄 cache {backend:<6} {results[backend]:8.1f} req/sec, {hits / args.requests:6.1%} hits")
+    print(f"🚀 Memory cache speed-up: {results['memory'] / results['off']:.1f}x, "
+          f"disk: {results['disk'] / results['off']:.1f}x")
+    return 0
+
+def bench_retention(args):
+    """Admin page and 30-day login history latency before and after archive-logins"""
+    import app as app_module
+    from app import app, db, LoginActivity, archive_logins, login_history, rebuild_stats
+
+    app_module.page_cache = None
+    app.logger.disabled = True  # The seeding executemany chunks trip the slow query log
+    with app.app_context():
+        db.create_all()
+        seed_bulk(args.users, 50, 0, 0)
+        now = datetime.utcnow()
+        # One login every `spacing` minutes going back args.days days, half with a logout
+        spacing = args.days * 24 * 60 / args.logins
+        insert_chunked(LoginActivity.__table__, ({
+            'user_id': i % args.users + 1,
+            'login_time': now - timedelta(minutes=i * spacing),
+            'ip_address': '127.0.0.1',
+            'user_agent': 'benchmark',
+            'session_duration': i % 90 if i % 2 else None,
+        } for i in range(args.logins)))
+        rebuild_stats()
+    app.logger.disabled = False
+    stand_in_templates(app, ['admin.html', 'admin_users.html'])
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+
+    def raw_history():
+        day = db.func.date(LoginActivity.login_time)
+        return db.session.query(day, db.func.count(), db.func.count(db.distinct(LoginActivity.user_id))).filter(
+            LoginActivity.login_time >= datetime.utcnow() - timedelta(days=30)).group_by(day).all()
+
+    def measure(label, history):
+        timings = {}
+        for name, run in (('/admin', lambda: client.get('/admin')),
+                          ('/admin/users', lambda: client.get('/admin/users')),
+                          ('30-day history', history)):
+            values = []
+            for _ in range(args.requests):
+                started = time.perf_counter()
+                with app.app_context():
+                    run()
+                values.append((time.perf_counter() - started) * 1000)
+            timings[name] = values
+            print(f"⏱️  {label:<7} {name:<15} p50 {percentile(values, 50):8.3f} ms, p99 {percentile(values, 99):8.3f} ms")
+        return timings
+
+    with app.app_context():
+        before_rows = db.session.query(db.func.count(LoginActivity.id)).scalar()
+    before = measure('before', raw_history)
+
+    archive_dir = tempfile.mkdtemp(prefix='college-events-logins-')
+    with app.app_context():
+        started = time.perf_counter()
+        summary = archive_logins(args.retention_days, archive_dir, args.batch_size)
+        elapsed = time.perf_counter() - started
+        after_rows = db.session.query(db.func.count(LoginActivity.id)).scalar()
+        totals_before = app_module.get_stats()
+        app_module.invalidate_stats()
+        rebuild_stats()
+        stats_kept = app_module.get_stats() == totals_before
+    archive_bytes = sum(os.path.getsize(os.path.join(archive_dir, f)) for f in os.listdir(archive_dir))
+    print(f"🗃️ Archived {summary.get('rows_archived', 0)} of {before_rows} rows from {summary.get('days_archived', 0)} "
+          f"days in {elapsed:.1f}s ({summary.get('rows_archived', 0) / elapsed:.0f} rows/sec), "
+          f"longest delete batch {summary.get('longest_batch_ms', 0)} ms, archives {archive_bytes / 1024:.0f} KiB")
+    after = measure('after', lambda: login_history(30))
+
+    for name in before:
+        print(f"🚀 {name:<15} p50 before/after: {percentile(before[name], 50) / percentile(after[name], 50):.1f}x")
+    checks = [
+        (f'{after_rows} raw rows left', after_rows == before_rows - summary.get('rows_archived', 0)),
+        ('rebuilt stats match the archived counters', stats_kept),
+    ]
+    for label, ok in checks:
+        print(f"{'✅' if ok else '❌'} {label}")
+    return 0 if all(ok for _, ok in checks) else 1
+
+def bench_analytics(args):
+    """Admin chart reads from the summary tables vs ad hoc queries, plus full and
+    incremental refresh times, against a year of synthetic registrations"""
+    from app import (app, db, Event, Registration, EventAnalytics, CategoryTermAnalytics, RegistrationDaily,
+                     academic_term, analytics_summary, join_event, refresh_analytics, term_columns)
+
+    app.logger.disabled = True  # Seeding, rebuilds and the ad hoc queries all trip the slow query log
+    events = max(10, args.registrations // 500)
+    users = max(1000, args.registrations // 20)
+    per_user = -(-args.registrations // users)
+    rng = random.Random(17)
+    with app.app_context():
+        db.create_all()
+        print(f"🌱 Seeding {users} users, {events} events, {args.registrations} registrations...")
+        seed_bulk(users, events, 0, 0)
+        now = datetime.utcnow()
+        insert_chunked(Registration.__table__, ({
+            'user_id': i // per_user + 1,
+            'event_id': (i // per_user * 7 + i % per_user * 131) % events + 1,
+            'registration_date': now - timedelta(minutes=rng.randrange(365 * 24 * 60)),
+            'updated_at': now - timedelta(days=1),
+            'status': 'cancelled' if i % 10 == 0 else 'registered',
+        } for i in range(args.registrations)))
+        db.session.execute(db.text(
+            "UPDATE event SET registered_count = (SELECT count(*) FROM registration r "
+            "WHERE r.event_id = event.id AND r.status = 'registered'), updated_at = :old"), {'old': now - timedelta(days=1)})
+        db.session.commit()
+
+        started = time.perf_counter()
+        refresh_analytics(full=True)
+        print(f"🔨 Full rebuild: {time.perf_counter() - started:.2f}s")
+
+    def ad_hoc():
+        """The same charts computed from the live tables"""
+        today = datetime.utcnow().date()
+        year, term = term_columns(Event.event_date)
+        day = db.func.date(Registration.registration_date)
+        db.session.query(day, Event.category, db.func.count()).join(Event, Event.id == Registration.event_id).filter(
+            Registration.registration_date >= datetime.combine(today - timedelta(days=29), dtime()),
+            Registration.status != 'cancelled').group_by(day, Event.category).all()
+        db.session.query(year, term, Event.category, db.func.count(), db.func.sum(Event.capacity),
+                         db.func.sum(Event.registered_count)).group_by(year, term, Event.category).all()
+        fill = db.cast(Event.registered_count, db.Float) / Event.capacity
+        this_term = db.session.query(Event.id, Event.title, fill).filter(
+            year == academic_term(today)[0], term == academic_term(today)[1])
+        this_term.order_by(fill.desc()).limit(10).all()
+        this_term.order_by(fill).limit(10).all()
+
+    for label, read in (('ad hoc', ad_hoc), ('summary tables', analytics_summary)):
+        timings = []
+        for _ in range(args.requests):
+            with app.app_context():
+                started = time.perf_counter()
+                read()
+                timings.append((time.perf_counter() - started) * 1000)
+        print(f"📊 {label:<15} p50 {percentile(timings, 50):8.3f} ms, p99 {percentile(timings, 99):8.3f} ms")
+
+    def snapshot():
+        return [sorted(tuple(getattr(row, c.name) for c in model.__table__.columns) for row in model.query)
+                for model in (EventAnalytics, CategoryTermAnalytics, RegistrationDaily)]
+
+    with app.app_context():
+        # Today's traffic: new sign-ups and some cancellations, through the ORM
+        taken = set(db.session.query(Registration.user_id, Registration.event_id).filter(Registration.user_id <= 50))
+        for i in range(args.changes):
+            user_id, event_id = rng.randint(1, 50), rng.randint(1, events)
+            if (user_id, event_id) not in taken:
+                taken.add((user_id, event_id))
+                db.session.add(Registration(user_id=user_id, event_id=event_id))
+                db.session.execute(db.update(Event).where(Event.id == event_id).values(
+                    registered_count=Event.registered_count + 1))
+        for registration in Registration.query.filter(Registration.user_id.in_((51, 52)),
+                                                      Registration.status == 'registered'):
+            registration.status = 'cancelled'
+            db.session.execute(db.update(Event).where(Event.id == registration.event_id).values(
+                registered_count=Event.registered_count - 1))
+        db.session.commit()
+        # ...and student 52 changes their mind, which moves each registration to today
+        for (event_id,) in db.session.query(Registration.event_id).filter(Registration.user_id == 52).all():
+            join_event(52, event_id)
+
+        started = time.perf_counter()
+        refresh_analytics()
+        print(f"⚡ Incremental refresh after {args.changes} changes: {(time.perf_counter() - started) * 1000:.1f} ms")
+        incremental = snapshot()
+        refresh_analytics(full=True)
+        matches = incremental == snapshot()
+    app.logger.disabled = False
+    print(f"{'✅' if matches else '❌'} Incremental refresh matches a full rebuild")
+    return 0 if matches else 1
+
+LOAD_MIX = 'browse=45,search=15,login=5,register=25,admin=10'
+
+def bench_load(args):
+    """Semester-start load: concurrent scenario mixes against generated data,
+    reported per route as JSON (compare runs with --baseline)"""
+    from app import app, db, User, Event, generate_data, hash_password
+
+    app.logger.disabled = True  # Slow query warnings would swamp the JSON report
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='admin', email='admin@college.edu', password_hash=hash_password('admin123'),
+                            full_name='System Administrator', role='admin'))
+        db.session.commit()
+        print(f"🌱 Generating {args.users} users, {args.events} events, {args.registrations} registrations, "
+              f"{args.logins} logins (seed {args.seed})...", file=sys.stderr)
+        generate_data(args.users, args.events, args.registrations, args.logins, seed=args.seed)
+        students = [row for row in db.session.query(User.id, User.username).filter(User.role == 'student')]
+        event_ids = [event_id for (event_id,) in db.session.query(Event.id)]
+    app.logger.disabled = False
+    stand_in_templates(app, ['index.html', 'events.html', 'event_detail.html', 'dashboard.html',
+                             'login.html', 'admin.html'])
+
+    mix = {name: int(weight) for name, weight in (part.split('=') for part in args.mix.split(','))}
+    rng = random.Random(args.seed)
+    plan = [(name, rng.random()) for name in rng.choices(list(mix), list(mix.values()), k=args.requests)]
+
+    def run(step):
+        name, draw = step
+        local = random.Random(draw)
+        client = app.test_client()
+        if name == 'browse':
+            route = local.choice(['/', '/events', '/event/<id>'])
+            method, url, user_id = 'GET', route.replace('<id>', str(local.choice(event_ids))), None
+        elif name == 'search':
+            route, method, user_id = '/events?search=', 'GET', None
+            url = f"/events?search={local.choice(['hackathon', 'music', 'career', 'cricket', 'seminar'])}"
+        elif name == 'login':
+            route, method, url, user_id = '/login', 'POST', '/login', None
+        elif name == 'register':
+            route, method, user_id = '/register_event/<id>', 'POST', local.choice(students).id
+            url = f'/register_event/{local.choice(event_ids)}'
+        else:
+            route, method, url, user_id = '/admin', 'GET', '/admin', 1
+        if user_id:
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+        data = {'username': local.choice(students).username, 'password': 'password123'} if name == 'login' else None
+        started = time.perf_counter()
+        try:
+            failed = client.open(url, method=method, data=data).status_code >= 500
+        except Exception:
+            failed = True
+        return f'{method} {route}', (time.perf_counter() - started) * 1000, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(run, plan))
+    elapsed = time.perf_counter() - started
+
+    by_route = {}
+    for route, latency, failed in results:
+        by_route.setdefault(route, ([], []))[failed].append(latency)
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    report = {
+        'commit': commit,
+        'config': {name: getattr(args, name) for name in
+                   ('requests', 'workers', 'mix', 'users', 'events', 'registrations', 'logins', 'seed')},
+        'elapsed_s': round(elapsed, 2),
+        'requests_per_sec': round(len(results) / elapsed, 1),
+        'routes': {route: {
+            'requests': len(ok) + len(failed),
+            'errors': len(failed),
+            'requests_per_sec': round((len(ok) + len(failed)) / elapsed, 1),
+            'p50_ms': round(percentile(ok, 50), 2) if ok else None,
+            'p95_ms': round(percentile(ok, 95), 2) if ok else None,
+            'p99_ms': round(percentile(ok, 99), 2) if ok else None,
+        } for route, (ok, failed) in sorted(by_route.items())},
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"📊 vs {baseline.get('commit') or args.baseline}:", file=sys.stderr)
+        for route, now in report['routes'].items():
+            before = baseline['routes'].get(route)
+            if before and before['p95_ms'] and now['p95_ms']:
+                print(f"   {route:<28} p95 {before['p95_ms']:8.2f} -> {now['p95_ms']:8.2f} ms "
+                      f"({now['p95_ms'] / before['p95_ms'] - 1:+.0%})", file=sys.stderr)
+    return 1 if any(route['errors'] for route in report['routes'].values()) else 0
+
+def bench_startup(args):
+    """Serverless cold starts: import time of api/index.py and first-request
+    latency through its handler, each run in a fresh process"""
+    from app import app, db, upgrade_database
+
+    with app.app_context():
+        db.create_all()
+        upgrade_database()
+        insert_chunked(db.metadata.tables['user'], [{
+            'username': 'admin', 'email': 'admin@college.edu', 'password_hash': '-',
+            'full_name': 'System Administrator', 'role': 'admin', 'is_active': True,
+        }])
+        insert_chunked(db.metadata.tables['event'], synthetic_events(0, args.events, random.Random(19)))
+
+    floor = statistics.median(float(subprocess.run(
+        [sys.executable, '-c', 'import time; t = time.perf_counter(); '
+         'import flask, flask_sqlalchemy, werkzeug.security; print(time.perf_counter() - t)'],
+        capture_output=True, text=True).stdout) for _ in range(args.runs))
+    print(f"📦 Flask + SQLAlchemy import alone: {floor * 1000:.0f} ms")
+
+    failed = False
+    for label, warm in (('no warm-up', '0'), ('warm-up', '1')):
+        cache_dir = tempfile.mkdtemp(prefix='college-events-jinja-')
+        runs = []
+        for _ in range(args.runs):
+            child = subprocess.run(
+                [sys.executable, __file__, 'startup-child', '--path', args.path],
+                env={**os.environ, 'WARM_UP': warm, 'WARM_UP_PATHS': args.path, 'JINJA_CACHE_DIR': cache_dir},
+                capture_output=True, text=True)
+            try:
+                runs.append(json.loads(child.stdout.strip().splitlines()[-1]))
+            except (IndexError, ValueError):
+                print(f"❌ {label}: startup failed\n{child.stderr[-2000:]}")
+                failed = True
+                break
+        if not runs:
+            continue
+        median = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+        print(f"🧊 {label:<10} import {median['import_ms']:6.1f} ms, first request {median['first_ms']:6.1f} ms, "
+              f"second {median['second_ms']:5.1f} ms | first template: compiled {runs[0]['template_ms']:5.1f} ms, "
+              f"from cache {statistics.median(run['template_ms'] for run in runs[1:]) if len(runs) > 1 else 0:5.1f} ms")
+    return 1 if failed else 0
+
+def startup_child(args):
+    """Child process for startup: import the entry point and time its first requests"""
+    from werkzeug.test import EnvironBuilder
+
+    started = time.perf_counter()
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import api.index as entry
+    imported = time.perf_counter()
+
+    class Request:
+        def __init__(self, path):
+            self.environ = EnvironBuilder(path=path).get_environ()
+
+    def call(path):
+        started = time.perf_counter()
+        b''.join(entry.handler(Request(path)))
+        return (time.perf_counter() - started) * 1000
+
+    first, second = call(args.path), call(args.path)
+    # A template the warm-up didn't touch: compiled here, or loaded from the bytecode cache
+    body = '{% for event in events %}<li>{{ event.title }} {{ event.event_date }}</li>{% endfor %}' * 50
+    from jinja2 import ChoiceLoader, DictLoader
+    entry.app.jinja_loader = ChoiceLoader([entry.app.jinja_loader, DictLoader({'startup.html': body})])
+    template_started = time.perf_counter()
+    entry.app.jinja_env.get_template('startup.html')
+    template_ms = (time.perf_counter() - template_started) * 1000
+    print(json.dumps({'import_ms': (imported - started) * 1000, 'first_ms': first, 'second_ms': second,
+                      'template_ms': template_ms}))
+    return 0
+
+def bench_sessions(args):
+    """Auth-check cost per request for each session backend, with and without the
+    principal cache, and how long a deactivation takes to reach another worker"""
+    from flask.sessions import SecureCookieSessionInterface
+    from app import app, db, User, SessionStore, principal_cache
+
+    with app.app_context():
+        db.create_all()
+        seed_bulk(args.users, 10, 0, 0)
+    stand_in_templates(app, ['login.html', 'admin_users.html'])
+    stores = {
+        'cookie': SecureCookieSessionInterface(),
+        'sqlite': SessionStore(os.path.join(tempfile.mkdtemp(prefix='college-events-sessions-'), 'sessions.db'), 300),
+    }
+
+    for store, ttl in (('cookie', 0), ('cookie', 30), ('sqlite', 0), ('sqlite', 30)):
+        app.session_interface = stores[store]
+        principal_cache.ttl = ttl
+        principal_cache.discard(range(1, args.users + 1))
+        timings, lookups = [], 0
+        for route, users in (('/api/v1/me/registrations', range(2, args.users + 1)), ('/admin/users', [1])):
+            clients = []
+            for user_id in list(users)[:args.sessions]:
+                client = app.test_client()
+                with client.session_transaction() as sess:
+                    sess['user_id'] = user_id
+                clients.append(client)
+            for client in clients:  # One untimed round first
+                client.get(route)
+            misses = principal_cache.counts['misses']
+            for i in range(args.requests):
+                started = time.perf_counter()
+                clients[i % len(clients)].get(route)
+                timings.append((time.perf_counter() - started) * 1000)
+            lookups += principal_cache.counts['misses'] - misses
+        print(f"🔐 {store:<6} sessions, principal cache {'on ' if ttl else 'off'}: p50 {percentile(timings, 50):6.3f} ms, "
+              f"p99 {percentile(timings, 99):6.3f} ms, {lookups / len(timings):.2f} user lookups/request")
+
+    # Another worker deactivates the admin: this process only learns of it when the entry expires
+    principal_cache.ttl = args.ttl
+    principal_cache.discard([1])
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = 1
+    client.get('/admin/users')
+    with app.app_context():
+        db.session.execute(db.update(User).where(User.id == 1).values(is_active=False))
+        db.session.commit()
+    started = time.perf_counter()
+    while client.get('/admin/users').status_code == 200:
+        time.sleep(0.05)
+    revoked_after = time.perf_counter() - started
+    ok = revoked_after <= args.ttl + 0.5
+    print(f"{'✅' if ok else '❌'} Deactivation took effect after {revoked_after:.2f}s (PRINCIPAL_CACHE_TTL {args.ttl}s)")
+    return 0 if ok else 1
+
+def bench_bulk_registration(args):
+    """Register and cancel a whole class through the admin endpoint while students
+    sign themselves up, check the seat invariants, and compare with one POST each"""
+    from app import app, db, Event, Registration, StatCounter, User, promote_waitlist, rebuild_stats, waitlist_promoter
+
+    with app.app_context():
+        db.create_all()
+        user_ids = seed_students(args.students)
+        admin = User(username='bulk_admin', email='bulk_admin@college.edu', password_hash='x',
+                     full_name='Bulk Admin', role='admin')
+        db.session.add(admin)
+        event = Event(title='Orientation', description='', event_date=date.today(), event_time=dtime(10),
+                      venue='Main Hall', capacity=args.capacity, category='academic', created_by=user_ids[0])
+        db.session.add(event)
+        db.session.commit()
+        admin_id, event_id = admin.id, event.id
+        # Some students already hold a place, and some cancelled one earlier
+        rng = random.Random(5)
+        held = rng.sample(user_ids, len(user_ids) // 20)
+        dropped = rng.sample(sorted(set(user_ids) - set(held)), len(user_ids) // 50)
+        db.session.execute(db.insert(Registration), [
+            {'user_id': user_id, 'event_id': event_id, 'status': 'registered'} for user_id in held
+        ] + [{'user_id': user_id, 'event_id': event_id, 'status': 'cancelled'} for user_id in dropped])
+        db.session.execute(db.update(Event).where(Event.id == event_id).values(registered_count=len(held)))
+        db.session.commit()
+        rebuild_stats()
+    app.logger.disabled = True  # Lock waits under the race trip the slow query log
+
+    def client_for(user_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        return client
+
+    def seat_state():
+        with app.app_context():
+            counts = Counter(dict(db.session.query(Registration.status, db.func.count(Registration.id))
+                                  .filter(Registration.event_id == event_id).group_by(Registration.status)))
+            event = db.session.get(Event, event_id)
+            return counts, event.registered_count, event.waitlist_count
+
+    failures = 0
+
+    def check(label, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {label}")
+
+    # The whole class (plus a few bogus ids) in one request, while the last
+    # students on the list register themselves
+    admin_client = client_for(admin_id)
+    self_service = user_ids[-args.racers:]
+    roster = user_ids + [10_000_000 + i for i in range(10)]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        racing = pool.map(lambda user_id: client_for(user_id).post(f'/register_event/{event_id}').status_code,
+                          self_service)
+        started = time.perf_counter()
+        response = admin_client.post('/api/v1/admin/registrations/bulk', json={
+            'action': 'register', 'event_ids': [event_id], 'user_ids': roster})
+        elapsed = (time.perf_counter() - started) * 1000
+        list(racing)
+    report = response.get_json()
+    results = {row['user_id']: row['result'] for row in report['results']}
+    print(f"📋 bulk register {len(roster)} ids: {elapsed:.0f} ms, event locked "
+          f"{report['lock_ms'][str(event_id)]:.1f} ms; {report['summary']}")
+    counts, registered, queued = seat_state()
+    check(f"{counts['registered']} registered, {counts['waitlisted']} waitlisted",
+          counts['registered'] == registered == min(args.capacity, args.students)
+          and counts['waitlisted'] == queued == args.students - registered)
+    check("one result per id, held places reported as already registered",
+          len(results) == len(roster) and all(results[u] == 'already registered' for u in held)
+          and all(results[u] == 'unknown user' for u in roster[-10:]))
+    check("self-registrations during the batch kept their place",
+          all(results[u].startswith('already') or results[u] in ('registered', 'waitlisted')
+              for u in self_service))
+
+    # Cancel half the class; freed seats go to the waitlist in order
+    leaving = user_ids[::2]
+    started = time.perf_counter()
+    response = admin_client.post('/api/v1/admin/registrations/bulk', json={
+        'action': 'cancel', 'event_ids': [event_id], 'user_ids': leaving})
+    elapsed = (time.perf_counter() - started) * 1000
+    report = response.get_json()
+    print(f"📋 bulk cancel {len(leaving)} ids: {elapsed:.0f} ms, event locked "
+          f"{report['lock_ms'][str(event_id)]:.1f} ms; {report['summary']}")
+    waitlist_promoter.stop()
+    with app.app_context():
+        promote_waitlist(event_id)
+    counts, registered, queued = seat_state()
+    check(f"after cancel: {counts['registered']} registered, {counts['waitlisted']} waitlisted",
+          counts['registered'] == registered == min(args.capacity, args.students - len(leaving))
+          and counts['waitlisted'] == queued)
+    with app.app_context():
+        before = dict(db.session.query(StatCounter.name, StatCounter.value))
+        rebuild_stats()
+        after = dict(db.session.query(StatCounter.name, StatCounter.value))
+    drift = {k: (before.get(k, 0), after.get(k, 0)) for k in before.keys() | after.keys()
+             if before.get(k, 0) != after.get(k, 0)}
+    check(f"stat counters match a full recount{f': {drift}' if drift else ''}", not drift)
+
+    # The same sign-up done the old way, one POST per student
+    with app.app_context():
+        event = Event(title='Orientation (one by one)', description='', event_date=date.today(),
+                      event_time=dtime(10), venue='Main Hall', capacity=args.capacity, category='academic',
+                      created_by=user_ids[0])
+        db.session.add(event)
+        db.session.commit()
+        single_id = event.id
+    sample = user_ids[:args.baseline]
+    started = time.perf_counter()
+    for user_id in sample:
+        client_for(user_id).post(f'/register_event/{single_id}')
+    per_post = (time.perf_counter() - started) * 1000 / len(sample)
+    print(f"🐢 one POST per student: {per_post:.1f} ms each, ~{per_post * len(roster) / 1000:.1f} s "
+          f"for {len(roster)} ids")
+    app.logger.disabled = False
+    return 1 if failures else 0
+
+def bench_scheduling(args):
+    """Venue conflict checks and free-slot lookups at growing catalogue sizes,
+    against checking every event; then re-validate the whole schedule"""
+    import app as app_module
+    from app import (app, db, Event, find_conflicts, free_slots, schedule_conflicts, event_span,
+                     venue_bookings)
+
+    app_module.page_cache = None
+    stand_in_templates(app, ['create_event.html'])
+    rng = random.Random(11)
+    today = date.today()
+    venues = [f'Hall {i}' for i in range(args.venues)]
+    starts = [dtime(hour, minute) for hour in range(8, 21) for minute in (0, 30)]
+
+    def bookings(count):
+        for _ in range(count):
+            yield {
+                'title': 'Booking', 'description': '', 'venue': rng.choice(venues),
+                'event_date': today + timedelta(days=rng.randrange(args.days)),
+                'event_time': rng.choice(starts), 'duration_minutes': rng.choice([60, 90, 120, 180]),
+                'capacity': 100, 'category': 'academic', 'created_by': 1, 'status': 'active',
+                'created_at': datetime.utcnow(), 'registered_count': 0,
+            }
+
+    def probe():
+        return (rng.choice(venues), today + timedelta(days=rng.randrange(args.days)), rng.choice(starts),
+                rng.choice([60, 90, 120]))
+
+    def naive_conflicts(venue, event_date, event_time, minutes):
+        # What a check without the index amounts to: every event, compared in Python
+        start, end = event_span(event_date, event_time, minutes)
+        clashes = []
+        for event_id, other, day, at, length in db.session.query(
+                Event.id, Event.venue, Event.event_date, Event.event_time, Event.duration_minutes).filter(
+                Event.status == 'active'):
+            other_start, other_end = event_span(day, at, length)
+            if other == venue and other_start < end and start < other_end:
+                clashes.append(event_id)
+        return clashes
+
+    app.logger.disabled = True  # Seeding and the full pass trip the slow query log
+    with app.app_context():
+        db.create_all()
+        seed_students(1)
+        seeded = 0
+        for size in [int(n) for n in args.sizes.split(',')]:
+            insert_chunked(Event.__table__, bookings(size - seeded))
+            seeded = size
+            timings = []
+            for _ in range(args.probes):
+                t = time.perf_counter()
+                find_conflicts(*probe())
+                timings.append((time.perf_counter() - t) * 1000)
+            naive = []
+            for _ in range(max(1, args.probes // 100)):
+                t = time.perf_counter()
+                naive_conflicts(*probe())
+                naive.append((time.perf_counter() - t) * 1000)
+            slots = []
+            for _ in range(args.probes // 10):
+                t = time.perf_counter()
+                free_slots(rng.choice(venues), today + timedelta(days=rng.randrange(args.days - 7)))
+                slots.append((time.perf_counter() - t) * 1000)
+            print(f"   {size:>8} events: conflict check p50 {statistics.median(timings):.2f} ms "
+                  f"p99 {percentile(timings, 99):.2f} ms | every event {statistics.median(naive):.0f} ms | "
+                  f"week of free slots p50 {statistics.median(slots):.2f} ms")
+
+        # The venue_bookings query behind every conflict check must range over the schedule index
+        plan = [row[3] for row in db.session.execute(db.text('EXPLAIN QUERY PLAN ' + str(
+            db.session.query(Event.id).filter(Event.venue == 'Hall 1', Event.event_date.between(today, today),
+                                              Event.status == 'active')
+            .order_by(Event.event_date, Event.event_time).statement.compile(
+                compile_kwargs={'literal_binds': True}))))]
+        planned = any('ix_event_venue_schedule' in step for step in plan)
+        print(f"{'✅' if planned else '❌'} conflict query plan: {' | '.join(plan)}")
+
+        # The whole schedule re-validated in one pass, checked against a per-day brute force
+        t = time.perf_counter()
+        found = {(earlier.id, later.id) for _, earlier, later in schedule_conflicts()}
+        elapsed = time.perf_counter() - t
+        by_day = {}
+        for event_id, venue, day, at, length in db.session.query(
+                Event.id, Event.venue, Event.event_date, Event.event_time, Event.duration_minutes):
+            by_day.setdefault((venue, day), []).append((*event_span(day, at, length), event_id))
+        expected = set()
+        for (venue, day), todays in by_day.items():
+            for start, end, event_id in todays:
+                for other_start, other_end, other_id in todays + by_day.get((venue, day - timedelta(days=1)), []):
+                    if other_id != event_id and other_start < end and start < other_end \
+                            and (other_start, other_id) < (start, event_id):
+                        expected.add((other_id, event_id))
+        ok = found == expected
+        print(f"{'✅' if ok else '❌'} check-schedule: {len(found)} double bookings among {seeded} events "
+              f"in {elapsed:.2f} s{'' if ok else f', brute force found {len(expected)}'}")
+
+        # Through the form: a clash is refused, a free slot is booked
+        venue, first_day = venues[0], today + timedelta(days=3)
+        slot_start, _ = free_slots(venue, first_day, days=1, min_minutes=60)[0]
+        busy = venue_bookings(venue, first_day, first_day)
+    admin = app.test_client()
+    with admin.session_transaction() as sess:
+        sess['user_id'] = 1
+    with app.app_context():
+        db.session.execute(db.update(app_module.User).values(role='admin'))
+        db.session.commit()
+        before = db.session.query(db.func.count(Event.id)).scalar()
+    form = {'title': 'Guest lecture', 'venue': venue, 'capacity': '80', 'event_date': first_day.isoformat(),
+            'duration': '60'}
+    if busy:
+        admin.post('/create_event', data={**form, 'event_time': f'{busy[-1].start:%H:%M}'})
+    booked = admin.post('/create_event', data={**form, 'event_time': f'{slot_start:%H:%M}'})
+    with app.app_context():
+        after = db.session.query(db.func.count(Event.id)).scalar()
+    app.logger.disabled = False
+    checked = bool(busy) and after == before + 1 and booked.status_code == 302
+    print(f"{'✅' if checked else '❌'} create_event refuses a clash and books a free slot")
+    return 0 if ok and checked and planned else 1
+
+def bench_calendar(args):
+    """Calendar polling cost per path (generate, page cache hit, 304), feed
+    invalidation on registration and event changes, and clash checks"""
+    import app as app_module
+    from app import app, db, Event, Registration, calendar_url, ics_event, promote_waitlist, waitlist_promoter
+    from sqlalchemy import event as sa_event
+
+    app.config['WAITLIST_ASYNC'] = False
+    app.logger.disabled = True
+    rng = random.Random(13)
+    today = date.today()
+    with app.app_context():
+        db.create_all()
+        user_ids = seed_students(args.students)
+        insert_chunked(Event.__table__, ({
+            'title': f'Workshop {i}, part {i % 3 + 1}', 'description': 'Bring a laptop; notes are shared later.',
+            'venue': f'Room {i % 50}', 'event_date': today + timedelta(days=i % 120), 'event_time': dtime(8 + i % 10),
+            'duration_minutes': 90, 'capacity': 500, 'category': 'academic', 'created_by': user_ids[0],
+            'status': 'active', 'created_at': datetime.utcnow(), 'registered_count': 0,
+        } for i in range(args.events)))
+        insert_chunked(Registration.__table__, ({
+            'user_id': user_id, 'event_id': event_id, 'status': 'registered', 'registration_date': datetime.utcnow(),
+        } for user_id in user_ids for event_id in rng.sample(range(1, args.events + 1), args.per_student)))
+        with app.test_request_context(base_url='http://campus.example'):
+            feeds = {user_id: urlsplit(calendar_url(user_id)).path for user_id in user_ids}
+
+    queries = 0
+
+    def count(*_):
+        nonlocal queries
+        queries += 1
+
+    with app.app_context():
+        engine = db.engine
+    sa_event.listen(engine, 'before_cursor_execute', count)
+    client = app.test_client()
+
+    def poll(label, user_sample, headers=None):
+        nonlocal queries
+        queries, timings, statuses = 0, [], Counter()
+        for user_id in user_sample:
+            t = time.perf_counter()
+            response = client.get(feeds[user_id], headers=headers(user_id) if headers else None)
+            timings.append((time.perf_counter() - t) * 1000)
+            statuses[response.status_code] += 1
+        print(f"   {label:<32} p50 {statistics.median(timings):6.3f} ms  p99 {percentile(timings, 99):6.3f} ms  "
+              f"{queries / len(user_sample):.1f} queries/poll  {dict(statuses)}")
+        return timings
+
+    sample = rng.sample(user_ids, min(args.polls, len(user_ids)))
+    print(f"📅 {args.per_student} events per feed, {len(sample)} feeds polled per path")
+    cache = app_module.page_cache
+    app_module.page_cache = None
+    ics_event.cache_clear()
+    poll('generated, cold (no page cache)', sample)
+    poll('generated, VEVENTs reused', sample)
+    app_module.page_cache = cache
+    poll('page cache miss', sample)
+    poll('page cache hit', sample)
+    etags = {user_id: client.get(feeds[user_id]).headers['ETag'] for user_id in sample}
+    poll('If-None-Match (304)', sample, lambda user_id: {'If-None-Match': etags[user_id]})
+    sa_event.remove(engine, 'before_cursor_execute', count)
+
+    failures = 0
+
+    def check(label, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {label}")
+
+    body = client.get(feeds[sample[0]]).data
+    lines = body.split(b'\r\n')
+    check("feed is CRLF-delimited with lines of at most 75 octets",
+          body.endswith(b'END:VCALENDAR\r\n') and all(len(line) <= 75 for line in lines)
+          and body.count(b'BEGIN:VEVENT') == args.per_student)
+
+    # Changes reach the feed; changes to other students' events don't drop it
+    student, other = sample[0], sample[1]
+
+    def uids(user_id):
+        return set(re.findall(rb'UID:event-(\d+)@', client.get(feeds[user_id]).data))
+
+    def cache_state(user_id):
+        return client.get(feeds[user_id]).headers.get('X-Page-Cache')
+
+    with app.app_context():
+        mine = {event_id for (event_id,) in db.session.query(Registration.event_id).filter(
+            Registration.user_id == student)}
+        theirs = {event_id for (event_id,) in db.session.query(Registration.event_id).filter(
+            Registration.user_id == other)}
+        new_event = next(e for e in range(1, args.events + 1) if e not in mine and e not in theirs)
+        full = Event(title='Full talk', description='', venue='Room 99', event_date=today + timedelta(days=200),
+                     event_time=dtime(9), capacity=1, category='academic', created_by=user_ids[0])
+        db.session.add(full)
+        db.session.commit()
+        full_id = full.id
+    uids(student), uids(other)
+    as_student = app.test_client()
+    with as_student.session_transaction() as sess:
+        sess['user_id'] = student
+    as_student.post(f'/register_event/{new_event}')
+    check("registering adds the event to the student's feed", str(new_event).encode() in uids(student))
+    check("...without dropping another student's cached feed", cache_state(other) == 'hit')
+
+    with app.app_context():
+        event = db.session.get(Event, next(iter(theirs)))
+        event.title = 'Moved workshop'
+        db.session.commit()
+    check("editing an event refreshes the feeds showing it", b'Moved workshop' in client.get(feeds[other]).data)
+
+    as_other = app.test_client()
+    with as_other.session_transaction() as sess:
+        sess['user_id'] = other
+    as_other.post(f'/register_event/{full_id}')
+    as_student.post(f'/register_event/{full_id}')  # Waitlisted: not in the feed yet
+    before = uids(student)
+    as_other.post(f'/cancel_registration/{full_id}')
+    waitlist_promoter.stop()
+    with app.app_context():
+        promote_waitlist(full_id)
+    check("a waitlist promotion adds the event to the feed",
+          str(full_id).encode() not in before and str(full_id).encode() in uids(student))
+
+    # Clash checks use the same start times and durations
+    with app.app_context():
+        booked = db.session.query(Event).filter(Event.id == new_event).one()
+        clash = Event(title='Overlapping seminar', description='', venue='Room 98', event_date=booked.event_date,
+                      event_time=(datetime.combine(booked.event_date, booked.event_time) + timedelta(minutes=30)).time(),
+                      capacity=10, category='academic', created_by=user_ids[0])
+        db.session.add(clash)
+        db.session.commit()
+        clash_id, booked_title = clash.id, booked.title
+    as_student.post(f'/register_event/{clash_id}')
+    with as_student.session_transaction() as sess:
+        flashes = [message for _, message in sess.pop('_flashes', [])]
+    check("registering for an overlapping event warns about the clash",
+          any('overlaps' in message and booked_title in message for message in flashes))
+    app.config['REGISTRATION_CLASHES'] = 'reject'
+    as_student.post(f'/cancel_registration/{clash_id}')
+    as_student.post(f'/register_event/{clash_id}')
+    with app.app_context():
+        status = db.session.query(Registration.status).filter(
+            Registration.user_id == student, Registration.event_id == clash_id).scalar()
+    check("REGISTRATION_CLASHES=reject refuses it", status == 'cancelled')
+    app.logger.disabled = False
+    return 1 if failures else 0
+
+def bench_jobs(args):
+    """Registration latency with notices on vs off, reminder fan-out throughput
+    per worker count, and the queue's retry, lease and exactly-once checks"""
+    import threading
+    import app as app_module
+    from app import (app, db, Event, Job, Registration, claim_jobs, enqueue, finish_job, job_handler,
+                     job_queue_stats, run_job, run_job_workers, schedule_reminders)
+
+    outbox = tempfile.mkdtemp(prefix='college-events-outbox-')
+    app.config.update(NOTIFY_OUTBOX_DIR=outbox, NOTIFY_BATCH_SIZE=args.batch_size, WAITLIST_ASYNC=False)
+    app.logger.disabled = True
+    soon = datetime.now() + timedelta(hours=2)  # Inside the reminder lead, so due at once
+    with app.app_context():
+        db.create_all()
+        user_ids = seed_students(max(args.students, args.registrants))
+        events = [Event(title=title, description='', venue=f'Hall {i}', event_date=soon.date(),
+                        event_time=dtime(soon.hour, soon.minute), capacity=len(user_ids), category='academic',
+                        created_by=user_ids[0]) for i, title in enumerate(('Quiet talk', 'Announced talk', 'Fair'))]
+        db.session.add_all(events)
+        db.session.commit()
+        quiet_id, announced_id, fair_id = (event.id for event in events)
+        insert_chunked(Registration.__table__, ({
+            'user_id': user_id, 'event_id': fair_id, 'status': 'registered', 'registration_date': datetime.utcnow(),
+        } for user_id in user_ids[:args.registrants]))
+        db.session.execute(db.update(Event).where(Event.id == fair_id).values(registered_count=args.registrants))
+        db.session.commit()
+
+    def outbox_ids(prefix):
+        ids = []
+        for name in os.listdir(outbox):
+            with open(os.path.join(outbox, name), encoding='utf-8') as f:
+                ids.extend(message['id'] for message in map(json.loads, f) if message['id'].startswith(prefix))
+        return ids
+
+    failures = 0
+
+    def check(label, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {label}")
+
+    # Request side: registering only adds a job row to the same transaction
+    print(f"📨 Registration latency, {args.students} students each")
+    for event_id, notify in ((quiet_id, False), (announced_id, True)):
+        app.config['NOTIFICATIONS'] = notify
+        timings = []
+        for user_id in user_ids[:args.students]:
+            client = app.test_client()
+            with client.session_transaction() as sess:
+                sess['user_id'] = user_id
+            t = time.perf_counter()
+            client.post(f'/register_event/{event_id}')
+            timings.append((time.perf_counter() - t) * 1000)
+        print(f"   notifications {'on ' if notify else 'off'}  p50 {statistics.median(timings):6.2f} ms  "
+              f"p99 {percentile(timings, 99):6.2f} ms")
+    with app.app_context():
+        lag = job_queue_stats()
+    print(f"   queue before the workers start: {lag['due']} due, lag {lag['lag_seconds']:.2f}s")
+
+    # Worker side: the confirmations, then the reminder sweep's fan-out to the fair
+    counts, seconds = run_job_workers(max(args.workers), once=True, batch_size=args.claim_size, poll_seconds=0.05)
+    print(f"⚙️  confirmations and first reminders: {sum(counts.values())} jobs in {seconds:.2f}s  {dict(counts)}")
+    for threads in args.workers:
+        with app.app_context():
+            db.session.execute(db.delete(Job).where(Job.kind == 'event_reminder'))
+            db.session.commit()
+        before = len(outbox_ids('reminder:'))
+        counts, seconds = run_job_workers(threads, once=True, batch_size=args.claim_size, poll_seconds=0.05)
+        sent = len(outbox_ids('reminder:')) - before
+        print(f"⚙️  {threads} workers: {sum(counts.values())} jobs in {seconds:.2f}s "
+              f"({sum(counts.values()) / seconds:.1f} jobs/sec, {sent / seconds:.0f} reminders/sec)  {dict(counts)}")
+
+    notices = outbox_ids(f'registered:{announced_id}:')
+    check(f"one confirmation per registration with notifications on ({len(notices)})",
+          len(notices) == len(set(notices)) == args.students and not outbox_ids(f'registered:{quiet_id}:'))
+    reminders = Counter(message_id.rsplit(':', 1)[1] for message_id in outbox_ids(f'reminder:{fair_id}:'))
+    check(f"each run reminds every registrant of the fair once ({len(reminders)} registrants)",
+          len(reminders) == args.registrants and set(reminders.values()) == {len(args.workers) + 1})
+    with app.app_context():
+        check("a second sweep queues no duplicate reminders", schedule_reminders() == 0)
+
+    # Retries back off, then give up after JOB_MAX_ATTEMPTS runs
+    app.config.update(JOB_MAX_ATTEMPTS=3, JOB_RETRY_SECONDS=30)
+    runs = Counter()
+
+    @job_handler('bench_flaky')
+    def flaky(payload):
+        runs[payload['name']] += 1
+        if runs[payload['name']] <= payload['failures']:
+            raise RuntimeError(f"failure {runs[payload['name']]}")
+
+    with app.app_context():
+        enqueue('bench_flaky', {'name': 'recovers', 'failures': 1})
+        enqueue('bench_flaky', {'name': 'broken', 'failures': 99})
+        db.session.commit()
+        outcomes, delays = Counter(), []
+        for _ in range(3):
+            for job in claim_jobs('bench', 10):
+                outcomes[run_job(job, 'bench')] += 1
+            delays.extend((run_at - datetime.utcnow()).total_seconds() for (run_at,) in db.session.query(
+                Job.run_at).filter(Job.kind == 'bench_flaky', Job.state == 'queued'))
+            db.session.execute(db.update(Job).where(Job.kind == 'bench_flaky', Job.state == 'queued')
+                               .values(run_at=datetime.utcnow() - timedelta(seconds=1)))
+            db.session.commit()
+        states = dict(db.session.query(Job.payload, Job.state).filter(Job.kind == 'bench_flaky'))
+    check(f"failed runs are retried with growing backoff ({', '.join(f'{d:.0f}s' for d in delays)})",
+          len(delays) == 3 and 20 < delays[0] < 40 and delays[1] > delays[0])
+    check("a job that recovers is done; one that keeps failing stops after 3 runs",
+          sorted(states.values()) == ['done', 'failed'] and runs == {'recovers': 2, 'broken': 3}
+          and outcomes == {'retried': 3, 'done': 1, 'failed': 1})
+
+    # A worker that stops mid-job loses its lease to the next claimer
+    with app.app_context():
+        enqueue('bench_flaky', {'name': 'stalled', 'failures': 0})
+        db.session.commit()
+        (stalled,) = claim_jobs('stalled-worker', 1)
+        check("a leased job isn't claimed again before the lease runs out", not claim_jobs('other-worker', 1))
+        db.session.execute(db.update(Job).where(Job.id == stalled.id)
+                           .values(run_at=datetime.utcnow() - timedelta(seconds=1)))
+        db.session.commit()
+        taken = claim_jobs('other-worker', 1)
+        check("an expired lease is taken over", [job.id for job in taken] == [stalled.id])
+        check("the stalled worker can't finish it any more",
+              not finish_job(stalled, 'stalled-worker') and run_job(taken[0], 'other-worker') == 'done')
+
+        # A job that hangs its worker on every run never reaches finish_job
+        enqueue('bench_flaky', {'name': 'hangs', 'failures': 0})
+        db.session.commit()
+        for attempt in range(app.config['JOB_MAX_ATTEMPTS'] + 1):
+            claimed = claim_jobs('hanging-worker', 1)
+            db.session.execute(db.update(Job).where(Job.kind == 'bench_flaky', Job.state == 'leased')
+                               .values(run_at=datetime.utcnow() - timedelta(seconds=1)))
+            db.session.commit()
+        (state, attempts), = db.session.query(Job.state, Job.attempts).filter(Job.payload.contains('hangs'))
+        check(f"a job whose lease keeps expiring fails after {attempts} runs", state == 'failed' and not claimed)
+        stats = job_queue_stats()
+
+    # --once still exits when a worker thread keeps raising
+    real_claim = app_module.claim_jobs
+    app_module.claim_jobs = lambda worker, limit: 1 / 0
+    runner = threading.Thread(target=run_job_workers, args=(2,), kwargs={'once': True, 'poll_seconds': 0.05},
+                              daemon=True)
+    runner.start()
+    runner.join(10)
+    app_module.claim_jobs = real_claim
+    check("run-jobs --once exits even if every claim fails", not runner.is_alive())
+    check("nothing is left due once the workers are idle", stats['due'] == 0 and stats['leased'] == 0)
+    del app_module.JOB_HANDLERS['bench_flaky']
+    app.logger.disabled = False
+    return 1 if failures else 0
+
+def bench_exports(args):
+    """Stream login, user and registration exports as CSV and XLSX: time, size
+    and peak heap growth (RssAnon), checked against loading every row first"""
+    import csv
+    import gc
+    import zipfile
+    from xml.etree import ElementTree
+    from app import app, db, Event, LoginActivity, Registration, User, csv_chunks, LOGIN_EXPORT_COLUMNS
+
+    app.logger.disabled = True
+    stand_in_templates(app, ['404.html'])
+    with app.app_context():
+        db.create_all()
+        user_ids = seed_students(args.students)
+        db.session.add(User(username='export_admin', email='export_admin@college.edu', password_hash='x',
+                            full_name='=HYPERLINK("http://example.com")', role='admin'))
+        event = Event(title='Cultural Night', description='', event_date=date.today(), event_time=dtime(18),
+                      venue='Open Air Theatre', capacity=args.attendees, category='cultural', created_by=user_ids[0])
+        db.session.add(event)
+        db.session.commit()
+        admin_id, event_id = db.session.query(User.id).filter(User.username == 'export_admin').scalar(), event.id
+        insert_chunked(Registration.__table__, ({
+            'user_id': user_id, 'event_id': event_id, 'status': 'registered', 'registration_date': datetime.utcnow(),
+        } for user_id in user_ids[:args.attendees]))
+        started = datetime.utcnow() - timedelta(days=365)
+        insert_chunked(LoginActivity.__table__, ({
+            'user_id': user_ids[i % len(user_ids)], 'login_time': started + timedelta(seconds=i * 30),
+            'logout_time': started + timedelta(seconds=i * 30 + 900), 'session_duration': 15,
+            'ip_address': f'10.0.{i % 250}.{i % 200}', 'user_agent': 'Mozilla/5.0 (X11; Linux x86_64) Firefox/128.0',
+        } for i in range(args.rows)))
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = admin_id
+    scratch = tempfile.mkdtemp(prefix='college-events-exports-')
+    failures = 0
+
+    def check(label, ok):
+        nonlocal failures
+        failures += not ok
+        print(f"{'✅' if ok else '❌'} {label}")
+
+    def download(url):
+        gc.collect()
+        baseline = peak = rss_kb('RssAnon')
+        path = os.path.join(scratch, url.rsplit('/', 1)[1])
+        t = time.perf_counter()
+        response = client.get(url, buffered=False)
+        with open(path, 'wb') as f:
+            for chunk in response.response:
+                f.write(chunk)
+                peak = max(peak, rss_kb('RssAnon'))
+        seconds = time.perf_counter() - t
+        response.close()
+        print(f"   {url:<48} {seconds:6.2f}s  {os.path.getsize(path) / 1e6:7.1f} MB  "
+              f"+{(peak - baseline) / 1024:6.1f} MB heap")
+        return response, path
+
+    def csv_rows(path):
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            return list(csv.reader(f))
+
+    def xlsx_rows(path):
+        with zipfile.ZipFile(path) as book:
+            assert book.testzip() is None
+            ElementTree.fromstring(book.read('xl/workbook.xml'))
+            cell = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}c'
+            rows = []
+            with book.open('xl/worksheets/sheet1.xml') as sheet:
+                for _, element in ElementTree.iterparse(sheet):
+                    if element.tag.endswith('}row'):
+                        if len(rows) < 2:
+                            rows.append([''.join(c.itertext()) for c in element.iter(cell)])
+                        else:
+                            rows.append(None)
+                        element.clear()
+            return rows
+
+    print(f"📤 {args.rows} logins, {args.students + 1} users, {args.attendees} registrations")
+    response, path = download('/admin/export/logins.csv')
+    rows = csv_rows(path)
+    check(f"logins.csv has a header and every row ({len(rows) - 1})",
+          rows[0][:3] == ['id', 'user_id', 'username'] and len(rows) == args.rows + 1
+          and response.headers['Content-Disposition'] == 'attachment; filename="logins.csv"')
+    del rows
+    response, path = download('/admin/export/logins.xlsx')
+    rows = xlsx_rows(path)
+    check(f"logins.xlsx is a valid workbook with every row ({len(rows) - 1})",
+          rows[0][:3] == ['id', 'user_id', 'username'] and len(rows) == args.rows + 1)
+    del rows
+    # Login i is at started + 30s * i; take the day of the middle one
+    step = timedelta(seconds=30)
+    day = (started + step * (args.rows // 2)).date()
+    first, last = (-((started - datetime.combine(moment, dtime())) // step)
+                   for moment in (day, day + timedelta(days=1)))
+    expected = min(last, args.rows) - max(first, 0)
+    rows = csv_rows(download(f'/admin/export/logins.csv?from={day}&to={day}')[1])
+    check(f"?from= and ?to= limit it to one day ({len(rows) - 1} logins)", len(rows) - 1 == expected)
+
+    rows = csv_rows(download('/admin/export/users.csv')[1])
+    check("users.csv quotes a formula-like name so spreadsheets don't run it",
+          len(rows) == args.students + 2 and rows[-1][3] == "'" + '=HYPERLINK("http://example.com")')
+    rows = xlsx_rows(download(f'/admin/export/events/{event_id}/registrations.xlsx')[1])
+    check(f"the Cultural Night attendee list has every registrant ({len(rows) - 1})",
+          len(rows) == args.attendees + 1 and rows[1][1] == str(user_ids[0]))
+    with app.app_context():
+        db.session.query(Registration).filter(Registration.user_id == user_ids[0]).update({'status': 'cancelled'})
+        db.session.commit()
+    rows = csv_rows(download(f'/admin/export/events/{event_id}/registrations.csv')[1])
+    check("cancelled registrations are left out", len(rows) == args.attendees)
+    check("an unknown event is a 404", client.get('/admin/export/events/999999/registrations.csv').status_code == 404)
+
+    # For comparison: every row loaded before writing (run last, as the memory isn't handed back)
+    with app.app_context():
+        gc.collect()
+        baseline = rss_kb('RssAnon')
+        t = time.perf_counter()
+        query = db.session.query(*LOGIN_EXPORT_COLUMNS).join(User, User.id == LoginActivity.user_id)
+        loaded = query.order_by(LoginActivity.login_time, LoginActivity.id).all()
+        body = b''.join(csv_chunks([column['name'] for column in query.column_descriptions], iter(loaded)))
+        print(f"   {'all rows loaded, then written (logins.csv)':<48} {time.perf_counter() - t:6.2f}s  "
+              f"{len(body) / 1e6:7.1f} MB  +{(rss_kb('RssAnon') - baseline) / 1024:6.1f} MB heap")
+    app.logger.disabled = False
+    return 1 if failures else 0
+
+def bench_engine(args):
+    """Run the mixed workload once per database configuration, each in a fresh process"""
+    configs = [
+        ('SQLite, default settings', {'SQLITE_TUNING': '0'}),
+        ('SQLite, WAL + tuned pragmas', {'SQLITE_TUNING': '1'}),
+    ]
+    if args.postgres_url:
+        configs.append(('PostgreSQL', {'DATABASE_URL': args.postgres_url}))
+
+    for label, env in configs:
+        command = [sys.executable, __file__, 'mixed', '--requests', str(args.requests),
+                   '--workers', str(args.workers), '--write-percent', str(args.write_percent)]
+        child_env = {**os.environ, 'AUDIT_ASYNC': '0', **env}
+        if 'DATABASE_URL' not in env:
+            child_env.pop('DATABASE_URL', None)
+        output = subprocess.run(command, env=child_env, capture_output=True, text=True)
+        result = [line for line in output.stdout.splitlines() if line.startswith('{')]
+        if output.returncode or not result:
+            print(f"❌ {label}: {output.stderr.strip().splitlines()[-1:] or 'no output'}")
+            continue
+        result = json.loads(result[-1])
+        print(f"⚙️  {label:<28} {result['requests_per_sec']:8.1f} req/sec, p50 {result['p50_ms']:7.2f} ms, "
+              f"p99 {result['p99_ms']:8.2f} ms, {result['failed_writes']} failed writes")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='College Event Management benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    registration = commands.add_parser('registration', help='concurrent registrations for one event')
+    registration.add_argument('--requests', type=int, default=500)
+    registration.add_argument('--capacity', type=int, default=100)
+    registration.add_argument('--workers', type=int, default=32)
+    registration.set_defaults(func=bench_registration)
+
+    plans = commands.add_parser('query-plans', help='fail if a hot route query scans a whole table')
+    plans.add_argument('--registrations', type=int, default=1000000)
+    plans.add_argument('--events', type=int, default=2000)
+    plans.add_argument('--logins', type=int, default=200000)
+    plans.set_defaults(func=bench_query_plans)
+
+    search = commands.add_parser('search', help='event search latency, LIKE vs FTS5')
+    search.add_argument('--sizes', default='10000,100000,1000000')
+    search.add_argument('--repeat', type=int, default=5)
+    search.set_defaults(func=bench_search)
+
+    pagination = commands.add_parser('pagination', help='deep page latency, keyset vs offset')
+    pagination.add_argument('--events', type=int, default=200000)
+    pagination.add_argument('--repeat', type=int, default=5)
+    pagination.set_defaults(func=bench_pagination)
+
+    hashing = commands.add_parser('hashing', help='password hashing throughput and login latency')
+    hashing.add_argument('--methods', default='pbkdf2:sha256:600000,pbkdf2:sha256:260000,'
+                                              'pbkdf2:sha256:100000,scrypt:32768:8:1')
+    hashing.add_argument('--hashes', type=int, default=32)
+    hashing.add_argument('--logins', type=int, default=50)
+    hashing.set_defaults(func=bench_hashing)
+
+    logins = commands.add_parser('logins', help='login throughput, synchronous vs batched activity writes')
+    logins.add_argument('--logins', type=int, default=2000)
+    logins.add_argument('--workers', type=int, default=16)
+    logins.set_defaults(func=bench_logins)
+
+    waitlist = commands.add_parser('waitlist', help='join/cancel/promote races and promotion cost by queue size')
+    waitlist.add_argument('--students', type=int, default=400)
+    waitlist.add_argument('--capacity', type=int, default=50)
+    waitlist.add_argument('--workers', type=int, default=16)
+    waitlist.add_argument('--sizes', default='1000,100000,1000000')
+    waitlist.add_argument('--seats', type=int, default=20, help='seats freed one at a time per queue size')
+    waitlist.set_defaults(func=bench_waitlist)
+
+    polling = commands.add_parser('api-polling', help='cost of polling the event list, HTML vs JSON vs 304')
+    polling.add_argument('--requests', type=int, default=2000)
+    polling.add_argument('--events', type=int, default=5000)
+    polling.set_defaults(func=bench_api_polling)
+
+    stream = commands.add_parser('seat-stream', help='memory per SSE subscriber and commit-to-client latency')
+    stream.add_argument('--connections', type=int, default=2000)
+    stream.add_argument('--events', type=int, default=50, help='events the subscribers spread over')
+    stream.add_argument('--hot-events', type=int, default=5, help='events the registrations go to')
+    stream.add_argument('--registrations', type=int, default=200)
+    stream.add_argument('--interval-ms', type=float, default=20)
+    stream.set_defaults(func=bench_seat_stream)
+
+    stream_clients = commands.add_parser('seat-stream-clients')  # Spawned by seat-stream
+    stream_clients.add_argument('--port', type=int, required=True)
+    stream_clients.add_argument('--connections', type=int, required=True)
+    stream_clients.add_argument('--events', type=int, required=True)
+    stream_clients.add_argument('--idle', type=float, default=3)
+    stream_clients.set_defaults(func=seat_stream_clients)
+
+    instrumentation = commands.add_parser('instrumentation', help='/events latency with metrics on vs off')
+    instrumentation.add_argument('--requests', type=int, default=2000)
+    instrumentation.add_argument('--rounds', type=int, default=10)
+    instrumentation.add_argument('--events', type=int, default=5000)
+    instrumentation.set_defaults(func=bench_instrumentation)
+
+    pages = commands.add_parser('page-cache', help='anonymous page throughput per page cache backend')
+    pages.add_argument('--requests', type=int, default=5000)
+    pages.add_argument('--events', type=int, default=5000)
+    pages.add_argument('--pages', type=int, default=200, help='distinct event detail pages visited')
+    pages.set_defaults(func=bench_page_cache)
+
+    retention = commands.add_parser('retention', help='admin dashboard latency before and after archive-logins')
+    retention.add_argument('--logins', type=int, default=500000)
+    retention.add_argument('--days', type=int, default=365, help='spread the logins over this many days')
+    retention.add_argument('--users', type=int, default=2000)
+    retention.add_argument('--retention-days', type=int, default=90)
+    retention.add_argument('--batch-size', type=int, default=5000)
+    retention.add_argument('--requests', type=int, default=50)
+    retention.set_defaults(func=bench_retention)
+
+    analytics = commands.add_parser('analytics', help='admin chart reads and refresh cost, summary tables vs ad hoc')
+    analytics.add_argument('--registrations', type=int, default=10000000)
+    analytics.add_argument('--changes', type=int, default=1000, help='new registrations before the incremental refresh')
+    analytics.add_argument('--requests', type=int, default=50)
+    analytics.set_defaults(func=bench_analytics)
+
+    load = commands.add_parser('load', help='scenario mix against generated data, per-route JSON report')
+    load.add_argument('--requests', type=int, default=5000)
+    load.add_argument('--workers', type=int, default=16)
+    load.add_argument('--mix', default=LOAD_MIX, help='scenario=weight pairs: browse, search, login, register, admin')
+    load.add_argument('--users', type=int, default=2000)
+    load.add_argument('--events', type=int, default=200)
+    load.add_argument('--registrations', type=int, default=20000)
+    load.add_argument('--logins', type=int, default=20000)
+    load.add_argument('--seed', type=int, default=1)
+    load.add_argument('--output', help='also write the JSON report here')
+    load.add_argument('--baseline', help='an earlier --output file to compare p95s against')
+    load.set_defaults(func=bench_load)
+
+    startup = commands.add_parser('startup', help='api/index.py import time and first-request latency')
+    startup.add_argument('--runs', type=int, default=5)
+    startup.add_argument('--events', type=int, default=1000)
+    startup.add_argument('--path', default='/api/v1/events', help='the first request')
+    startup.set_defaults(func=bench_startup)
+
+    startup_child_parser = commands.add_parser('startup-child')  # Spawned by startup
+    startup_child_parser.add_argument('--path', default='/api/v1/events')
+    startup_child_parser.set_defaults(func=startup_child)
+
+    sessions = commands.add_parser('sessions', help='auth check cost per session backend and principal cache setting')
+    sessions.add_argument('--requests', type=int, default=5000)
+    sessions.add_argument('--users', type=int, default=2000)
+    sessions.add_argument('--sessions', type=int, default=200, help='distinct logged-in clients per route')
+    sessions.add_argument('--ttl', type=float, default=2, help='principal cache TTL for the deactivation check')
+    sessions.set_defaults(func=bench_sessions)
+
+    bulk = commands.add_parser('bulk-registration', help='class-wide register/cancel via the admin API, lock time and invariants')
+    bulk.add_argument('--students', type=int, default=10000)
+    bulk.add_argument('--capacity', type=int, default=6000)
+    bulk.add_argument('--racers', type=int, default=200, help='students registering themselves during the batch')
+    bulk.add_argument('--baseline', type=int, default=300, help='students registered one POST at a time for comparison')
+    bulk.set_defaults(func=bench_bulk_registration)
+
+    scheduling = commands.add_parser('scheduling', help='venue conflict checks, free slots and schedule re-validation')
+    scheduling.add_argument('--sizes', default='10000,100000')
+    scheduling.add_argument('--venues', type=int, default=100)
+    scheduling.add_argument('--days', type=int, default=365)
+    scheduling.add_argument('--probes', type=int, default=2000)
+    scheduling.set_defaults(func=bench_scheduling)
+
+    calendar = commands.add_parser('calendar', help='.ics feed polling cost, invalidation and registration clash checks')
+    calendar.add_argument('--students', type=int, default=2000)
+    calendar.add_argument('--events', type=int, default=1000)
+    calendar.add_argument('--per-student', type=int, default=20, help='registered events in each feed')
+    calendar.add_argument('--polls', type=int, default=500, help='feeds polled per path')
+    calendar.set_defaults(func=bench_calendar)
+
+    jobs = commands.add_parser('jobs', help='notification job queue: request cost, reminder fan-out, retries and leases')
+    jobs.add_argument('--students', type=int, default=500, help='students registering through the web route')
+    jobs.add_argument('--registrants', type=int, default=10000, help='registrants of the event being reminded')
+    jobs.add_argument('--workers', type=lambda value: [int(n) for n in value.split(',')], default=[1, 4],
+                      help='comma-separated worker thread counts')
+    jobs.add_argument('--batch-size', type=int, default=500, help='NOTIFY_BATCH_SIZE')
+    jobs.add_argument('--claim-size', type=int, default=10, help='jobs leased per claim')
+    jobs.set_defaults(func=bench_jobs)
+
+    exports = commands.add_parser('exports', help='streamed CSV/XLSX exports: time, size and memory growth')
+    exports.add_argument('--rows', type=int, default=1000000, help='login rows exported')
+    exports.add_argument('--students', type=int, default=20000)
+    exports.add_argument('--attendees', type=int, default=1000, help='registrations for the exported event')
+    exports.set_defaults(func=bench_exports)
+
+    for name, func in (('mixed', bench_mixed), ('engine', bench_engine)):
+        mixed = commands.add_parser(name, help='mixed read/write throughput' if name == 'mixed'
+                                    else 'mixed throughput for each database configuration')
+        mixed.add_argument('--requests', type=int, default=3000)
+        mixed.add_argument('--workers', type=int, default=32)
+        mixed.add_argument('--write-percent', type=int, default=20)
+        mixed.set_defaults(func=func)
+    commands.choices['engine'].add_argument('--postgres-url', help='also run against this (scratch) database')
+
+    args = parser.parse_args()
+    if args.command == 'mixed' and os.environ.get('DATABASE_URL', '').startswith('postgres'):
+        print("🗄️ Using DATABASE_URL (its tables are dropped and re-created)")
+    elif args.command not in ('engine', 'seat-stream-clients', 'startup-child'):
+        print(f"🗄️ Scratch database: {use_scratch_database()}")
+    return args.func(args)
+
+if __name__ == '__main__':
+    sys.exit(main())